@@ -1,3 +1,5 @@
+import math
+
 import pandas as pd
 import numpy as np
 
@@ -106,6 +108,249 @@ def get_area(poly1, poly2):
     return intersection_area
 
 
+class STRtree(object):
+    """
+    An R-tree of axis aligned bounding boxes (envelopes), bulk loaded using
+    the Sort-Tile-Recursive (STR) packing algorithm.  The tree is used as a
+    cheap prefilter before exact (and expensive) polygon tests.
+
+    Envelopes added with insert are held in a pending buffer, which queries
+    search linearly alongside the packed tree.  Once the buffer holds more
+    than max(node_capacity, sqrt(n)) envelopes, where n is the number of
+    packed envelopes, the whole tree is repacked.  Envelope identifiers are
+    their insertion order, so they are unchanged by a repack.
+
+    Parameters
+    ----------
+    envelopes : iterable
+                of envelopes in the OGR GetEnvelope order, i.e.
+                (minx, maxx, miny, maxy)
+
+    node_capacity : int
+                    The maximum number of children per tree node
+
+    References
+    ----------
+    [Leutenegger1997]_
+    """
+
+    def __init__(self, envelopes, node_capacity=10):
+        envelopes = np.asarray(envelopes, dtype=np.float64).reshape(-1, 4)
+        self.node_capacity = node_capacity
+        self.envelopes = envelopes
+
+        # The leaves are the envelopes in STR order, every higher level
+        # bounds node_capacity consecutive boxes of the level below.
+        self._build()
+
+    def __len__(self):
+        return len(self.envelopes) + len(self._pending)
+
+    def _build(self):
+        # Envelopes that have been inserted since the tree was packed
+        self._pending = []
+        self._ids = self._str_order(self.envelopes)
+        self._levels = [self.envelopes[self._ids]]
+        while len(self._levels[-1]) > self.node_capacity:
+            self._levels.append(self._pack(self._levels[-1]))
+
+    def insert(self, envelope):
+        """
+        Add an envelope to the tree.  New envelopes are held in a buffer that
+        is searched linearly and the tree is only repacked once the buffer
+        grows larger than the square root of the tree size, so the cost of
+        an insert is amortized.
+
+        Parameters
+        ----------
+        envelope : iterable
+                   (minx, maxx, miny, maxy)
+
+        Returns
+        -------
+         : int
+           The index of the new envelope
+        """
+        self._pending.append(envelope)
+        index = len(self) - 1
+        if len(self._pending) > max(self.node_capacity, math.sqrt(len(self.envelopes))):
+            self.envelopes = np.vstack((self.envelopes,
+                                        np.asarray(self._pending, dtype=np.float64).reshape(-1, 4)))
+            self._build()
+        return index
+
+    def _str_order(self, envelopes):
+        """
+        Compute the order of the leaves by sorting on the x center, cutting
+        the result into vertical slices, and sorting each slice on the y
+        center.
+        """
+        n = len(envelopes)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        nleaves = math.ceil(n / self.node_capacity)
+        nslices = math.ceil(math.sqrt(nleaves))
+        slice_size = nslices * self.node_capacity
+
+        cx = (envelopes[:, 0] + envelopes[:, 1]) / 2
+        cy = (envelopes[:, 2] + envelopes[:, 3]) / 2
+        xorder = np.argsort(cx, kind='mergesort')
+        slices = [xorder[i:i + slice_size] for i in range(0, n, slice_size)]
+        return np.concatenate([s[np.argsort(cy[s], kind='mergesort')] for s in slices])
+
+    def _pack(self, boxes):
+        starts = np.arange(0, len(boxes), self.node_capacity)
+        return np.column_stack((np.minimum.reduceat(boxes[:, 0], starts),
+                                np.maximum.reduceat(boxes[:, 1], starts),
+                                np.minimum.reduceat(boxes[:, 2], starts),
+                                np.maximum.reduceat(boxes[:, 3], starts)))
+
+    @staticmethod
+    def _intersects(a, b):
+        return (a[:, 0] <= b[:, 1]) & (b[:, 0] <= a[:, 1]) & \
+               (a[:, 2] <= b[:, 3]) & (b[:, 2] <= a[:, 3])
+
+    def query_bulk(self, envelopes):
+        """
+        Find all of the indexed envelopes that intersect each of the query
+        envelopes.  All of the queries descend the tree together, one level
+        at a time.
+
+        Parameters
+        ----------
+        envelopes : iterable
+                    of query envelopes as (minx, maxx, miny, maxy)
+
+        Returns
+        -------
+        query_idx : ndarray
+                    The index of the query envelope
+
+        tree_idx : ndarray
+                   The index (in the input order) of the intersecting
+                   envelope in the tree
+        """
+        envelopes = np.asarray(envelopes, dtype=np.float64).reshape(-1, 4)
+        top = self._levels[-1]
+        query_idx = np.repeat(np.arange(len(envelopes)), len(top))
+        node_idx = np.tile(np.arange(len(top)), len(envelopes))
+
+        for depth in range(len(self._levels) - 1, -1, -1):
+            level = self._levels[depth]
+            hits = self._intersects(envelopes[query_idx], level[node_idx])
+            query_idx = query_idx[hits]
+            node_idx = node_idx[hits]
+            if depth == 0:
+                break
+
+            # Expand the hits to their children in the level below
+            nchildren = len(self._levels[depth - 1])
+            children = (node_idx[:, np.newaxis] * self.node_capacity +
+                        np.arange(self.node_capacity)).ravel()
+            query_idx = np.repeat(query_idx, self.node_capacity)
+            valid = children < nchildren
+            query_idx = query_idx[valid]
+            node_idx = children[valid]
+
+        tree_idx = self._ids[node_idx]
+        if self._pending:
+            pending = np.asarray(self._pending, dtype=np.float64).reshape(-1, 4)
+            pq = np.repeat(np.arange(len(envelopes)), len(pending))
+            pi = np.tile(np.arange(len(pending)), len(envelopes))
+            hits = self._intersects(envelopes[pq], pending[pi])
+            query_idx = np.concatenate((query_idx, pq[hits]))
+            tree_idx = np.concatenate((tree_idx, pi[hits] + len(self.envelopes)))
+        return query_idx, tree_idx
+
+    def query(self, envelope):
+        """
+        Find all of the indexed envelopes that intersect a single envelope.
+
+        Parameters
+        ----------
+        envelope : iterable
+                   (minx, maxx, miny, maxy)
+
+        Returns
+        -------
+         : ndarray
+           The indices (in the input order) of the intersecting envelopes
+        """
+        return np.sort(self.query_bulk([envelope])[1])
+
+    def query_pairs(self):
+        """
+        Find all pairs of indexed envelopes that intersect one another.
+
+        Returns
+        -------
+         : ndarray
+           (n, 2) array of unique pairs (i, j), with i < j, of
+           indices into the input envelopes
+        """
+        envelopes = self.envelopes
+        if self._pending:
+            envelopes = np.vstack((envelopes, np.asarray(self._pending, dtype=np.float64).reshape(-1, 4)))
+        i, j = self.query_bulk(envelopes)
+        mask = i < j
+        pairs = np.column_stack((i[mask], j[mask]))
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def disjoint_rectangles(rectangles):
+    """
+    Decompose the union of axis aligned rectangles into disjoint
+    rectangles, so that each point of the union is covered exactly once.
+    The coordinates are compressed to the rectangle borders, the covered
+    cells of each row are merged into runs and identical runs of adjacent
+    rows are merged into a single rectangle.
+
+    Parameters
+    ----------
+    rectangles : iterable
+                 of (minx, maxx, miny, maxy) rectangles, e.g. the
+                 source_mbr or destin_mbr of an edge
+
+    Returns
+    -------
+    disjoint : list
+               of (minx, maxx, miny, maxy) rectangles, ordered by miny
+               then minx
+    """
+    rectangles = [r for r in rectangles if r[1] > r[0] and r[3] > r[2]]
+    if not rectangles:
+        return []
+
+    xs = np.unique([v for r in rectangles for v in r[:2]])
+    ys = np.unique([v for r in rectangles for v in r[2:]])
+    covered = np.zeros((len(ys) - 1, len(xs) - 1), dtype=bool)
+    for minx, maxx, miny, maxy in rectangles:
+        x0, x1 = np.searchsorted(xs, [minx, maxx])
+        y0, y1 = np.searchsorted(ys, [miny, maxy])
+        covered[y0:y1, x0:x1] = True
+
+    disjoint = []
+    # Runs of the previous row, (x0, x1) -> index of the open rectangle
+    previous = {}
+    for j, row in enumerate(covered):
+        # The starts and stops of the runs of covered cells in the row
+        edges = np.diff(np.concatenate(([0], row.astype(np.int8), [0])))
+        runs = zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+        current = {}
+        for x0, x1 in runs:
+            if (x0, x1) in previous:
+                # Extend the rectangle of the same run in the previous row
+                i = previous[(x0, x1)]
+                minx, maxx, miny, maxy = disjoint[i]
+                disjoint[i] = (minx, maxx, miny, ys[j + 1])
+            else:
+                i = len(disjoint)
+                disjoint.append((xs[x0], xs[x1], ys[j], ys[j + 1]))
+            current[(x0, x1)] = i
+        previous = current
+    return disjoint
+
+
 def vor(edge, clean_keys=[], s=30):
         """
         Creates a voronoi diagram for an edge using either the coordinate
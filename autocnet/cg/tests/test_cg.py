@@ -33,3 +33,71 @@ class TestArea(unittest.TestCase):
         self.assertEqual(info[1], 400)
         self.assertAlmostEqual(info[0], 14.285714285)
 
+
+
+class TestSTRtree(unittest.TestCase):
+
+    def setUp(self):
+        seed = np.random.RandomState(12345)
+        mins = seed.uniform(0, 100, (250, 2))
+        sizes = seed.uniform(0, 10, (250, 2))
+        self.envelopes = np.column_stack((mins[:, 0], mins[:, 0] + sizes[:, 0],
+                                          mins[:, 1], mins[:, 1] + sizes[:, 1]))
+        self.tree = cg.STRtree(self.envelopes, node_capacity=4)
+
+    def brute_force(self, envelope):
+        e = self.envelopes
+        return np.where((e[:, 0] <= envelope[1]) & (envelope[0] <= e[:, 1]) &
+                        (e[:, 2] <= envelope[3]) & (envelope[2] <= e[:, 3]))[0]
+
+    def test_query(self):
+        query = (20, 40, 20, 40)
+        np.testing.assert_array_equal(self.tree.query(query), self.brute_force(query))
+
+    def test_query_pairs(self):
+        pairs = self.tree.query_pairs()
+        truth = [(i, j) for i in range(len(self.envelopes))
+                 for j in self.brute_force(self.envelopes[i]) if i < j]
+        self.assertEqual(list(map(tuple, pairs)), truth)
+
+    def test_empty(self):
+        tree = cg.STRtree([])
+        self.assertEqual(len(tree), 0)
+        self.assertEqual(len(tree.query_pairs()), 0)
+
+    def test_insert(self):
+        tree = cg.STRtree(self.envelopes[:10], node_capacity=4)
+        for e in self.envelopes[10:]:
+            tree.insert(e)
+        self.assertEqual(len(tree), len(self.envelopes))
+
+        query = (20, 40, 20, 40)
+        np.testing.assert_array_equal(tree.query(query), self.brute_force(query))
+        np.testing.assert_array_equal(tree.query_pairs(), self.tree.query_pairs())
+
+
+class TestDisjointRectangles(unittest.TestCase):
+
+    def _area(self, rectangles):
+        return sum((maxx - minx) * (maxy - miny) for minx, maxx, miny, maxy in rectangles)
+
+    def test_overlapping(self):
+        rectangles = [(0, 10, 0, 10), (5, 15, 5, 15), (0, 10, 0, 4)]
+        disjoint = cg.disjoint_rectangles(rectangles)
+        # The union of the two squares less their 5 x 5 intersection
+        self.assertEqual(self._area(disjoint), 175)
+        # Every point is covered exactly once
+        grid = np.zeros((20, 20), dtype=int)
+        for minx, maxx, miny, maxy in disjoint:
+            grid[int(miny):int(maxy), int(minx):int(maxx)] += 1
+        self.assertEqual(grid.max(), 1)
+        self.assertEqual(grid.sum(), 175)
+        self.assertEqual(len(disjoint), 3)
+
+    def test_contained(self):
+        disjoint = cg.disjoint_rectangles([(0, 10, 0, 10), (2, 4, 2, 4)])
+        self.assertEqual(disjoint, [(0, 10, 0, 10)])
+
+    def test_empty(self):
+        self.assertEqual(cg.disjoint_rectangles([]), [])
+        self.assertEqual(cg.disjoint_rectangles([(0, 0, 0, 10)]), [])
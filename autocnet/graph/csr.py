@@ -0,0 +1,429 @@
+from collections import deque
+from collections.abc import Mapping
+from copy import deepcopy
+import os
+from time import gmtime, strftime
+import weakref
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from autocnet.graph import views
+from autocnet.graph.edge import Edge
+from autocnet.graph.network import CandidateGraph
+from autocnet.graph.node import Node
+from autocnet.io import store as io_store
+
+
+class CSREdge(Edge):
+    """
+    An Edge of a CSRCandidateGraph.  CSREdge objects are created on access
+    and released once they are no longer used, while their state (the
+    items and attributes of the edge) is held by the graph, keyed by the
+    edge id.  A newly created CSREdge shares that state, so every write,
+    including g.edge[s][d]['weights']['x'] = 1, is seen by later accesses.
+    The state of an edge that has not been modified is dropped on the next
+    edge access after the edge is released, so hold a reference to an edge
+    while holding its weights, matches or masks.  The empty matches and
+    masks are only created when they are first used.
+    """
+    __slots__ = ('_items',)
+
+    # The instance attributes of an unmodified edge
+    _attributes = {'source', 'destination', '_matches', '_masks', '_store'}
+
+    def __init__(self, source=None, destination=None):
+        self.source = source
+        self.destination = destination
+        dict.update(self, _FRESH_EDGE)
+        dict.__setitem__(self, 'weights', {})
+
+    def _shared(self):
+        return getattr(self, '_items', None)
+
+    # Item writes are mirrored into the items held by the graph
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        items = self._shared()
+        if items is not None:
+            items[key] = value
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        items = self._shared()
+        if items is not None:
+            items.pop(key, None)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        items = self._shared()
+        if items is not None:
+            items.pop(key, None)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        items = self._shared()
+        if items is not None:
+            items.pop(key, None)
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        items = self._shared()
+        if items is not None:
+            items.clear()
+
+    def is_modified(self):
+        """
+        True if the edge differs from a newly created edge, i.e. it has
+        items or attributes that have been set, or payloads that have been
+        assigned or modified (in the store, if the graph is out-of-core)
+        """
+        if set(self.__dict__) - self._attributes or set(self) != set(_FRESH_EDGE):
+            return True
+        for key, default in _FRESH_EDGE.items():
+            value = dict.__getitem__(self, key)
+            if default is None and value is not None:
+                return True
+            if isinstance(default, dict) and value != default:
+                return True
+        store = self.__dict__.get('_store')
+        for name in self._payloads:
+            if store is not None:
+                if store.is_modified(self.payload_key(name)):
+                    return True
+                continue
+            value = self.__dict__.get('_{}'.format(name))
+            if value is not None and not value.empty:
+                return True
+        return False
+
+
+_FRESH_EDGE = dict(Edge())
+
+
+
+def _release(graph, i):
+    # Called once a CSREdge is no longer used.  Its state is only checked
+    # (see CSRCandidateGraph._sweep) on the next edge access, so that a
+    # chained write, e.g. g.edge[s][d]['weights']['x'] = 1, that completes
+    # after the edge is released is kept.
+    graph = graph()
+    if graph is not None:
+        graph._released.append(i)
+
+
+class CSRNodes(Mapping):
+    """
+    The node mapping of a CSRCandidateGraph.  Node objects are created on
+    first access.
+    """
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __contains__(self, n):
+        return isinstance(n, (int, np.integer)) and 0 <= n < len(self._graph._image_paths)
+
+    def __getitem__(self, n):
+        if n not in self:
+            raise KeyError(n)
+        return self._graph._node(int(n))
+
+    def __iter__(self):
+        return iter(range(len(self._graph._image_paths)))
+
+    def __len__(self):
+        return len(self._graph._image_paths)
+
+
+class CSRNeighbors(Mapping):
+    """
+    The neighbors of a node in a CSRCandidateGraph, a slice of the CSR
+    arrays.  Edge objects are created on first access.
+    """
+    def __init__(self, graph, u):
+        self._graph = graph
+        self._start = graph._indptr[u]
+        self._stop = graph._indptr[u + 1]
+
+    def _position(self, v):
+        if not isinstance(v, (int, np.integer)):
+            return None
+        row = self._graph._indices[self._start:self._stop]
+        i = np.searchsorted(row, v)
+        if i < len(row) and row[i] == v:
+            return self._start + i
+        return None
+
+    def __contains__(self, v):
+        return self._position(v) is not None
+
+    def __getitem__(self, v):
+        i = self._position(v)
+        if i is None:
+            raise KeyError(v)
+        return self._graph._edge(int(self._graph._edge_ids[i]))
+
+    def __iter__(self):
+        return iter(self._graph._indices[self._start:self._stop].tolist())
+
+    def __len__(self):
+        return int(self._stop - self._start)
+
+    def items(self):
+        neighbors = self._graph._indices[self._start:self._stop].tolist()
+        edge_ids = self._graph._edge_ids[self._start:self._stop].tolist()
+        return ((v, self._graph._edge(e)) for v, e in zip(neighbors, edge_ids))
+
+
+class CSRAdjacency(CSRNodes):
+    """
+    The adjacency mapping of a CSRCandidateGraph
+    """
+    def __getitem__(self, u):
+        if u not in self:
+            raise KeyError(u)
+        return CSRNeighbors(self._graph, int(u))
+
+
+@views.read_only
+class CSRCandidateGraph(CandidateGraph):
+    """
+    A CandidateGraph with a static topology held in compressed sparse row
+    (CSR) arrays rather than networkx dicts of dicts.  Node and Edge
+    objects are created on access, so a graph with millions of overlaps
+    costs a few bytes per edge.  Nodes are held once created, while Edge
+    objects are only held while they are in use; the state of an accessed
+    edge is held by the graph, see CSREdge.
+
+    The nodes_iter, edges_iter, node[n] and edge[s][d] interfaces (and the
+    CandidateGraph methods built upon them) are unchanged.  Nodes are
+    identified by the integers 0 to n - 1.  The topology can not be
+    modified.
+
+    Parameters
+    ----------
+    data : dict or object
+           An adjacency dict of image PATHs (as used by CandidateGraph) or
+           a networkx graph with image PATHs as nodes
+
+    See Also
+    --------
+    autocnet.graph.csr.CSRCandidateGraph.from_edges
+    """
+    _mutators = ('add_image',)
+
+    def __init__(self, data=None, **kwargs):
+        index = {}
+        sources = []
+        destinations = []
+        if data is not None:
+            adjacency = data.adj if isinstance(data, nx.Graph) else data
+            for name in adjacency:
+                index.setdefault(name, len(index))
+            for name, neighbors in adjacency.items():
+                for neighbor in neighbors:
+                    sources.append(index[name])
+                    destinations.append(index.setdefault(neighbor, len(index)))
+        self._build(list(index), sources, destinations)
+        self.graph.update(kwargs)
+
+    @classmethod
+    def from_edges(cls, image_paths, sources, destinations):
+        """
+        Instantiate the class from arrays of edges, without building an
+        adjacency dict.
+
+        Parameters
+        ----------
+        image_paths : list
+                      of image PATHs, node i is image_paths[i]
+
+        sources : array_like
+                  of the source node index of each edge
+
+        destinations : array_like
+                       of the destination node index of each edge
+
+        Returns
+        -------
+         : object
+           A CSRCandidateGraph
+        """
+        graph = cls.__new__(cls)
+        graph._build(list(image_paths), sources, destinations)
+        return graph
+
+    def _build(self, image_paths, sources, destinations):
+        n = len(image_paths)
+        dtype = np.int32 if n < 2**31 else np.int64
+        sources = np.asarray(sources, dtype=np.int64)
+        destinations = np.asarray(destinations, dtype=np.int64)
+
+        # Unique, undirected edges without self loops, ordered by (s, d)
+        s = np.minimum(sources, destinations)
+        d = np.maximum(sources, destinations)
+        keys = np.unique((s * n + d)[s != d])
+        self._sources = (keys // max(n, 1)).astype(dtype)
+        self._destinations = (keys % max(n, 1)).astype(dtype)
+
+        m = len(keys)
+        rows = np.concatenate((self._sources, self._destinations))
+        cols = np.concatenate((self._destinations, self._sources))
+        edge_ids = np.concatenate((np.arange(m), np.arange(m)))
+        order = np.lexsort((cols, rows))
+        self._indices = cols[order]
+        self._edge_ids = edge_ids[order].astype(dtype)
+        self._indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=self._indptr[1:])
+        for arr in (self._sources, self._destinations, self._indices, self._edge_ids, self._indptr):
+            arr.setflags(write=False)
+
+        self._image_paths = image_paths
+        self._nodes = {}
+        # The live Edge objects and the (items, attributes) of each
+        # accessed edge
+        self._edges = weakref.WeakValueDictionary()
+        self._edge_state = {}
+        self._released = deque()
+
+        self.graph = {'node_counter': n,
+                      'node_name_map': {os.path.basename(p): i for i, p in enumerate(image_paths)},
+                      'creationdate': strftime("%Y-%m-%d %H:%M:%S", gmtime()),
+                      'modifieddate': strftime("%Y-%m-%d %H:%M:%S", gmtime())}
+        self._views()
+
+    def _views(self):
+        self.node = CSRNodes(self)
+        self.adj = CSRAdjacency(self)
+        self.edge = self.adj
+
+    def _node(self, i):
+        node = self._nodes.get(i)
+        if node is None:
+            path = self._image_paths[i]
+            node = Node(os.path.basename(path), path, i)
+            if getattr(self, 'store', None) is not None:
+                io_store.attach(node, self.store)
+            node = self._nodes.setdefault(i, node)
+        return node
+
+    def _edge(self, i):
+        self._sweep()
+        edge = self._edges.get(i)
+        if edge is not None:
+            return edge
+        state = self._edge_state.get(i)
+        if state is None:
+            source = self._node(int(self._sources[i]))
+            destination = self._node(int(self._destinations[i]))
+            edge = CSREdge(source, destination)
+            if getattr(self, 'store', None) is not None:
+                io_store.attach(edge, self.store)
+            state = self._edge_state.setdefault(i, (dict(edge), edge.__dict__))
+        edge = self._shared_edge(state)
+        edge._items = state[0]
+        weakref.finalize(edge, _release, weakref.ref(self), i)
+        return self._edges.setdefault(i, edge)
+
+    @staticmethod
+    def _shared_edge(state):
+        # An edge sharing the items and attributes held by the graph
+        items, attributes = state
+        edge = CSREdge.__new__(CSREdge)
+        edge.__dict__ = attributes
+        dict.update(edge, items)
+        return edge
+
+    def _sweep(self):
+        """
+        Drop the state of the released edges that have not been modified
+        """
+        while self._released:
+            i = self._released.popleft()
+            state = self._edge_state.get(i)
+            if state is not None and i not in self._edges and \
+                    not self._shared_edge(state).is_modified():
+                del self._edge_state[i]
+
+    def enable_out_of_core(self, path, max_bytes=2**30):
+        """
+        Move the node and edge payloads into an on-disk store, see
+        CandidateGraph.enable_out_of_core.  Only the nodes and edges that
+        have been accessed are moved now, the others are attached to the
+        store when they are first accessed.
+        """
+        self.store = io_store.PayloadStore(path, max_bytes=max_bytes)
+        for node in self._nodes.values():
+            io_store.attach(node, self.store)
+        self._sweep()
+        for i in list(self._edge_state):
+            io_store.attach(self._edge(i), self.store)
+        self.store.flush()
+
+    def edges_iter(self, nbunch=None, data=False, default=None):
+        if nbunch is not None or data not in (True, False):
+            return super(CSRCandidateGraph, self).edges_iter(nbunch, data=data, default=default)
+        pairs = zip(self._sources.tolist(), self._destinations.tolist())
+        if data:
+            return ((s, d, self._edge(i)) for i, (s, d) in enumerate(pairs))
+        return pairs
+
+    def size(self, weight=None):
+        if weight:
+            return super(CSRCandidateGraph, self).size(weight)
+        return len(self._sources)
+
+    def subgraph(self, nbunch):
+        return self.create_node_subgraph(nbunch)
+
+    def adjacency_matrix(self):
+        """
+        The adjacency matrix of the graph, built from the CSR arrays
+        without creating any Edge objects.
+
+        Returns
+        -------
+         : object
+           A scipy.sparse.csr_matrix
+        """
+        n = len(self._image_paths)
+        return sparse.csr_matrix((np.ones(len(self._indices)), self._indices, self._indptr),
+                                 shape=(n, n))
+
+    def copy(self):
+        """
+        Copy the graph.  The topology arrays are immutable and shared, while
+        the graph, node and edge attributes are deep copied.
+
+        Returns
+        -------
+        H : object
+            A CSRCandidateGraph
+        """
+        H = self.__class__.__new__(self.__class__)
+        H.__dict__.update(self.__dict__)
+        memo = {}
+        H.graph = deepcopy(self.graph, memo)
+        H._nodes = {i: deepcopy(n, memo) for i, n in self._nodes.items()}
+        H._edges = weakref.WeakValueDictionary()
+        H._edge_state = {}
+        H._released = deque()
+        self._sweep()
+        for i, state in list(self._edge_state.items()):
+            edge = self._shared_edge(state)
+            if edge.is_modified():
+                H._edge_state[i] = (deepcopy(dict(edge), memo), deepcopy(edge.__dict__, memo))
+        H._views()
+        return H
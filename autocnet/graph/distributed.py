@@ -0,0 +1,315 @@
+import argparse
+from collections import deque
+import multiprocessing
+from multiprocessing.connection import Client, Listener, wait
+import os
+import traceback
+
+from autocnet.graph import pool
+
+
+def _run(message):
+    """
+    Worker side execution of a single task message.
+    """
+    kind = message[0]
+    if kind == 'edge':
+        _, edge, function, args, kwargs = message
+        pool.apply(edge, function, args, kwargs)
+        return pool.get_state(edge)
+    elif kind == 'node':
+        _, node, function, band, args, kwargs = message
+        pool.extract(node, function, args, kwargs, band=band)
+        return pool.get_state(node)
+    raise ValueError('Unknown task type: {}'.format(kind))
+
+
+def serve(address, authkey):
+    """
+    Run a worker.  The worker connects to a Cluster, applies the node and
+    edge methods it is sent, and returns the resulting state until it is
+    told to stop or the connection is closed.
+
+    Messages from the cluster are ('edge', edge, function, args, kwargs),
+    ('node', node, function, band, args, kwargs) or ('stop',).  The worker
+    replies to each task with ('result', state) or ('error', traceback).
+
+    Parameters
+    ----------
+    address : tuple
+              (host, port) of the Cluster
+
+    authkey : bytes
+              The key used to authenticate with the Cluster
+    """
+    conn = Client(address, authkey=authkey)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == 'stop':
+                break
+            try:
+                reply = ('result', _run(message))
+            except Exception:
+                reply = ('error', traceback.format_exc())
+            conn.send(reply)
+    finally:
+        conn.close()
+
+
+class Cluster(object):
+    """
+    A coordinator that distributes node and edge methods across workers
+    and streams the results back as they complete.  Nodes and edges are
+    pickled to the workers, with the payloads of out-of-core graphs
+    materialized, and the returned state is merged back into the graph.
+
+    Workers connect over a socket.  They may be local processes, started
+    with start_local_workers, or remote processes started on other
+    machines with::
+
+        AUTOCNET_AUTHKEY=<hex key> python -m autocnet.graph.distributed <host> <port>
+
+    and then accepted with accept.  Images are read by the workers, so the
+    image PATHs must resolve on every machine.
+
+    Parameters
+    ----------
+    address : tuple
+              (host, port) to listen on.  Port 0 selects a free port.
+
+    authkey : bytes
+              The key workers must authenticate with.  Default: random
+
+    nlocal : int
+             The number of local worker processes to start
+
+    prefetch : int
+               The number of tasks queued on each worker, so that workers
+               do not idle while results are returned
+
+    Attributes
+    ----------
+    address : tuple
+              The (host, port) the cluster is listening on
+
+    workers : list
+              of worker connections
+    """
+
+    def __init__(self, address=('localhost', 0), authkey=None, nlocal=0, prefetch=2):
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        self.prefetch = prefetch
+        self.workers = []
+        self._processes = []
+        if nlocal:
+            self.start_local_workers(nlocal)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start_local_workers(self, n):
+        """
+        Start and accept n local worker processes.
+
+        Parameters
+        ----------
+        n : int
+            The number of workers
+        """
+        for i in range(n):
+            p = multiprocessing.Process(target=serve, args=(self.address, self.authkey), daemon=True)
+            p.start()
+            self._processes.append(p)
+        self.accept(n)
+
+    def accept(self, n):
+        """
+        Block until n workers have connected.
+
+        Parameters
+        ----------
+        n : int
+            The number of workers
+        """
+        for i in range(n):
+            self.workers.append(self._listener.accept())
+
+    def imap(self, tasks):
+        """
+        Run tasks on the workers, yielding the results as they arrive.  If
+        a worker disconnects, its outstanding tasks are requeued on the
+        remaining workers.
+
+        Parameters
+        ----------
+        tasks : iterable
+                of (key, message) tuples, where message is a worker task
+                message (see serve)
+
+        Yields
+        ------
+        key : object
+              The key of the completed task
+
+        result : object
+                 The state returned by the worker
+        """
+        if not self.workers:
+            raise RuntimeError('The cluster has no workers')
+
+        pending = deque(tasks)
+        inflight = {conn: deque() for conn in self.workers}
+        error = None
+
+        def _submit(conn):
+            while pending and error is None and len(inflight[conn]) < self.prefetch:
+                key, message = pending.popleft()
+                inflight[conn].append((key, message))
+                try:
+                    conn.send(message)
+                except OSError:
+                    _lose(conn)
+                    return
+
+        def _lose(conn):
+            # Requeue the tasks of a disconnected worker on the others
+            pending.extendleft(reversed(inflight.pop(conn)))
+            self.workers.remove(conn)
+            conn.close()
+            if not self.workers:
+                raise RuntimeError('All of the cluster workers have disconnected')
+            for c in list(inflight):
+                if c in inflight:
+                    _submit(c)
+
+        for conn in list(self.workers):
+            if conn in inflight:
+                _submit(conn)
+
+        while any(inflight.values()):
+            for conn in wait([c for c, queued in inflight.items() if queued]):
+                if conn not in inflight:
+                    continue
+                try:
+                    status, result = conn.recv()
+                except (EOFError, OSError):
+                    _lose(conn)
+                    continue
+
+                key, message = inflight[conn].popleft()
+                if status == 'error':
+                    # Drain the outstanding tasks before raising
+                    error = error or RuntimeError('Task {} failed:\n{}'.format(key, result))
+                else:
+                    yield key, result
+                _submit(conn)
+
+        if error is not None:
+            raise error
+
+    def imap_edges(self, edges, function, args=(), kwargs={}):
+        """
+        Apply a named Edge method to each edge on the workers, yielding the
+        edges as they complete.  The most costly edges are sent first.
+
+        Parameters
+        ----------
+        edges : iterable
+                of (source, destination, edge) tuples
+
+        function : str
+                   The name of the Edge method to apply
+
+        args : tuple
+               of arguments passed to the method
+
+        kwargs : dict
+                 of keyword arguments passed to the method
+
+        Yields
+        ------
+        s : hashable
+            The source node identifier
+
+        d : hashable
+            The destination node identifier
+
+        edge : object
+               The edge, with the results of the function merged in
+
+        See Also
+        --------
+        autocnet.graph.pool.imap_edges
+        """
+        edges = sorted(edges, key=lambda x: pool.edge_cost(x[2]), reverse=True)
+        tasks = [((s, d, edge), ('edge', edge, function, args, kwargs)) for s, d, edge in edges]
+        for (s, d, edge), state in self.imap(tasks):
+            pool.set_state(edge, state)
+            yield s, d, edge
+
+    def imap_nodes(self, nodes, function, band=1):
+        """
+        Apply a Node extraction method to each node on the workers,
+        yielding the nodes as they complete.
+
+        Parameters
+        ----------
+        nodes : iterable
+                of (node identifier, node, args, kwargs) tuples
+
+        function : str
+                   The name of the Node extraction method to apply
+
+        band : int
+               The band to read when function is 'extract_features'
+
+        Yields
+        ------
+        i : hashable
+            The node identifier
+
+        node : object
+               The node with the extraction results merged in
+
+        See Also
+        --------
+        autocnet.graph.pool.imap_nodes
+        """
+        tasks = [((i, node), ('node', node, function, band, args, kwargs))
+                 for i, node, args, kwargs in nodes]
+        for (i, node), state in self.imap(tasks):
+            pool.set_state(node, state)
+            yield i, node
+
+    def close(self):
+        """
+        Stop the workers and the listener.
+        """
+        for conn in self.workers:
+            try:
+                conn.send(('stop',))
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        self.workers = []
+        for p in self._processes:
+            p.join()
+        self._processes = []
+        self._listener.close()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Run an autocnet distributed worker')
+    parser.add_argument('host', help='The host the Cluster is listening on')
+    parser.add_argument('port', type=int, help='The port the Cluster is listening on')
+    args = parser.parse_args()
+    serve((args.host, args.port), bytes.fromhex(os.environ['AUTOCNET_AUTHKEY']))
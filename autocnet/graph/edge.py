@@ -1,4 +1,5 @@
 from functools import wraps
+import threading
 import warnings
 from collections import MutableMapping
 
@@ -9,6 +10,7 @@ from scipy.spatial.distance import cdist
 
 import autocnet
 from autocnet.graph.node import Node
+from autocnet.io import store as io_store
 from autocnet.utils import utils
 from autocnet.matcher import cpu_outlier_detector as od
 from autocnet.matcher import suppression_funcs as spf
@@ -37,6 +39,10 @@ class Edge(dict, MutableMapping):
              overlap_area returns the area overlaped by both images
              overlap_percn retuns the total percentage of overlap
     """
+    # The potentially large attributes that can be held in a PayloadStore
+    _payloads = ('matches', 'masks')
+    matches = io_store.StoredAttribute('matches', pd.DataFrame)
+    masks = io_store.StoredAttribute('masks', pd.DataFrame)
 
     def __init__(self, source=None, destination=None):
         self.source = source
@@ -75,6 +81,17 @@ class Edge(dict, MutableMapping):
 
         return eq
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        io_store.materialize(self, state)
+        return state
+
+    def payload_key(self, name):
+        """
+        The key used to hold a payload (e.g. the matches) in a PayloadStore
+        """
+        return 'edge_{}_{}_{}'.format(self.source['node_id'], self.destination['node_id'], name)
+
     """@property
     def masks(self):
         mask_lookup = {'fundamental': 'fundamental_matrix'}
@@ -263,7 +280,7 @@ class Edge(dict, MutableMapping):
 
     def subpixel_register(self, clean_keys=[], threshold=0.8,
                           template_size=19, search_size=53, max_x_shift=1.0,
-                          max_y_shift=1.0, tiled=False, **kwargs):
+                          max_y_shift=1.0, tiled=False, images=None, **kwargs):
         """
         For the entire graph, compute the subpixel offsets using pattern-matching and add the result
         as an attribute to each edge of the graph.
@@ -296,6 +313,11 @@ class Edge(dict, MutableMapping):
         max_y_shift : float
                       The maximum (positive) value that a pixel can shift in the y direction
                       without being considered an outlier
+
+        images : tuple
+                 of the (source, destination) image arrays, e.g. read
+                 ahead by autocnet.io.prefetch.prefetch.  If None, the
+                 images are read.
         """
         matches = self.matches
         for column, default in {'x_offset': 0, 'y_offset': 0, 'correlation': 0, 'reference': -1}.items():
@@ -305,13 +327,19 @@ class Edge(dict, MutableMapping):
         # Build up a composite mask from all of the user specified masks
         matches, mask = self.clean(clean_keys)
 
-        # Grab the full images, or handles
-        if tiled is True:
+        # Grab the full images, or handles.  The handles are shared with the
+        # other edges of the nodes, so reads through them are serialized.
+        s_lock = d_lock = threading.RLock()
+        if images is not None:
+            s_img, d_img = images
+        elif tiled is True:
             s_img = self.source.geodata
             d_img = self.destination.geodata
+            s_lock = self.source.geodata_lock
+            d_lock = self.destination.geodata_lock
         else:
-            s_img = self.source.geodata.read_array()
-            d_img = self.destination.geodata.read_array()
+            s_img = self.source.get_array()
+            d_img = self.destination.get_array()
 
         source_image = (matches.iloc[0]['source_image'])
 
@@ -324,8 +352,10 @@ class Edge(dict, MutableMapping):
             d_keypoint = self.destination.get_keypoint_coordinates(d_idx)
 
             # Get the template and search window
-            s_template = sp.clip_roi(s_img, s_keypoint, template_size)
-            d_search = sp.clip_roi(d_img, d_keypoint, search_size)
+            with s_lock:
+                s_template = sp.clip_roi(s_img, s_keypoint, template_size)
+            with d_lock:
+                d_search = sp.clip_roi(d_img, d_keypoint, search_size)
             try:
                 x_offset, y_offset, strength = sp.subpixel_offset(s_template, d_search, **kwargs)
                 self.matches.loc[idx, ('x_offset', 'y_offset',
@@ -1,18 +1,24 @@
 import numpy as np
 import networkx as nx
+from scipy import sparse
 
 
-def mcl(g, expand_factor=2, inflate_factor=2, max_loop=10, mult_factor=1):
+def mcl(g, expand_factor=2, inflate_factor=2, max_loop=10, mult_factor=1,
+        prune_threshold=1e-5, tol=1e-8):
     """
     Markov Cluster Algorithm
 
     Implementation modified from: https://github.com/koteth/python_mcl
     Originally released under the MIT license (https://opensource.org/licenses/MIT)
 
+    The flow matrix is held as a scipy.sparse matrix.  After each inflation,
+    entries smaller than prune_threshold are dropped and the columns are
+    renormalized, so that the matrix stays sparse as the flow converges.
+
     Parameters
     ----------
     g : object or ndarray
-        NetworkX graph object or adjacency matrix
+        NetworkX graph object or adjacency matrix (dense or scipy.sparse)
 
     inflate_factor : float
                      Parameter to strengthen and weaken flow between nodes.  The larger the value
@@ -27,10 +33,19 @@ def mcl(g, expand_factor=2, inflate_factor=2, max_loop=10, mult_factor=1):
     max_loop : int
                Number of iterations to perform before terminating (or convergence).
 
+    prune_threshold : float
+                      Flow values below this threshold are set to zero after
+                      each inflation.
+
+    tol : float
+          The iteration has converged when no flow value changes by more
+          than tol between iterations.
+
     Returns
     -------
-    arr : ndarray
-          arr normalized flow matrix computed after convergence or max_loop is exceeded.
+    arr : object
+          scipy.sparse.csr_matrix normalized flow matrix computed after
+          convergence or max_loop is exceeded.
 
     clusters : dict
                of clusters where the key is an arbitrary cluster identifier and
@@ -45,64 +60,84 @@ def mcl(g, expand_factor=2, inflate_factor=2, max_loop=10, mult_factor=1):
 
     def _normalize(arr):
         """
-        Column normalize an array
+        Column normalize a sparse matrix
+
         Parameters
         ----------
-        arr : ndarray
-              array to be normalized
+        arr : object
+              scipy.sparse matrix to be normalized
+
         Returns
         -------
-        new_matrix : ndarray
-                     normalized array
+        new_matrix : object
+                     normalized scipy.sparse.csr_matrix
         """
-        column_sums = arr.sum(axis=0)
-        new_matrix = arr / column_sums[np.newaxis, :]
-        return new_matrix
+        column_sums = np.asarray(arr.sum(axis=0)).ravel()
+        column_sums[column_sums == 0] = 1
+        return sparse.csr_matrix(arr.multiply(1 / column_sums[np.newaxis, :]))
 
     def _inflate(arr, inflate_factor):
-        return _normalize(np.power(arr, inflate_factor))
+        return _normalize(arr.power(inflate_factor))
+
+    def _prune(arr, prune_threshold):
+        arr.data[arr.data < prune_threshold] = 0
+        arr.eliminate_zeros()
+        return _normalize(arr)
 
     def _expand(arr, expand_factor):
-        return np.linalg.matrix_power(arr, expand_factor)
+        result = arr
+        for i in range(expand_factor - 1):
+            result = result.dot(arr)
+        return result
 
     def _add_diag(arr, mult_factor):
-        return arr + mult_factor * np.identity(arr.shape[0])
-
-    def _stop(arr, i):
-
-        if i % 5 == 4:
-            m = np.max(arr ** 2 - arr) - np.min(arr ** 2 - arr)
-            if m == 0:
-                return True
+        return arr + mult_factor * sparse.identity(arr.shape[0], format='csr')
 
-        return False
+    def _stop(arr, previous):
+        if previous is None or arr.shape != previous.shape:
+            return False
+        diff = abs(arr - previous)
+        return diff.nnz == 0 or diff.max() <= tol
 
     def _get_clusters(arr):
+        arr = sparse.csr_matrix(arr)
+        arr.eliminate_zeros()
+        arr.sort_indices()
         clusters = {}
+        seen = set()
         cid = 0
-        for j in arr:
-            row_positive = np.nonzero(j)[0].tolist()
-            if row_positive and not row_positive in clusters.values():
+        for i in range(arr.shape[0]):
+            row_positive = arr.indices[arr.indptr[i]:arr.indptr[i + 1]].tolist()
+            key = tuple(row_positive)
+            if row_positive and key not in seen:
+                seen.add(key)
                 clusters[cid] = row_positive
                 cid += 1
         return clusters
 
-    # Create a dense adjacency matrix
-    if isinstance(g, nx.Graph):
-        arr = np.array(nx.adjacency_matrix(g).todense())
-    elif isinstance(g, np.ndarray):
+    # Create a sparse adjacency matrix
+    if hasattr(g, 'adjacency_matrix'):
+        # e.g. a CSRCandidateGraph, without creating the edge objects
+        arr = g.adjacency_matrix()
+    elif isinstance(g, nx.Graph):
+        arr = nx.adjacency_matrix(g)
+    else:
         arr = g
+    arr = sparse.csr_matrix(arr, dtype=np.float64)
 
     arr = _add_diag(arr, mult_factor)
     arr = _normalize(arr)
 
+    previous = None
     for i in range(max_loop):
         arr = _inflate(arr, inflate_factor)
+        arr = _prune(arr, prune_threshold)
         arr = _expand(arr, expand_factor)
 
         # Check for convergence
-        if _stop(arr, i):
+        if _stop(arr, previous):
             break
+        previous = arr
 
     clusters = _get_clusters(arr)
     return arr, clusters
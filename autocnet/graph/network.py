@@ -1,4 +1,5 @@
-import itertools
+from collections import ChainMap, defaultdict
+from copy import deepcopy
 import math
 import os
 from time import gmtime, strftime
@@ -6,14 +7,25 @@ import warnings
 
 import networkx as nx
 import pandas as pd
+from osgeo import ogr
 
 from plio.io import io_hdf, io_json
 from plio.utils import utils as io_utils
-from plio.io.io_gdal import GeoDataset
+from autocnet.cg import cg
 from autocnet.graph import markov_cluster
+from autocnet.graph import partition
+from autocnet.graph import planner
+from autocnet.graph import pool
+from autocnet.graph import scheduler
+from autocnet.graph import sparsify
+from autocnet.graph import views
 from autocnet.graph.edge import Edge
 from autocnet.graph.node import Node
+from autocnet.io import checkpoint as io_checkpoint
+from autocnet.io import metadata as io_metadata
 from autocnet.io import network as io_network
+from autocnet.io import prefetch as io_prefetch
+from autocnet.io import store as io_store
 from autocnet.vis.graph_view import plot_graph, cluster_plot
 
 # The total number of pixels squared that can fit into the keys number of GB of RAM for SIFT.
@@ -23,6 +35,29 @@ MAXSIZE = {0:None,
            8:12500,
            12:15310}
 
+
+def maxsize_for_budget(budget):
+    """
+    The maximum side length of a square array that SIFT can extract within
+    a RAM budget.  Budgets in MAXSIZE are looked up, others are scaled from
+    the 2GB entry since the array area is proportional to the RAM.
+
+    Parameters
+    ----------
+    budget : float
+             The RAM budget in GB.  0 or None for no limit.
+
+    Returns
+    -------
+     : int
+       The maximum side length in pixels, or None for no limit
+    """
+    if not budget:
+        return None
+    if budget in MAXSIZE:
+        return MAXSIZE[budget]
+    return int(MAXSIZE[2] * math.sqrt(budget / 2))
+
 class CandidateGraph(nx.Graph):
     """
     A NetworkX derived directed graph to store candidate overlap images.
@@ -36,6 +71,10 @@ class CandidateGraph(nx.Graph):
                     The mapping of image labels (i.e. file base names) to their
                     corresponding node indices
 
+    partitions : dict
+                 of parts with key as the part id and value as a list of
+                 node identifiers, see compute_partitions
+
     clusters : dict
                of clusters with key as the cluster id and value as a
                list of node indices
@@ -99,10 +138,12 @@ class CandidateGraph(nx.Graph):
             raise KeyError('Value must be in {}'.format(','.join(map(str,MAXSIZE.keys()))))
         else:
             self._maxsize = MAXSIZE[value]
+            for i, node in self.nodes_iter(data=True):
+                node.maxsize = (self._maxsize, self._maxsize) if self._maxsize else None
 
 
     @classmethod
-    def from_filelist(cls, filelist, basepath=None):
+    def from_filelist(cls, filelist, basepath=None, cache=None, parallel=False, nworkers=None):
         """
         Instantiate the class using a filelist as a python list.
         An adjacency structure is calculated using the lat/lon information in the
@@ -113,45 +154,70 @@ class CandidateGraph(nx.Graph):
         filelist : list
                    A list containing the files (with full paths) to construct an adjacency graph from
 
+        cache : str
+                PATH to a sidecar cache of image metadata (footprints, sizes,
+                serial numbers).  Images that are unchanged since the cache
+                was written are not opened.
+
+        parallel : bool
+                   If True, read the image metadata using a pool of processes.
+                   Default: False
+
+        nworkers : int
+                   The number of processes to use when parallel is True.
+                   Default: the number of cpus
+
         Returns
         -------
         : object
           A Network graph object
+
+        See Also
+        --------
+        autocnet.io.metadata.scan
         """
         if isinstance(filelist, str):
             filelist = io_utils.file_to_list(filelist)
         # TODO: Reject unsupported file formats + work with more file formats
         if basepath:
-            datasets = [GeoDataset(os.path.join(basepath, f)) for f in filelist]
-        else:
-            datasets = [GeoDataset(f) for f in filelist]
+            filelist = [os.path.join(basepath, f) for f in filelist]
+
+        metadata = io_metadata.scan(filelist, cache=cache, parallel=parallel, nworkers=nworkers)
 
-        # This is brute force for now, could swap to an RTree at some point.
         adjacency_dict = {}
-        valid_datasets = []
+        valid_images = []
+        footprints = []
 
-        for i in datasets:
-            adjacency_dict[i.file_name] = []
+        for f, m in zip(filelist, metadata):
+            adjacency_dict[f] = []
 
-            fp = i.footprint
+            fp = ogr.CreateGeometryFromWkt(m['footprint']) if m['footprint'] else None
             if fp and fp.IsValid():
-                valid_datasets.append(i)
+                valid_images.append(f)
+                footprints.append(fp)
             else:
-                warnings.warn('Missing or invalid geospatial data for {}'.format(i.base_name))
-
-        # Grab the footprints and test for intersection
-        for i, j in itertools.permutations(valid_datasets, 2):
-            i_fp = i.footprint
-            j_fp = j.footprint
-
+                warnings.warn('Missing or invalid geospatial data for {}'.format(os.path.basename(f)))
+
+        # Prefilter the candidate pairs using an R-tree of the footprint
+        # envelopes and only test the exact footprints of those candidates.
+        tree = cg.STRtree([fp.GetEnvelope() for fp in footprints])
+        for a, b in tree.query_pairs():
+            i = valid_images[a]
+            j = valid_images[b]
             try:
-                if i_fp.Intersects(j_fp):
-                    adjacency_dict[i.file_name].append(j.file_name)
-                    adjacency_dict[j.file_name].append(i.file_name)
+                if footprints[a].Intersects(footprints[b]):
+                    adjacency_dict[i].append(j)
+                    adjacency_dict[j].append(i)
             except:
                 warnings.warn('Failed to calculated intersection between {} and {}'.format(i, j))
 
-        return cls(adjacency_dict)
+        graph = cls(adjacency_dict)
+
+        # Seed the nodes with the metadata so the images are not re-opened
+        metadata = dict(zip(filelist, metadata))
+        for i, node in graph.nodes_iter(data=True):
+            node.metadata = metadata[node['image_path']]
+        return graph
 
     @classmethod
     def from_adjacency(cls, input_adjacency, basepath=None):
@@ -207,60 +273,410 @@ class CandidateGraph(nx.Graph):
         """
         return self.node[node_index]['image_name']
 
-    def add_image(self, *args, **kwargs):
+    @property
+    def footprint_index(self):
+        """
+        An R-tree of the node footprint envelopes, used to find the overlaps
+        of newly added images.  The index is built on first access, updated
+        by add_image and cleared when nodes are added or removed otherwise.
+        Delete it (del graph.footprint_index) after changing the footprint
+        of a node, so that it is rebuilt.
+
+        Returns
+        -------
+        tree : object
+               An autocnet.cg.cg.STRtree
+
+        nodes : list
+                of the node identifiers, ordered as the tree envelopes
         """
-        Adds an image node to the graph.
+        if not hasattr(self, '_footprint_index'):
+            envelopes = []
+            nodes = []
+            for i, node in self.nodes_iter(data=True):
+                fp = node.footprint
+                if fp and fp.IsValid():
+                    envelopes.append(fp.GetEnvelope())
+                    nodes.append(i)
+            self._footprint_index = (cg.STRtree(envelopes), nodes)
+        return self._footprint_index
+
+    @footprint_index.deleter
+    def footprint_index(self):
+        self.__dict__.pop('_footprint_index', None)
+
+    # The networkx node mutators invalidate the footprint index
+    def add_node(self, n, attr_dict=None, **attr):
+        super(CandidateGraph, self).add_node(n, attr_dict, **attr)
+        del self.footprint_index
+
+    def add_nodes_from(self, nodes, **attr):
+        super(CandidateGraph, self).add_nodes_from(nodes, **attr)
+        del self.footprint_index
+
+    def remove_node(self, n):
+        super(CandidateGraph, self).remove_node(n)
+        del self.footprint_index
+
+    def remove_nodes_from(self, nodes):
+        super(CandidateGraph, self).remove_nodes_from(nodes)
+        del self.footprint_index
+
+    def clear(self):
+        super(CandidateGraph, self).clear()
+        del self.footprint_index
+
+    def add_image(self, image_path, node_stages=['extract_features'], edge_stages=['match']):
+        """
+        Adds an image node to the graph.  The image is connected to the
+        existing nodes whose footprints it intersects and the given stages
+        are applied to the new node and the new edges only.
 
         Parameters
         ----------
+        image_path : str
+                     PATH to the image
+
+        node_stages : list
+                      of Node method names or (name, kwargs) tuples
+                      applied to the new node
+
+        edge_stages : list
+                      of Edge method names or (name, kwargs) tuples
+                      applied to each new edge
+
+        Returns
+        -------
+        node_id : int
+                  The identifier of the new node
 
+        See Also
+        --------
+        autocnet.graph.scheduler.run
         """
+        tree, index_nodes = self.footprint_index
+
+        node_id = self.graph['node_counter']
+        node = Node(os.path.basename(image_path), image_path, node_id)
+        if self.maxsize:
+            node.maxsize = (self.maxsize, self.maxsize)
+        node.pyramid_path = self.graph.get('pyramid_path')
+        node.metadata = io_metadata.read_metadata(image_path)
+        self.add_node(node_id)
+        # The index is updated below rather than rebuilt
+        self._footprint_index = (tree, index_nodes)
+        self.node[node_id] = node
+        self.graph['node_name_map'][node['image_name']] = node_id
+        self.graph['node_counter'] += 1
+
+        fp = node.footprint
+        new_edges = []
+        if fp and fp.IsValid():
+            envelope = fp.GetEnvelope()
+            for i in tree.query(envelope):
+                neighbor = self.node[index_nodes[i]]
+                try:
+                    if not fp.Intersects(neighbor.footprint):
+                        continue
+                except:
+                    warnings.warn('Failed to calculated intersection between {} and {}'.format(node['image_name'],
+                                                                                               neighbor['image_name']))
+                    continue
+                self.add_edge(index_nodes[i], node_id)
+                e = self.edge[index_nodes[i]][node_id]
+                e.source = neighbor
+                e.destination = node
+                new_edges.append(e)
+            tree.insert(envelope)
+            index_nodes.append(node_id)
+        else:
+            warnings.warn('Missing or invalid geospatial data for {}'.format(node['image_name']))
+
+        for stage in node_stages:
+            name, kwargs = scheduler.parse_stage(stage)
+            band = kwargs.pop('band', 1)
+            pool.extract(node, name, kwargs=kwargs, band=band)
 
-        raise NotImplementedError
+        for e in new_edges:
+            for stage in edge_stages:
+                name, kwargs = scheduler.parse_stage(stage)
+                pool.apply(e, name, kwargs=kwargs)
 
-    def extract_features(self, band=1, *args, **kwargs):  # pragma: no cover
+        self._update_date()
+        return node_id
+
+    def _extract(self, function, nodes, band=1, parallel=False, nworkers=None, checkpoint=None,
+                 prefetch=None):
+        """
+        Apply a Node extraction method to a list of (node identifier, node,
+        args, kwargs) tuples, yielding the nodes as they complete.  Nodes
+        that a checkpoint records as complete are restored instead.
+        """
+        if checkpoint is not None:
+            stages = {}
+            pending = []
+            for n in nodes:
+                kwargs = dict(n[3], band=band) if band != 1 else n[3]
+                stages[n[0]] = io_checkpoint.stage_key(function, n[2], kwargs)
+                unit = io_checkpoint.node_unit(n[0])
+                if checkpoint.is_complete(stages[n[0]], unit):
+                    pool.restore(n[1], unit, checkpoint)
+                else:
+                    pending.append(n)
+            nodes = pending
+
+        if parallel is True:
+            executor = 'processes'
+        else:
+            executor = parallel or None
+        for i, node in pool.imap_nodes(nodes, function, band=band, executor=executor,
+                                       nworkers=nworkers, prefetch=prefetch):
+            if checkpoint is not None:
+                checkpoint.record(stages[i], io_checkpoint.node_unit(i), pool.get_state(node))
+            yield i, node
+
+    def extract_features(self, band=1, *args, parallel=False, nworkers=None,
+                         checkpoint=None, prefetch=None, **kwargs):  # pragma: no cover
         """
         Extracts features from each image in the graph and uses the result to assign the
         node attributes for 'handle', 'image', 'keypoints', and 'descriptors'.
-        """
-        for i, node in self.nodes_iter(data=True):
-            array = node.geodata.read_array(band=band)
-            node.extract_features(array, *args, **kwargs),
 
-    def extract_features_with_downsampling(self, downsample_amount=None, *args, **kwargs): # pragma: no cover
+        Parameters
+        ----------
+        band : int
+               The band to read.  Default: 1
+
+        parallel : bool or object
+                   If True, distribute the nodes across a pool of processes.
+                   If an autocnet.graph.distributed.Cluster, distribute the
+                   nodes across its workers.  Default: False
+
+        nworkers : int
+                   The number of processes to use when parallel is True.
+                   Default: the number of cpus
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object.  If given,
+                     each node is recorded as it completes and nodes that
+                     have already completed, with the same arguments, are
+                     restored rather than re-extracted.
+
+        prefetch : int
+                   If given, and parallel is False, the next images are read
+                   in a background thread while features are extracted from
+                   the current image, with at most prefetch (estimated)
+                   bytes read ahead.  Default: None, images are read when
+                   they are needed
+        """
+        nodes = [(i, node, args, kwargs) for i, node in self.nodes_iter(data=True)]
+        for i, node in self._extract('extract_features', nodes, band=band, parallel=parallel,
+                                     nworkers=nworkers, checkpoint=checkpoint,
+                                     prefetch=prefetch):
+            pass
+
+    def extract_features_with_downsampling(self, downsample_amount=None, *args,
+                                           parallel=False, nworkers=None,
+                                           checkpoint=None, **kwargs): # pragma: no cover
         """
         Extract interest points from a downsampled array.  The array is downsampled
         by the downsample_amount keyword using the Lanconz downsample amount.  If the
-        downsample keyword is not supplied, compute a downsampling constant as the
-        total array size divided by the network maxsize attribute.
+        downsample keyword is not supplied, compute a downsampling constant for each
+        node such that the downsampled array fits within the network maxsize attribute.
 
         Parameters
         ----------
 
         downsample_amount : int
                             The amount of downsampling to apply to the image
+
+        parallel : bool or object
+                   If True, distribute the nodes across a pool of processes.
+                   If an autocnet.graph.distributed.Cluster, distribute the
+                   nodes across its workers.  Default: False
+
+        nworkers : int
+                   The number of processes to use when parallel is True.
+                   Default: the number of cpus
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object
         """
+        nodes = []
         for i, node in self.nodes_iter(data=True):
-            if downsample_amount == None:
-                total_size = node.geodata.raster_size[0] * node.geodata.raster_size[1]
-                downsample_amount = math.ceil(total_size / self.maxsize**2)
-            node.extract_features_with_downsampling(downsample_amount, *args, **kwargs)
+            amount = downsample_amount
+            if amount == None:
+                # The per axis factor that brings the total size within maxsize**2
+                total_size = node.raster_size[0] * node.raster_size[1]
+                amount = max(math.sqrt(total_size / self.maxsize**2), 1)
+            nodes.append((i, node, (amount,) + args, kwargs))
+
+        for i, node in self._extract('extract_features_with_downsampling', nodes, parallel=parallel,
+                                     nworkers=nworkers, checkpoint=checkpoint):
+            pass
+
+    def extract_features_with_tiling(self, tilesize=1000, overlap=500, *args,
+                                     parallel=False, nworkers=None,
+                                     checkpoint=None, **kwargs): #pragma: no cover
+        """
+        Extract interest points from overlapping tiles of each image.
+
+        Parameters
+        ----------
+        tilesize : int
+                   The size of the square tiles in pixels
+
+        overlap : int
+                  The overlap between adjacent tiles in pixels
+
+        parallel : bool or object
+                   If True, distribute the nodes across a pool of processes.
+                   If an autocnet.graph.distributed.Cluster, distribute the
+                   nodes across its workers.  Default: False
+
+        nworkers : int
+                   The number of processes to use when parallel is True.
+                   Default: the number of cpus
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object
+
+        Returns
+        -------
+        dropped : dict
+                  with node identifiers as keys and the number of keypoints
+                  dropped from the tile overlaps of the node as values, see
+                  Node.extract_features_with_tiling
+        """
+        kwargs = dict(kwargs, tilesize=tilesize, overlap=overlap)
+        nodes = [(i, node, args, kwargs) for i, node in self.nodes_iter(data=True)]
+        dropped = {}
+        for i, node in self._extract('extract_features_with_tiling', nodes, parallel=parallel,
+                                     nworkers=nworkers, checkpoint=checkpoint):
+            dropped[i] = node.ndropped
+        return dropped
+
+    def extract_features_with_budget(self, budget, *args, overlap=0.1, max_tiles=100,
+                                     parallel=False, nworkers=None, checkpoint=None,
+                                     **kwargs):
+        """
+        Extract interest points from each image within a RAM budget.  Each
+        node is extracted whole if it fits within the budget, tiled if not,
+        or downsampled if tiling would take more than max_tiles tiles.
+
+        Parameters
+        ----------
+        budget : float
+                 The RAM budget in GB, see MAXSIZE
+
+        overlap : float
+                  The overlap between adjacent tiles as a fraction of the
+                  tile size
+
+        max_tiles : int
+                    The maximum number of tiles before an image is
+                    downsampled instead.  If None, images are never
+                    downsampled.
+
+        parallel : bool or object
+                   If True, distribute the nodes across a pool of processes.
+                   If an autocnet.graph.distributed.Cluster, distribute the
+                   nodes across its workers.  Default: False
+
+        nworkers : int
+                   The number of processes to use when parallel is True.
+                   Default: the number of cpus
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object
+
+        Returns
+        -------
+        plans : dict
+                with node identifiers as keys and (extraction method,
+                kwargs) tuples as values
 
-    def extract_features_with_tiling(self, tilesize=1000, overlap=500, *args, **kwargs): #pragma: no cover
+        See Also
+        --------
+        autocnet.graph.planner.plan
+        """
+        maxsize = maxsize_for_budget(budget)
+        plans = {}
+        groups = defaultdict(list)
         for i, node in self.nodes_iter(data=True):
-            print('Processing {}'.format(node['image_name']))
-            node.extract_features_with_tiling(tilesize=tilesize, overlap=overlap, *args, **kwargs)
+            node.maxsize = (maxsize, maxsize) if maxsize else None
+            name, plan_kwargs = planner.plan(node.raster_size, maxsize,
+                                             overlap=overlap, max_tiles=max_tiles)
+            plans[i] = (name, plan_kwargs)
+            groups[name].append((i, node, args, dict(kwargs, **plan_kwargs)))
+
+        for name, nodes in groups.items():
+            for i, node in self._extract(name, nodes, parallel=parallel,
+                                         nworkers=nworkers, checkpoint=checkpoint):
+                pass
+        return plans
+
+    def extract_features_from_overlaps(self, downsampling=False, tiling=False, parallel=False,
+                                       nworkers=None, checkpoint=None, **kwargs):
+        """
+        Extract interest points from each image only in the regions that
+        overlap the images it shares an edge with.  The minimum bounding
+        rectangles of the edges (source_mbr and destin_mbr) are computed for
+        edges that do not have them.
+
+        Parameters
+        ----------
+        downsampling : bool
+                       If True, the regions are downsampled by the
+                       downsample_amount keyword argument
+
+        tiling : bool
+                 If True, the regions are tiled using the tilesize and
+                 overlap keyword arguments
+
+        parallel : bool or object
+                   If True, distribute the nodes across a pool of processes.
+                   If an autocnet.graph.distributed.Cluster, distribute the
+                   nodes across its workers.  Default: False
+
+        nworkers : int
+                   The number of processes to use when parallel is True.
+                   Default: the number of cpus
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object
+
+        See Also
+        --------
+        autocnet.graph.node.Node.extract_features_from_overlaps
+        """
+        overlaps = defaultdict(list)
+        for s, d, edge in self.edges_iter(data=True):
+            if edge['source_mbr'] is None or edge['destin_mbr'] is None:
+                edge.compute_overlap()
+            overlaps[edge.source['node_id']].append(edge['source_mbr'])
+            overlaps[edge.destination['node_id']].append(edge['destin_mbr'])
+
+        nodes = [(i, node, (), dict(kwargs, overlaps=overlaps[i], downsampling=downsampling,
+                                    tiling=tiling))
+                 for i, node in self.nodes_iter(data=True) if overlaps[i]]
+        for i, node in self._extract('extract_features_from_overlaps', nodes, parallel=parallel,
+                                     nworkers=nworkers, checkpoint=checkpoint):
+            pass
 
     def extract_subsets(self, *args, **kwargs):
         """
         Extracts features from each image in those regions estimated to be
         overlapping.
 
-        *args and **kwargs are passed to the feature extractor.  For example,
-        passing method='sift' will cause the extractor to use the sift method.
+        **kwargs are passed to extract_features_from_overlaps and the
+        feature extractor.  For example, passing extractor_method='sift'
+        will cause the extractor to use the sift method.
+
+        See Also
+        --------
+        autocnet.graph.network.CandidateGraph.extract_features_from_overlaps
         """
-        for source, destination, e in self.edges_iter(data=True):
-            e.extract_subset(*args, **kwargs)
+        self.extract_features_from_overlaps(*args, **kwargs)
 
 
     def save_features(self, out_path, nodes=[], **kwargs):
@@ -304,6 +720,71 @@ class CandidateGraph(nx.Graph):
             else:
                 n.load_features(in_path, **kwargs)
 
+    def enable_out_of_core(self, path, max_bytes=2**30):
+        """
+        Move the node and edge payloads (keypoints, descriptors, matches,
+        and masks) into an on-disk store.  Payloads are then loaded on
+        access and held in memory up to max_bytes, with the least recently
+        used payloads written back (if modified) and released first.
+
+        While a node or edge method runs as a graph stage (e.g. match,
+        subpixel_register), the payloads of the node, or of the edge and
+        its nodes, are pinned in memory and those it owns are written back
+        afterwards, so methods may modify them in place.  Outside of a
+        stage, a payload reference (e.g. matches = edge.matches) goes stale
+        once the payload is evicted: in place modifications made through it
+        are lost unless the payload is assigned again (edge.matches =
+        matches) or marked with autocnet.io.store.touch before it is
+        evicted.
+
+        Parameters
+        ----------
+        path : str
+               The directory to hold the payloads
+
+        max_bytes : int
+                    The maximum number of payload bytes held in memory
+
+        See Also
+        --------
+        autocnet.io.store.PayloadStore
+        """
+        self.store = io_store.PayloadStore(path, max_bytes=max_bytes)
+        for i, node in self.nodes_iter(data=True):
+            io_store.attach(node, self.store)
+        for s, d, edge in self.edges_iter(data=True):
+            io_store.attach(edge, self.store)
+        self.store.flush()
+
+    def enable_pyramids(self, path, build=False, band=1):
+        """
+        Serve the images of the graph from persisted power-of-two image
+        pyramids, so that extraction, registration and plotting read the
+        level they need (memory mapped) rather than decoding the full image
+        again.  Pyramids are built on first use, or now if build is True.
+
+        Parameters
+        ----------
+        path : str
+               The directory to hold the pyramids, e.g. next to the project
+
+        build : bool
+                If True, build the pyramids of all images now
+
+        band : int
+               The band to build when build is True
+
+        See Also
+        --------
+        autocnet.graph.node.Node.get_array
+        autocnet.io.pyramid.Pyramid
+        """
+        self.graph['pyramid_path'] = path
+        for i, node in self.nodes_iter(data=True):
+            node.pyramid_path = path
+            if build:
+                node.pyramid(band=band)
+
     def match(self, *args, **kwargs):
         """
         For all connected edges in the graph, apply feature matching
@@ -355,6 +836,38 @@ class CandidateGraph(nx.Graph):
         """
         _, self.clusters = func(self, *args, **kwargs)
 
+    def compute_partitions(self, k, func=partition.partition, *args, **kwargs):
+        """
+        Split the graph into k balanced parts, e.g. for assignment to
+        workers, minimizing the descriptors shipped across the cut edges.
+
+        Parameters
+        ----------
+        k : int
+            The number of parts
+
+        func : object
+               The partitioning function to be applied.  Defaults to
+               autocnet.graph.partition.partition
+
+        args : list
+               of arguments to be passed through to the func
+
+        kwargs : dict
+                 of keyword arguments to be passed through to the func
+
+        Returns
+        -------
+        report : dict
+                 The size and expected data movement of each part
+
+        See Also
+        --------
+        autocnet.graph.partition.partition
+        """
+        self.partitions, report = func(self, k, *args, **kwargs)
+        return report
+
     def compute_triangular_cycles(self):
         """
         Find all cycles of length 3.  This is similar
@@ -373,13 +886,36 @@ class CandidateGraph(nx.Graph):
         >>> g.add_edges_from([(0,1), (0,2), (1,2), (0,3), (1,3), (2,3)])
         >>> g.compute_triangular_cycles()
         [(0, 1, 2), (0, 1, 3), (0, 2, 3), (1, 2, 3)]
+
+        See Also
+        --------
+        autocnet.graph.network.CandidateGraph.triangular_cycles_iter
         """
-        cycles = []
-        for s, d in self.edges_iter():
-            for n in self.nodes():
-                if(s,n) in self.edges() and (d,n) in self.edges():
-                    cycles.append((s,d,n))
-        return cycles
+        return list(self.triangular_cycles_iter())
+
+    def triangular_cycles_iter(self):
+        """
+        Generate all cycles of length 3, each exactly once.  Nodes are ranked
+        by their order in the graph and each triangle (a, b, c) is reported
+        from its lowest ranked node, with rank(a) < rank(b) < rank(c), by
+        intersecting the sets of higher ranked neighbors of a and b.
+
+        Yields
+        ------
+        cycle : tuple
+                (a, b, c) node identifiers
+        """
+        rank = {n: i for i, n in enumerate(self.nodes_iter())}
+        # Only the higher ranked neighbors are needed to find each triangle once
+        higher = {n: {m for m in self.adj[n] if rank[m] > rank[n]} for n in rank}
+
+        for a in sorted(rank, key=rank.get):
+            higher_a = higher[a]
+            for b in sorted(higher_a, key=rank.get):
+                common = higher_a & higher[b]
+                if common:
+                    for c in sorted(common, key=rank.get):
+                        yield a, b, c
 
     def minimum_spanning_tree(self):
         """
@@ -395,7 +931,8 @@ class CandidateGraph(nx.Graph):
         mst = nx.minimum_spanning_tree(self)
         return self.create_edge_subgraph(mst.edges())
 
-    def apply_func_to_edges(self, function, *args, **kwargs):
+    def apply_func_to_edges(self, function, *args, executor=None, nworkers=None,
+                            checkpoint=None, order=None, **kwargs):
         """
         Iterates over edges using an optional mask and and applies the given function.
         If func is not an attribute of Edge, raises AttributeError
@@ -407,17 +944,172 @@ class CandidateGraph(nx.Graph):
 
         graph_mask_keys : list
                           of keys in graph_masks
+
+        executor : {None, 'threads', 'processes'} or object
+                   If None (default), edges are processed serially.  Otherwise,
+                   edges are processed in parallel using a pool of threads or
+                   processes, or the workers of an
+                   autocnet.graph.distributed.Cluster, and the results are
+                   merged back into the graph.
+
+        nworkers : int
+                   The number of parallel workers.  Default: the number of cpus
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object.  If given,
+                     each edge is recorded as it completes and edges that
+                     have already completed the function, with the same
+                     arguments, are restored rather than recomputed.
+
+        order : {None, 'locality'}
+                The order edges are processed in when executor is None.  If
+                None, edges are processed in insertion order.  If
+                'locality', the edges of each node are processed close
+                together so that out-of-core graphs (see
+                enable_out_of_core) reload fewer node payloads.
+
+        See Also
+        --------
+        autocnet.graph.pool.imap_edges
+        autocnet.graph.scheduler.locality_order
+        """
+        for s, d, edge in self._imap_edges(function, args, kwargs, executor=executor,
+                                           nworkers=nworkers, checkpoint=checkpoint,
+                                           order=order):
+            pass
+
+    def _imap_edges(self, function, args, kwargs, executor=None, nworkers=None,
+                    checkpoint=None, order=None):
+        """
+        Apply an Edge method to every edge, yielding (s, d, edge) as each
+        edge completes.  Edges restored from the checkpoint are yielded
+        first.  See apply_func_to_edges.
         """
         if not isinstance(function, str):
             function = function.__name__
 
-        for s, d, edge in self.edges_iter(data=True):
-            try:
-                func = getattr(edge, function)
-            except:
+        edges = self.edges(data=True)
+        for s, d, edge in edges:
+            if not hasattr(edge, function):
                 raise AttributeError(function, ' is not an attribute of Edge')
-            else:
-                func(*args, **kwargs)
+
+        if checkpoint is not None:
+            stage = io_checkpoint.stage_key(function, args, kwargs)
+            pending = []
+            for s, d, edge in edges:
+                unit = io_checkpoint.edge_unit(s, d)
+                if checkpoint.is_complete(stage, unit):
+                    pool.restore(edge, unit, checkpoint)
+                    yield s, d, edge
+                else:
+                    pending.append((s, d, edge))
+            edges = pending
+
+        if order == 'locality':
+            edges = scheduler.locality_order(edges)
+        elif order is not None:
+            raise ValueError("Order must be one of: None, 'locality'")
+
+        for s, d, edge in pool.imap_edges(edges, function, args, kwargs,
+                                          executor=executor, nworkers=nworkers):
+            if checkpoint is not None:
+                checkpoint.record(stage, io_checkpoint.edge_unit(s, d), pool.get_state(edge))
+            yield s, d, edge
+
+    def imap_edge_results(self, function, *args, executor=None, nworkers=None,
+                          checkpoint=None, order=None, release=False, **kwargs):
+        """
+        Apply an Edge method to every edge, e.g. match or subpixel_register,
+        yielding the matches and masks of each edge as soon as it completes
+        rather than after the whole graph has finished.  With release=True
+        the payloads of each edge are dropped once the caller has consumed
+        them (e.g. written them to disk or a control network), so memory
+        stays flat regardless of the size of the graph.
+
+        Parameters
+        ----------
+        function : obj
+                   The Edge method, or its name, to apply to every edge
+
+        executor : {None, 'threads', 'processes'} or object
+                   See apply_func_to_edges
+
+        nworkers : int
+                   The number of parallel workers.  Default: the number of cpus
+
+        checkpoint : object
+                     See apply_func_to_edges
+
+        order : {None, 'locality'}
+                See apply_func_to_edges
+
+        release : bool
+                  If True, the matches and masks of each edge are reset to
+                  empty DataFrames when the next edge is requested.  With a
+                  parallel executor at most two edges per worker are in
+                  flight or awaiting the caller, so at most that many edges
+                  hold their payloads at once.
+
+        Yields
+        ------
+        s : hashable
+            The source node identifier
+
+        d : hashable
+            The destination node identifier
+
+        matches : DataFrame
+                  The matches of the edge
+
+        masks : DataFrame
+                The masks of the edge
+
+        See Also
+        --------
+        autocnet.graph.network.CandidateGraph.apply_func_to_edges
+        """
+        for s, d, edge in self._imap_edges(function, args, kwargs, executor=executor,
+                                           nworkers=nworkers, checkpoint=checkpoint,
+                                           order=order):
+            yield s, d, edge.matches, edge.masks
+            if release:
+                edge.matches = pd.DataFrame()
+                edge.masks = pd.DataFrame()
+
+    def run_pipeline(self, node_stages=['extract_features'], edge_stages=['match'],
+                     nworkers=None, checkpoint=None):
+        """
+        Apply a sequence of node stages followed by a sequence of edge
+        stages without a barrier between stages.  Each edge starts as
+        soon as both of its nodes have finished and each stage starts as
+        soon as the previous stage of the same node or edge has finished.
+
+        Parameters
+        ----------
+        node_stages : list
+                      of Node method names or (name, kwargs) tuples
+
+        edge_stages : list
+                      of Edge method names or (name, kwargs) tuples
+
+        nworkers : int
+                   The number of threads
+
+        checkpoint : object
+                     An autocnet.io.checkpoint.Checkpoint object used to
+                     record completed stages and to skip them on restart
+
+        Returns
+        -------
+        report : dict
+                 Timing information, including the critical path
+
+        See Also
+        --------
+        autocnet.graph.scheduler.run
+        """
+        return scheduler.run(self, node_stages=node_stages, edge_stages=edge_stages,
+                             nworkers=nworkers, checkpoint=checkpoint)
 
     def symmetry_checks(self):
         '''
@@ -456,15 +1148,41 @@ class CandidateGraph(nx.Graph):
         '''
         self.apply_func_to_edges('compute_fundamental_matrix', *args, **kwargs)
 
-    def subpixel_register(self, *args, **kwargs):
+    def subpixel_register(self, *args, prefetch=None, **kwargs):
         '''
         Compute subpixel offsets for all edges using identical parameters
 
+        Parameters
+        ----------
+        prefetch : int
+                   If given, the edges are registered serially, in locality
+                   order, and the images of the next edges are read in a
+                   background thread while the current edge is registered,
+                   with at most prefetch (estimated) bytes read ahead.  Full
+                   bands are prefetched, so prefetch can not be combined
+                   with tiled=True, which reads only the template and
+                   search windows.  Default: None, see apply_func_to_edges
+
         See Also
         --------
         autocnet.graph.edge.Edge.subpixel_register
+        autocnet.io.prefetch.prefetch
         '''
-        self.apply_func_to_edges('subpixel_register', *args, **kwargs)
+        if not prefetch:
+            self.apply_func_to_edges('subpixel_register', *args, **kwargs)
+            return
+        if kwargs.get('tiled'):
+            raise ValueError('Prefetching reads full bands and can not be combined with tiled registration')
+
+        def read(e):
+            return e[2].source.get_array(), e[2].destination.get_array()
+
+        def nbytes(e):
+            return io_prefetch.raster_nbytes(e[2].source) + io_prefetch.raster_nbytes(e[2].destination)
+
+        edges = scheduler.locality_order(self.edges(data=True))
+        for (s, d, edge), images in io_prefetch.prefetch(edges, read, nbytes, max_bytes=prefetch):
+            pool.apply(edge, 'subpixel_register', args, dict(kwargs, images=images))
 
     def suppress(self, *args, **kwargs):
         '''
@@ -478,13 +1196,100 @@ class CandidateGraph(nx.Graph):
 
     def overlap(self):
         '''
-        Compute the percentage and area coverage of two images
+        Compute the percentage and area coverage of two images for every
+        edge.  The overlaps are computed in bulk, reading each node
+        footprint once (from the cached metadata when available) rather
+        than once per edge.  Edges with a missing footprint are skipped.
 
         See Also
         --------
-        autocnet.cg.cg.two_image_overlap
+        autocnet.cg.cg.two_poly_overlap
+        '''
+        footprints = {i: node.footprint for i, node in self.nodes_iter(data=True)}
+        for s, d, edge in self.edges_iter(data=True):
+            poly1 = footprints[s]
+            poly2 = footprints[d]
+            if not poly1 or not poly2:
+                continue
+            overlapinfo = cg.two_poly_overlap(poly1, poly2)
+            edge['weights']['overlap_area'] = overlapinfo[1]
+            edge['weights']['overlap_percn'] = overlapinfo[0]
+
+    def prune_edges(self, min_area=0, min_percentage=0, func=sparsify.prune):
         '''
-        self.apply_func_to_edges('overlap')
+        Remove the edges whose images barely overlap before matching.  Edges
+        below either threshold are removed, unless they are needed to keep
+        a connected component of the graph connected.  The overlap weights
+        are computed for edges that do not have them.
+
+        Parameters
+        ----------
+        min_area : float
+                   The minimum overlap area of a kept edge
+
+        min_percentage : float
+                         The minimum overlap percentage of a kept edge
+
+        func : object
+               The function selecting the edges to remove.  Defaults to
+               autocnet.graph.sparsify.prune
+
+        Returns
+        -------
+        report : dict
+                 The number of edges and the estimated work removed
+
+        See Also
+        --------
+        autocnet.graph.sparsify.prune
+        '''
+        if any('overlap_area' not in e['weights'] for s, d, e in self.edges_iter(data=True)):
+            self.overlap()
+        removed, report = func(self, min_area=min_area, min_percentage=min_percentage)
+        self.remove_edges_from(removed)
+        self._update_date()
+        return report
+
+    def sparse_subgraph(self, k=2, func=sparsify.spanning_forests, **kwargs):
+        """
+        Create a read-only, k-edge-connected spanning subgraph view that
+        prefers the edges with the largest overlaps.  Dense strips, where
+        each image overlaps many others, can then be matched at a cost
+        linear in the number of images, e.g. with
+        graph.sparse_subgraph(2).run_pipeline(), while k controls the
+        redundancy of the control network.  The overlap weights are
+        computed for edges that do not have them.
+
+        Parameters
+        ----------
+        k : int
+            The edge connectivity to preserve.  k=1 is a maximum spanning
+            tree (forest).
+
+        func : object
+               The function selecting the edges to keep.  Defaults to
+               autocnet.graph.sparsify.spanning_forests
+
+        kwargs : dict
+                 of keyword arguments to be passed through to the func
+
+        Returns
+        -------
+        H : object
+            A CandidateGraphView with all of the nodes.  The selection
+            report, with the number of edges and the estimated work kept,
+            is held in H.graph['sparsify'].
+
+        See Also
+        --------
+        autocnet.graph.sparsify.spanning_forests
+        """
+        if any('overlap_area' not in e['weights'] for s, d, e in self.edges_iter(data=True)):
+            self.overlap()
+        kept, report = func(self, k, **kwargs)
+        H = CandidateGraphView(self, filter_edge=views.ShowEdges(kept))
+        H.graph['sparsify'] = report
+        return H
 
     def to_filelist(self):
         """
@@ -589,8 +1394,9 @@ class CandidateGraph(nx.Graph):
 
     def create_edge_subgraph(self, edges):
         """
-        Create a subgraph using a list of edges.
-        This is pulled directly from the networkx dev branch.
+        Create a read-only subgraph view using a list of edges.  The view
+        filters the topology of this graph lazily, so node and edge
+        attribute changes are shared with this graph.
 
         Parameters
         ----------
@@ -601,30 +1407,13 @@ class CandidateGraph(nx.Graph):
         Returns
         -------
         H : object
-            A networkx subgraph object
+            A CandidateGraphView
         """
-        H = self.__class__()
         adj = self.adj
         # Filter out edges that don't correspond to nodes in the graph.
-        edges = ((u, v) for u, v in edges if u in adj and v in adj[u])
-        for u, v in edges:
-            # Copy the node attributes if they haven't been copied
-            # already.
-            if u not in H.node:
-                H.node[u] = self.node[u]
-            if v not in H.node:
-                H.node[v] = self.node[v]
-            # Create an entry in the adjacency dictionary for the
-            # nodes u and v if they don't exist yet.
-            if u not in H.adj:
-                H.adj[u] = H.adjlist_dict_factory()
-            if v not in H.adj:
-                H.adj[v] = H.adjlist_dict_factory()
-            # Copy the edge attributes.
-            H.edge[u][v] = self.edge[u][v]
-            # H.edge[v][u] = self.edge[v][u]
-        H.graph = self.graph
-        return H
+        edges = [(u, v) for u, v in edges if u in adj and v in adj[u]]
+        nodes = views.ShowNodes(n for e in edges for n in e)
+        return CandidateGraphView(self, nodes, views.ShowEdges(edges))
 
     def size(self, weight=None):
         """
@@ -650,11 +1439,11 @@ class CandidateGraph(nx.Graph):
 
     def create_node_subgraph(self, nodes):
         """
-        Given a list of nodes, create a sub-graph and
-        copy both the node and edge attributes to the subgraph.
-        Changes to node/edge attributes are propagated back to the
-        parent graph, while changes to the graph structure, i.e.,
-        the topology, are not.
+        Given a list of nodes, create a read-only subgraph view.  The view
+        filters the topology of this graph lazily, so node and edge
+        attribute changes are shared with this graph, while the topology
+        of the view can not be changed.  Use copy() on the view to create
+        an independent, mutable graph.
 
         Parameters
         ----------
@@ -665,28 +1454,10 @@ class CandidateGraph(nx.Graph):
         Returns
         -------
         H : object
-            A networkX graph object
-
-        """
-        bunch = set(self.nbunch_iter(nodes))
-        # create new graph and copy subgraph into it
-        H = self.__class__()
-
-        # copy node and attribute dictionaries
-        for n in bunch:
-            H.node[n] = self.node[n]
-        # namespace shortcuts for speed
-        H_adj = H.adj
-        self_adj = self.adj
-        for i in H.node:
-            adj_nodes = set(self.adj[i].keys()).intersection(bunch)
-            H.adj[i] = {}
-            for j, edge in self.adj[i].items():
-                if j in adj_nodes:
-                    H.adj[i][j] = edge
-
-        H.graph = self.graph
-        return H
+            A CandidateGraphView
+
+        """
+        return CandidateGraphView(self, views.ShowNodes(self.nbunch_iter(nodes)))
 
     def subgraph_from_matches(self):
         """
@@ -696,19 +1467,15 @@ class CandidateGraph(nx.Graph):
         Returns
         -------
         : Object
-          A networkX graph object
+          A CandidateGraphView
         """
-
-        # get all edges that have matches
-        matches = [(u, v) for u, v, edge in self.edges_iter(data=True)
-                   if not edge.matches.empty]
-
-        return self.create_edge_subgraph(matches)
+        return self.filter_edges(lambda edge: not edge.matches.empty)
 
     def filter_nodes(self, func, *args, **kwargs):
         """
         Filters graph and returns a sub-graph from matches. Mimics
-        python's filter() function
+        python's filter() function.  The filter is applied lazily, each
+        time the view is accessed.
 
         Parameters
         ----------
@@ -717,16 +1484,19 @@ class CandidateGraph(nx.Graph):
         Returns
         -------
         : Object
-          A networkX graph object
+          A CandidateGraphView
 
         """
-        nodes = [n for n, d in self.nodes_iter(data=True) if func(d, *args, **kwargs)]
-        return self.create_node_subgraph(nodes)
+        def filter_node(n):
+            return func(self.node[n], *args, **kwargs)
+        return CandidateGraphView(self, filter_node)
 
     def filter_edges(self, func, *args, **kwargs):
         """
         Filters graph and returns a sub-graph from matches. Mimics
-        python's filter() function
+        python's filter() function.  The filter is evaluated once, when the
+        view is created, and nodes without a remaining edge are removed.
+        Later changes to the edges are not reflected in the view.
 
         Parameters
         ----------
@@ -735,7 +1505,69 @@ class CandidateGraph(nx.Graph):
         Returns
         -------
         : Object
-          A networkX graph object
+          A CandidateGraphView
         """
-        edges = [(u, v) for u, v, edge in self.edges_iter(data=True) if func(edge, *args, **kwargs)]
-        return self.create_edge_subgraph(edges)
+        edges = [(u, v) for u, v, e in self.edges_iter(data=True) if func(e, *args, **kwargs)]
+        nodes = views.ShowNodes(n for e in edges for n in e)
+        return CandidateGraphView(self, nodes, views.ShowEdges(edges))
+
+
+@views.read_only
+class CandidateGraphView(CandidateGraph):
+    """
+    A read-only subgraph view of a CandidateGraph.  The view holds no
+    topology of its own, the nodes and edges of the parent graph are
+    filtered lazily on access, so a view is created in constant time.
+    Node and Edge objects are shared with the parent, so stages applied to
+    a view (e.g. extract_features, match) update the parent, while the
+    topology of a view can not be modified.  Graph attributes set on the
+    view are not propagated to the parent.
+
+    Parameters
+    ----------
+    parent : object
+             The CandidateGraph (or view) to filter
+
+    filter_node : callable
+                  Returns True for the node identifiers to keep
+
+    filter_edge : callable
+                  Returns True for the (u, v) edges to keep
+
+    See Also
+    --------
+    autocnet.graph.views
+    """
+    _mutators = ('add_image',)
+
+    def __init__(self, parent, filter_node=views.no_filter, filter_edge=views.no_filter):
+        self.parent = parent
+        self.graph = ChainMap({}, parent.graph)
+        self.node = views.FilteredNodes(parent.node, filter_node)
+        self.adj = views.FilteredAdjacency(parent.adj, filter_node, filter_edge)
+        self.edge = self.adj
+
+    def subgraph(self, nbunch):
+        return self.create_node_subgraph(nbunch)
+
+    def copy(self):
+        """
+        Create an independent, mutable CandidateGraph from the view.  As with
+        networkx.Graph.copy, the node and edge attributes are deep copied.
+
+        Returns
+        -------
+        H : object
+            A CandidateGraph
+        """
+        H = CandidateGraph()
+        memo = {}
+        H.graph = deepcopy(dict(self.graph), memo)
+        for n, node in self.nodes_iter(data=True):
+            H.node[n] = deepcopy(node, memo)
+            H.adj[n] = H.adjlist_dict_factory()
+        for u, v, edge in self.edges_iter(data=True):
+            edge = deepcopy(edge, memo)
+            H.adj[u][v] = edge
+            H.adj[v][u] = edge
+        return H
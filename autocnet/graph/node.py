@@ -1,10 +1,14 @@
 from collections import defaultdict, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 import itertools
+import math
 import os
+import threading
 import warnings
 
 import numpy as np
 import pandas as pd
+from osgeo import gdal, ogr
 from plio.io.io_gdal import GeoDataset
 from plio.io.isis_serial_number import generate_serial_number
 from scipy.misc import bytescale, imresize
@@ -13,6 +17,8 @@ from autocnet.cg import cg
 from autocnet.control.control import Correspondence, Point
 
 from autocnet.io import keypoints as io_keypoints
+from autocnet.io import pyramid as io_pyramid
+from autocnet.io import store as io_store
 
 from autocnet.matcher.add_depth import deepen_correspondences
 from autocnet.matcher import cpu_extractor as fe
@@ -24,6 +30,63 @@ from autocnet.vis.graph_view import plot_node
 from autocnet.utils import utils
 
 
+# The name of the GDAL resampling algorithm for each of the scipy.misc.imresize
+# interp names (plus average) used by Node.read_decimated
+RESAMPLING = {'average': 'GRIORA_Average',
+              'nearest': 'GRIORA_NearestNeighbour',
+              'bilinear': 'GRIORA_Bilinear',
+              'bicubic': 'GRIORA_Cubic',
+              'cubic': 'GRIORA_Cubic',
+              'lanczos': 'GRIORA_Lanczos'}
+
+
+def _resample_kwargs(interp):
+    """
+    The ReadAsArray keyword arguments selecting the resampling algorithm of
+    a decimated read.  Resampling algorithms were added in GDAL 2.0, older
+    versions decimate by nearest neighbour.
+    """
+    algorithm = getattr(gdal, RESAMPLING[interp], None)
+    if algorithm is None:
+        return {}
+    return {'resample_alg': algorithm}
+
+
+def _axis_tiles(start, size, tilesize, stepsize):
+    """
+    The (start, stop) tiles covering size pixels from start along one axis.
+    """
+    if tilesize >= size:
+        return [(start, start + size)]
+    starts = range(0, size, stepsize)
+    stops = range(tilesize, size, stepsize)
+    tiles = list(zip(starts, stops))
+    tiles.append((tiles[-1][0] + stepsize, size))
+    return [(start + a, start + b) for a, b in tiles]
+
+
+def _owning_tile(values, tiles):
+    """
+    The index of the tile owning each coordinate along one axis.  Adjacent
+    tiles split their overlap at its middle.
+
+    Parameters
+    ----------
+    values : ndarray
+             of coordinates
+
+    tiles : list
+            of (start, stop) tiles, ordered by start
+
+    Returns
+    -------
+     : ndarray
+       of tile indices
+    """
+    borders = [(start + stop) / 2 for (_, stop), (start, _) in zip(tiles[:-1], tiles[1:])]
+    return np.searchsorted(borders, values, side='right')
+
+
 class Node(dict, MutableMapping):
     """
     This class represents a node in a graph and is synonymous with an
@@ -57,7 +120,30 @@ class Node(dict, MutableMapping):
     isis_serial : str
                   If the input images have PVL headers, generate an
                   ISIS compatible serial number
+
+    metadata : dict
+               Cached image metadata (footprint WKT, raster_size,
+               isis_serial, latlon_corners) used in place of opening
+               the image.  See autocnet.io.metadata.scan
+
+    maxsize : tuple
+              (samples, lines) maximum size of an array passed to
+              extract_features, or None if the size is not limited.
+              Set by the parent CandidateGraph.
+
+    pyramid_path : str
+                   The directory holding the persisted image pyramid
+                   (see get_array and pyramid), or None to read the
+                   image directly.  Set by the parent CandidateGraph.
+
+    ndropped : int
+               The number of keypoints dropped from the tile overlaps by
+               the last extract_features_with_tiling
     """
+    # The potentially large attributes that can be held in a PayloadStore
+    _payloads = ('keypoints', 'descriptors')
+    keypoints = io_store.StoredAttribute('keypoints', pd.DataFrame)
+    descriptors = io_store.StoredAttribute('descriptors')
 
     def __init__(self, image_name=None, image_path=None, node_id=None):
         self['image_name'] = image_name
@@ -70,6 +156,10 @@ class Node(dict, MutableMapping):
         self.descriptors = None
         self.keypoints = pd.DataFrame()
         self.masks = pd.DataFrame()
+        self.metadata = {}
+        self.maxsize = None
+        self.pyramid_path = None
+        self.ndropped = 0
 
     def __repr__(self):
         return """
@@ -94,6 +184,21 @@ class Node(dict, MutableMapping):
                 if not v.all() == o[k].all():
                     eq = False
         return eq
+
+    def __getstate__(self):
+        # The GDAL handle (and its lock) can not be pickled, it is lazily
+        # re-opened on access
+        state = self.__dict__.copy()
+        state.pop('_geodata', None)
+        state.pop('_geodata_lock', None)
+        io_store.materialize(self, state)
+        return state
+
+    def payload_key(self, name):
+        """
+        The key used to hold a payload (e.g. the keypoints) in a PayloadStore
+        """
+        return 'node_{}_{}'.format(self['node_id'], name)
     """
     def __getitem__(self, item):
         attribute_dict = {'image_name': self['image_name'],
@@ -110,10 +215,22 @@ class Node(dict, MutableMapping):
             return super(Node, self).__getitem__(item)
     """
 
+    @property
+    def geodata_lock(self):
+        """
+        The lock serializing access to the (not thread-safe) GDAL handle of
+        the node, e.g. when edges sharing the node are processed by a pool
+        of threads
+        """
+        # dict.setdefault is atomic, so threads always share a single lock
+        return self.__dict__.setdefault('_geodata_lock', threading.RLock())
+
     @property
     def geodata(self):
         if not getattr(self, '_geodata', None) and self['image_path'] is not None:
-            self._geodata = GeoDataset(self['image_path'])
+            with self.geodata_lock:
+                if not getattr(self, '_geodata', None):
+                    self._geodata = GeoDataset(self['image_path'])
             return self._geodata
         if hasattr(self, '_geodata'):
             return self._geodata
@@ -152,12 +269,36 @@ class Node(dict, MutableMapping):
         has a PVL header.
         """
         if not hasattr(self, '_isis_serial'):
+            if 'isis_serial' in self.metadata:
+                self._isis_serial = self.metadata['isis_serial']
+                return self._isis_serial
             try:
                 self._isis_serial = generate_serial_number(self['image_path'])
             except:
                 self._isis_serial = None
         return self._isis_serial
 
+    @property
+    def footprint(self):
+        """
+        The footprint of the image as an OGR geometry.  The cached metadata
+        is used when available, otherwise the image is opened.
+        """
+        if 'footprint' in self.metadata:
+            wkt = self.metadata['footprint']
+            return ogr.CreateGeometryFromWkt(wkt) if wkt else None
+        return self.geodata.footprint
+
+    @property
+    def raster_size(self):
+        """
+        The size of the image in pixels.  The cached metadata is used when
+        available, otherwise the image is opened.
+        """
+        if 'raster_size' in self.metadata:
+            return tuple(self.metadata['raster_size'])
+        return self.geodata.raster_size
+
     @property
     def nkeypoints(self):
         return len(self.keypoints)
@@ -199,10 +340,10 @@ class Node(dict, MutableMapping):
                The band to read, default 1
         """
 
-        array = self.geodata.read_array(band=band)
+        array = self.get_array(band=band)
         return bytescale(array)
 
-    def get_array(self, band=1):
+    def get_array(self, band=1, level=0):
         """
         Get a band as a 32-bit numpy array
 
@@ -210,11 +351,47 @@ class Node(dict, MutableMapping):
         ----------
         band : int
                The band to read, default 1
+
+        level : int
+                The pyramid level, i.e. the band reduced by a factor of
+                2**level.  If pyramid_path is set, the level is served
+                (memory mapped) from the persisted pyramid, which is built
+                on first use.  Otherwise the band is read and reduced.
+                Default 0, full resolution
         """
+        if self.pyramid_path is not None:
+            return self.pyramid(band=band).read(level)
 
-        array = self.geodata.read_array(band=band)
+        with self.geodata_lock:
+            array = self.geodata.read_array(band=band)
+        for i in range(level):
+            array = io_pyramid.reduce(array)
         return array
 
+    def pyramid(self, band=1):
+        """
+        The persisted power-of-two pyramid of a band of the image, in the
+        pyramid_path directory.  The pyramid is built, from a single read
+        of the band, if it does not exist or is older than the image.
+
+        Parameters
+        ----------
+        band : int
+               The band, default 1
+
+        Returns
+        -------
+         : object
+           An autocnet.io.pyramid.Pyramid
+        """
+        if self.pyramid_path is None:
+            raise AttributeError('The pyramid_path of node {} is not set.'.format(self['node_id']))
+        pyramid = io_pyramid.Pyramid(self.pyramid_path, self['image_path'], band=band)
+        with self.geodata_lock:
+            if not pyramid.is_current():
+                pyramid.build(self.geodata.read_array(band=band))
+        return pyramid
+
     def get_keypoints(self, index=None):
         """
         Return the keypoints for the node.  If index is passed, return
@@ -276,27 +453,47 @@ class Node(dict, MutableMapping):
         """
         pass
 
-    def extract_features(self, array, xystart=[], *args, **kwargs):
+    def _check_array_size(self, array):
+        """
+        Warn if an array is larger than the maximum extraction size
+        """
         arraysize = array.shape[0] * array.shape[1]
 
-        try:
+        if self.maxsize:
             maxsize = self.maxsize[0] * self.maxsize[1]
-        except:
+        else:
             maxsize = np.inf
 
         if arraysize > maxsize:
             warnings.warn('Node: {}. Maximum feature extraction array size is {}.  Maximum array size is {}. Please use tiling or downsampling.'.format(self['node_id'], maxsize, arraysize))
 
+    def extract_features(self, array, xystart=[], *args, **kwargs):
+        self._check_array_size(array)
+
         keypoints, descriptors = Node._extract_features(array, *args, **kwargs)
-        count = len(self.keypoints)
 
         if xystart:
             keypoints['x'] += xystart[0]
             keypoints['y'] += xystart[1]
 
+        self._add_features(keypoints, descriptors)
+
+    def _add_features(self, keypoints, descriptors):
+        """
+        Merge newly extracted keypoints and descriptors into those already
+        associated with the node, removing duplicated keypoints.
+
+        Parameters
+        ----------
+        keypoints : dataframe
+                    of new keypoints
+
+        descriptors : ndarray
+                      of new descriptors
+        """
+        count = len(self.keypoints)
         self.keypoints = pd.concat((self.keypoints, keypoints))
-        descriptor_mask = self.keypoints.duplicated()[count:]
-        number_new = descriptor_mask.sum()
+        descriptor_mask = self.keypoints.duplicated().values[count:]
 
         # Removed duplicated and re-index the merged keypoints
         self.keypoints.drop_duplicates(inplace=True)
@@ -305,13 +502,76 @@ class Node(dict, MutableMapping):
         if self.descriptors is not None:
             self.descriptors = np.concatenate((self.descriptors, descriptors[~descriptor_mask]))
         else:
-            self.descriptors = descriptors
+            self.descriptors = descriptors[~descriptor_mask]
 
     def extract_features_from_overlaps(self, overlaps=[], downsampling=False, tiling=False, *args, **kwargs):
-        # iterate through the overlaps
-        # check for downsampling or tiling and dispatch as needed to that func
-        # that should then dispatch to the extract features func
-        pass
+        """
+        Extract interest points only from the regions of this node (image)
+        that overlap other images, e.g. the source_mbr or destin_mbr of the
+        incident edges.  The union of the overlaps is decomposed into
+        disjoint rectangles, so that each overlapping pixel is read and
+        processed once, and the extraction memory scales with the overlap
+        area rather than the image size.
+
+        Parameters
+        ----------
+        overlaps : list
+                   of (minx, maxx, miny, maxy) minimum bounding rectangles
+                   in pixel space
+
+        downsampling : bool
+                       If True, each region is downsampled by the
+                       downsample_amount keyword argument before extraction
+
+        tiling : bool
+                 If True, each region is extracted from overlapping tiles
+                 using the tilesize, overlap and nthreads keyword arguments,
+                 see extract_features_with_tiling
+
+        Returns
+        -------
+        regions : list
+                  of the disjoint (minx, maxx, miny, maxy) regions extracted
+
+        See Also
+        --------
+        autocnet.cg.cg.disjoint_rectangles
+        """
+        tilesize = kwargs.pop('tilesize', 1000)
+        overlap = kwargs.pop('overlap', 500)
+        nthreads = kwargs.pop('nthreads', 1)
+        downsample_amount = kwargs.pop('downsample_amount', 1)
+
+        # Clip the overlaps to the image and snap them to whole pixels
+        samples, lines = self.raster_size
+        clipped = []
+        for minx, maxx, miny, maxy in overlaps:
+            clipped.append((max(int(np.floor(minx)), 0), min(int(np.ceil(maxx)), samples),
+                            max(int(np.floor(miny)), 0), min(int(np.ceil(maxy)), lines)))
+        regions = [tuple(int(v) for v in r) for r in cg.disjoint_rectangles(clipped)]
+
+        results = []
+        for minx, maxx, miny, maxy in regions:
+            pixels = [minx, miny, maxx - minx, maxy - miny]
+            if tiling:
+                keypoints, descriptors, _ = self._extract_tiles(pixels, tilesize, overlap, args,
+                                                                kwargs, nthreads=nthreads)
+            elif downsampling:
+                shape = (max(int(pixels[3] / downsample_amount), 1),
+                         max(int(pixels[2] / downsample_amount), 1))
+                array = imresize(self._read_window(pixels), shape, interp='lanczos')
+                self._check_array_size(array)
+                keypoints, descriptors = Node._extract_features(array, *args, **kwargs)
+                keypoints['x'] = keypoints['x'] * (pixels[2] / shape[1]) + minx
+                keypoints['y'] = keypoints['y'] * (pixels[3] / shape[0]) + miny
+            else:
+                keypoints, descriptors = self._extract_window(pixels, args, kwargs)
+            results.append((keypoints, descriptors))
+
+        if results:
+            self._add_features(pd.concat([k for k, d in results]),
+                               np.concatenate([d for k, d in results]))
+        return regions
 
     def extract_features_with_downsampling(self, downsample_amount,
                                            array_read_args={},
@@ -321,56 +581,229 @@ class Node(dict, MutableMapping):
         then applying the extractor, and then upsampling the results backin to
         true image space.
 
+        Unless the image is served from a pyramid (see pyramid_path) or
+        array_read_args holds more than the band, the band is read already
+        decimated (see read_decimated), so the full resolution band is
+        never held in memory.
+
         Parameters
         ----------
-        downsample_amount : int
+        downsample_amount : float
                             The amount to downsample by
+
+        array_read_args : dict
+                          of keyword arguments passed to the read, e.g. band
+
+        interp : str
+                 The resampling algorithm
         """
-        array_size = self.geodata.raster_size
-        total_size = array_size[0] * array_size[1]
-        shape = (int(array_size[0] / downsample_amount),
-                 int(array_size[1] / downsample_amount))
-        array = imresize(self.geodata.read_array(**array_read_args), shape, interp=interp)
+        samples, lines = self.geodata.raster_size
+        # (lines, samples) of the downsampled array
+        shape = (int(lines / downsample_amount),
+                 int(samples / downsample_amount))
+        if self.pyramid_path is not None and set(array_read_args) <= {'band'}:
+            # Resample from the finest pyramid level that is at least as
+            # large as the output, rather than from the full resolution band
+            level = max(int(math.log2(downsample_amount)), 0)
+            level = min(level, io_pyramid.nlevels((lines, samples)) - 1)
+            array = imresize(self.get_array(level=level, **array_read_args), shape, interp=interp)
+        elif set(array_read_args) <= {'band'}:
+            array = self.read_decimated(shape, interp=interp, **array_read_args)
+        else:
+            with self.geodata_lock:
+                array = self.geodata.read_array(**array_read_args)
+            array = imresize(array, shape, interp=interp)
         self.extract_features(array, *args, **kwargs)
-        self.keypoints['x'] *= downsample_amount
-        self.keypoints['y'] *= downsample_amount
+        self.keypoints['x'] *= samples / shape[1]
+        self.keypoints['y'] *= lines / shape[0]
+
+    def read_decimated(self, shape, band=1, interp='average'):
+        """
+        Read a band at a reduced resolution, asking the raster driver for a
+        decimated buffer rather than reading the full resolution band and
+        resizing it.  If the band has overviews, GDAL reads from the
+        closest one.  Otherwise the band is read in strips of full
+        resolution lines, each decimated as it is read, so that the peak
+        memory is proportional to the output size rather than the image
+        size.
+
+        Parameters
+        ----------
+        shape : tuple
+                (lines, samples) of the output array
+
+        band : int
+               The band to read, default 1
+
+        interp : {'average', 'nearest', 'bilinear', 'bicubic', 'cubic', 'lanczos'}
+                 The resampling algorithm.  With GDAL < 2.0 the band is
+                 decimated by nearest neighbour.
+
+        Returns
+        -------
+        array : ndarray
+                of the given shape
+        """
+        resample = _resample_kwargs(interp)
+        # The GDAL handle is shared by the threads reading the node
+        with self.geodata_lock:
+            raster_band = self.geodata.dataset.GetRasterBand(band)
+            samples, lines = raster_band.XSize, raster_band.YSize
+            out_lines, out_samples = shape
+
+            if raster_band.GetOverviewCount() > 0:
+                return raster_band.ReadAsArray(0, 0, samples, lines, buf_xsize=out_samples,
+                                               buf_ysize=out_lines, **resample)
+
+            # Strips of about as many full resolution pixels as the output
+            scale = lines / out_lines
+            strip = max(int(out_lines * out_samples / (samples * scale)), 1)
+            array = None
+            for start in range(0, out_lines, strip):
+                stop = min(start + strip, out_lines)
+                ystart = int(round(start * scale))
+                ystop = max(int(round(stop * scale)), ystart + 1)
+                data = raster_band.ReadAsArray(0, ystart, samples, ystop - ystart,
+                                               buf_xsize=out_samples, buf_ysize=stop - start,
+                                               **resample)
+                if array is None:
+                    array = np.empty(shape, dtype=data.dtype)
+                array[start:stop] = data
+            return array
+
+    def extract_features_with_tiling(self, tilesize=1000, overlap=500, *args, nthreads=1, **kwargs):
+        """
+        Extract interest points for this node (image) from overlapping
+        tiles.  Each tile is read with a windowed read and the keypoints and
+        descriptors of the tiles are collected and merged once, in tile
+        order, so the result does not depend on the number of threads.
+        Keypoints found in the overlap of two tiles are kept from the tile
+        owning their location only, so that a location seen by several
+        tiles yields one keypoint even if the detections differ slightly.
+
+        Parameters
+        ----------
+        tilesize : int
+                   The size of the square tiles in pixels
+
+        overlap : int
+                  The overlap between adjacent tiles in pixels
+
+        nthreads : int
+                   The number of threads processing tiles concurrently.  Each
+                   thread reads through its own image handle and reuses its
+                   own detector.  Peak memory grows with the number of tiles
+                   in flight, so the default is 1.
 
-    def extract_features_with_tiling(self, tilesize=1000, overlap=500, *args, **kwargs):
+        Returns
+        -------
+        dropped : int
+                  The number of keypoints dropped because they were found
+                  in the overlap of a tile with a neighbor owning the
+                  location
+        """
         array_size = self.geodata.raster_size
+        keypoints, descriptors, dropped = self._extract_tiles([0, 0, array_size[0], array_size[1]],
+                                                              tilesize, overlap, args, kwargs,
+                                                              nthreads=nthreads)
+        self._add_features(keypoints, descriptors)
+        self.ndropped = dropped
+        return dropped
+
+    def _read_window(self, pixels, handles=None):
+        """
+        Read a window of the image.  If handles, a threading.local, is
+        given, each thread reads through its own GDAL handle.
+        """
+        if handles is None:
+            with self.geodata_lock:
+                return self.geodata.read_array(pixels=pixels)
+        if not hasattr(handles, 'geodata'):
+            handles.geodata = GeoDataset(self['image_path'])
+        return handles.geodata.read_array(pixels=pixels)
+
+    def _extract_window(self, pixels, args, kwargs, handles=None):
+        """
+        Extract the keypoints and descriptors of a window of the image,
+        without merging them into the node.
+
+        Parameters
+        ----------
+        pixels : list
+                 [xstart, ystart, xcount, ycount] of the window
+
+        Returns
+        -------
+        keypoints : dataframe
+                    in image coordinates
+
+        descriptors : ndarray
+        """
+        array = self._read_window(pixels, handles)
+        self._check_array_size(array)
+        keypoints, descriptors = Node._extract_features(array, *args, **kwargs)
+        keypoints['x'] += pixels[0]
+        keypoints['y'] += pixels[1]
+        return keypoints, descriptors
+
+    def _extract_tiles(self, window, tilesize, overlap, args, kwargs, nthreads=1):
+        """
+        Extract the keypoints and descriptors of overlapping tiles of a
+        window of the image, without merging them into the node.  Only the
+        keypoints found by the tile owning their location are returned.
+
+        Parameters
+        ----------
+        window : list
+                 [xstart, ystart, xcount, ycount] of the window to tile
+
+        Returns
+        -------
+        keypoints : dataframe
+
+        descriptors : ndarray
+
+        dropped : int
+                  The number of keypoints dropped from tile overlaps
+        """
         stepsize = tilesize - overlap
         if stepsize < 0:
             raise ValueError('Overlap can not be greater than tilesize.')
         # Compute the tiles
-        if tilesize >= array_size[1]:
-            ytiles = [(0, array_size[1])]
-        else:
-            ystarts = range(0, array_size[1], stepsize)
-            ystops = range(tilesize, array_size[1], stepsize)
-            ytiles = list(zip(ystarts, ystops))
-            ytiles.append((ytiles[-1][0] + stepsize, array_size[1]))
-        
-        if tilesize >= array_size[0]:
-            xtiles = [(0, array_size[0])]
-        else:
-            xstarts = range(0, array_size[0], stepsize)
-            xstops = range(tilesize, array_size[0], stepsize)
-            xtiles = list(zip(xstarts, xstops))
-            xtiles.append((xtiles[-1][0] + stepsize, array_size[0]))
-        tiles = itertools.product(xtiles, ytiles)
+        xstart, ystart, xcount, ycount = window
+        xtiles = _axis_tiles(xstart, xcount, tilesize, stepsize)
+        ytiles = _axis_tiles(ystart, ycount, tilesize, stepsize)
+        tiles = list(itertools.product(xtiles, ytiles))
 
-        for tile in tiles:
+        # GDAL handles must not be shared between threads
+        handles = threading.local() if nthreads != 1 else None
+
+        def _extract_tile(tile):
             # xstart, ystart, xcount, ycount
-            xstart = tile[0][0]
-            ystart = tile[1][0]
-            xstop = tile[0][1]
-            ystop = tile[1][1]
+            (xstart, xstop), (ystart, ystop) = tile
             pixels = [xstart, ystart,
                       xstop - xstart,
                       ystop - ystart]
+            return self._extract_window(pixels, args, kwargs, handles=handles)
 
-            array = self.geodata.read_array(pixels=pixels)
-            xystart = [xstart, ystart]
-            self.extract_features(array, xystart, *args, **kwargs)
+        if nthreads == 1:
+            results = [_extract_tile(tile) for tile in tiles]
+        else:
+            with ThreadPoolExecutor(max_workers=nthreads) as workers:
+                results = list(workers.map(_extract_tile, tiles))
+
+        keypoints = pd.concat([k for k, d in results])
+        descriptors = np.concatenate([d for k, d in results])
+
+        # Each location is owned by the tile whose interior it is closest
+        # to, with the borders at the middle of the overlaps.  A keypoint is
+        # kept only if it was found by the tile owning its location, so
+        # that the (near) duplicates found by neighboring tiles are dropped.
+        ntiles = np.repeat(np.arange(len(tiles)), [len(k) for k, d in results])
+        xtile, ytile = np.divmod(ntiles, len(ytiles))
+        owned = ((_owning_tile(keypoints['x'].values, xtiles) == xtile) &
+                 (_owning_tile(keypoints['y'].values, ytiles) == ytile))
+        return keypoints[owned], descriptors[owned], int((~owned).sum())
 
     def load_features(self, in_path, format='npy'):
         """
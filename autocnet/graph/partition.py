@@ -0,0 +1,289 @@
+from collections import defaultdict, deque
+import heapq
+import itertools
+
+
+def node_weight(node):
+    """
+    The work (and descriptor volume) associated with a node, i.e. its
+    number of keypoints.  Nodes without keypoints have unit weight so that
+    a graph can be partitioned before features are extracted.
+
+    Parameters
+    ----------
+    node : object
+           An autocnet.graph.node.Node object
+
+    Returns
+    -------
+     : int
+       The node weight
+    """
+    return max(node.nkeypoints, 1)
+
+
+def edge_weight(edge, source_weight, destination_weight):
+    """
+    The expected number of descriptors shipped between workers if an edge
+    is cut.  The smaller set of descriptors is shipped and, if the overlap
+    of the edge has been computed, only the fraction of the descriptors
+    falling in the overlap.
+
+    Parameters
+    ----------
+    edge : object
+           An autocnet.graph.edge.Edge object
+
+    source_weight : float
+                    The node_weight of the source node
+
+    destination_weight : float
+                         The node_weight of the destination node
+
+    Returns
+    -------
+     : float
+       The edge weight, at least 1 so that every cut edge counts
+    """
+    weight = min(source_weight, destination_weight)
+    overlap = edge.get('weights', {}).get('overlap_percn')
+    if overlap is not None:
+        weight *= overlap / 100
+    return max(weight, 1)
+
+
+def _farthest(adj, sources):
+    """
+    Breadth first search from the sources, returning the last node reached,
+    i.e. a node as far as possible from all of the sources.
+    """
+    seen = set(sources)
+    queue = deque(sources)
+    n = None
+    while queue:
+        n = queue.popleft()
+        for m in adj[n]:
+            if m not in seen:
+                seen.add(m)
+                queue.append(m)
+    return n
+
+
+def _grow(nodes, adj, weights, k):
+    """
+    Greedy graph growing.  The parts are grown together from seeds spread
+    across the graph, the first being a low degree node and each following
+    one as far as possible from the previous ones.  The lightest part is
+    always grown next, by adding the unassigned node most strongly
+    connected to it, so that the parts stay balanced and no part is left
+    with the scattered remainder of the others.
+    """
+    membership = {}
+    if not nodes:
+        return membership
+    order = sorted(nodes, key=lambda n: len(adj[n]))
+    position = 0
+    counter = itertools.count()
+    part_weights = [0] * k
+    connectivity = [defaultdict(float) for p in range(k)]
+    frontiers = [[] for p in range(k)]
+
+    def assign(n, p):
+        membership[n] = p
+        part_weights[p] += weights[n]
+        for m, w in adj[n].items():
+            if m not in membership:
+                connectivity[p][m] += w
+                heapq.heappush(frontiers[p], (-connectivity[p][m], next(counter), m))
+
+    seeds = [order[0]]
+    for p in range(1, k):
+        seeds.append(_farthest(adj, seeds))
+    for p, n in enumerate(seeds):
+        if n not in membership:
+            assign(n, p)
+
+    while len(membership) < len(nodes):
+        p = min(range(k), key=lambda p: part_weights[p])
+        frontier = frontiers[p]
+        n = None
+        while frontier:
+            c, _, candidate = heapq.heappop(frontier)
+            if candidate not in membership and -c == connectivity[p][candidate]:
+                n = candidate
+                break
+        if n is None:
+            # Restart in another component, or anywhere once the part is
+            # enclosed by the others
+            while order[position] in membership:
+                position += 1
+            n = order[position]
+        assign(n, p)
+    return membership
+
+
+def _refine(nodes, adj, weights, membership, k, floor, limit, max_passes):
+    """
+    Boundary refinement in the spirit of Kernighan-Lin / Fiduccia-Mattheyses.
+    Nodes are moved to a neighboring part when the move reduces the cut
+    weight, or keeps it unchanged and improves the balance, without pushing
+    the neighboring part over the weight limit or taking their own part
+    under the weight floor.  Moves into parts under the floor are preferred,
+    whatever the gain, as long as they improve the balance.  Nodes in parts
+    that are over the limit are moved to the best neighboring part
+    regardless of the gain.
+    """
+    part_weights = [0] * k
+    for n in nodes:
+        part_weights[membership[n]] += weights[n]
+
+    for i in range(max_passes):
+        moved = False
+        for n in nodes:
+            own = membership[n]
+            overweight = part_weights[own] > limit
+            if not overweight and part_weights[own] - weights[n] < floor:
+                continue
+
+            connectivity = defaultdict(float)
+            for m, w in adj[n].items():
+                connectivity[membership[m]] += w
+            internal = connectivity.pop(own, 0)
+
+            best = None
+            best_key = None
+            for p, external in connectivity.items():
+                if part_weights[p] + weights[n] > limit:
+                    continue
+                gain = external - internal
+                balanced = part_weights[p] + weights[n] < part_weights[own]
+                underweight = part_weights[p] < floor and balanced
+                if gain > 0 or (gain == 0 and balanced) or underweight or overweight:
+                    key = (underweight, gain)
+                    if best is None or key > best_key:
+                        best, best_key = p, key
+
+            if best is not None:
+                membership[n] = best
+                part_weights[own] -= weights[n]
+                part_weights[best] += weights[n]
+                moved = True
+        if not moved:
+            break
+    return membership
+
+
+def movement_report(adj, weights, membership, k):
+    """
+    Report the size of each part and the descriptors that must be shipped
+    to it.  A cut edge is processed by the part holding its heavier node,
+    so the descriptors of the lighter node are shipped to that part.
+
+    Parameters
+    ----------
+    adj : dict
+          of dicts of edge weights, i.e. adj[u][v] is the weight of (u, v)
+
+    weights : dict
+              of node weights
+
+    membership : dict
+                 with node identifiers as keys and part ids as values
+
+    k : int
+        The number of parts
+
+    Returns
+    -------
+    report : dict
+             with part ids as keys and dicts as values with keys: nodes
+             (count), weight (total node weight), internal_edges,
+             cut_edges (incident cut edges), edges (edges processed by the
+             part) and movement (descriptors shipped to the part)
+    """
+    report = {p: {'nodes': 0, 'weight': 0, 'internal_edges': 0,
+                  'cut_edges': 0, 'edges': 0, 'movement': 0}
+              for p in range(k)}
+    for n, p in membership.items():
+        report[p]['nodes'] += 1
+        report[p]['weight'] += weights[n]
+
+    for u, neighbors in adj.items():
+        for v, w in neighbors.items():
+            if u > v:
+                continue
+            pu, pv = membership[u], membership[v]
+            if pu == pv:
+                report[pu]['internal_edges'] += 1
+                report[pu]['edges'] += 1
+                continue
+            report[pu]['cut_edges'] += 1
+            report[pv]['cut_edges'] += 1
+            owner = pu if weights[u] >= weights[v] else pv
+            report[owner]['edges'] += 1
+            report[owner]['movement'] += w
+    return report
+
+
+def partition(g, k, imbalance=0.05, max_passes=10):
+    """
+    Split a graph into k parts of (approximately) equal weight, minimizing
+    the weight of the cut edges.  Nodes are weighted by their keypoint
+    counts and edges by the number of descriptors that would have to be
+    shipped between workers if the edge were cut.
+
+    Parameters
+    ----------
+    g : object
+        A CandidateGraph object
+
+    k : int
+        The number of parts
+
+    imbalance : float
+                The allowed fractional deviation of a part from the mean
+                part weight, in either direction.  The bounds are widened
+                by the weight of the heaviest node when a single node
+                cannot otherwise be placed.
+
+    max_passes : int
+                 The maximum number of refinement passes
+
+    Returns
+    -------
+    parts : dict
+            with part ids as keys and lists of node identifiers as values
+
+    report : dict
+             The size and expected data movement of each part, see
+             movement_report
+
+    See Also
+    --------
+    autocnet.graph.partition.node_weight
+    autocnet.graph.partition.edge_weight
+    """
+    if k < 1:
+        raise ValueError('The number of parts must be at least 1')
+
+    nodes = g.nodes()
+    weights = {n: node_weight(g.node[n]) for n in nodes}
+    adj = {n: {} for n in nodes}
+    for u, v, e in g.edges_iter(data=True):
+        w = edge_weight(e, weights[u], weights[v])
+        adj[u][v] = w
+        adj[v][u] = w
+
+    total = sum(weights.values())
+    target = total / k
+    heaviest = max(weights.values(), default=0)
+    limit = max((1 + imbalance) * target, heaviest)
+    floor = min((1 - imbalance) * target, target - heaviest)
+
+    membership = _grow(nodes, adj, weights, k)
+    membership = _refine(nodes, adj, weights, membership, k, floor, limit, max_passes)
+
+    parts = {p: [] for p in range(k)}
+    for n in nodes:
+        parts[membership[n]].append(n)
+    return parts, movement_report(adj, weights, membership, k)
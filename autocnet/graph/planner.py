@@ -0,0 +1,80 @@
+import math
+
+
+def count_tiles(size, tilesize, overlap):
+    """
+    The number of tiles Node.extract_features_with_tiling reads along one
+    axis of an image.
+
+    Parameters
+    ----------
+    size : int
+           The length of the axis in pixels
+
+    tilesize : int
+               The size of the square tiles in pixels
+
+    overlap : int
+              The overlap between adjacent tiles in pixels
+
+    Returns
+    -------
+     : int
+       The number of tiles
+    """
+    if tilesize >= size:
+        return 1
+    return len(range(tilesize, size, tilesize - overlap)) + 1
+
+
+def plan(raster_size, maxsize, overlap=0.1, max_tiles=100):
+    """
+    Choose how to extract features from an image so that the extracted
+    array is no larger than maxsize x maxsize pixels.  Images that fit are
+    extracted whole.  Larger images are tiled with the largest tiles that
+    fit, so that they are not downsampled, unless that would take more
+    than max_tiles tiles, in which case they are downsampled by the
+    smallest factor that fits.
+
+    Parameters
+    ----------
+    raster_size : tuple
+                  (samples, lines) size of the image
+
+    maxsize : int
+              The maximum side length, in pixels, of a square array that can
+              be extracted (see autocnet.graph.network.MAXSIZE).  If None,
+              the size is not limited.
+
+    overlap : float
+              The overlap between adjacent tiles as a fraction of the tile
+              size
+
+    max_tiles : int
+                The maximum number of tiles before an image is downsampled
+                instead.  If None, images are never downsampled.
+
+    Returns
+    -------
+    name : str
+           The Node extraction method, one of 'extract_features',
+           'extract_features_with_tiling' or
+           'extract_features_with_downsampling'
+
+    kwargs : dict
+             The keyword arguments of the extraction method, e.g. tilesize
+             and overlap
+    """
+    samples, lines = raster_size
+    if maxsize is None or samples * lines <= maxsize ** 2:
+        return 'extract_features', {}
+
+    tilesize = int(maxsize)
+    tile_overlap = int(tilesize * overlap)
+    ntiles = count_tiles(samples, tilesize, tile_overlap) * count_tiles(lines, tilesize, tile_overlap)
+    if max_tiles is None or ntiles <= max_tiles:
+        return 'extract_features_with_tiling', {'tilesize': tilesize, 'overlap': tile_overlap}
+
+    # The per axis factor that brings the total size within the budget
+    downsample_amount = math.sqrt(samples * lines / maxsize ** 2)
+    return 'extract_features_with_downsampling', {'downsample_amount': downsample_amount}
@@ -0,0 +1,389 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import os
+
+import pandas as pd
+
+from autocnet.graph.node import Node
+from autocnet.io import prefetch as io_prefetch
+from autocnet.io import store as io_store
+
+# Attributes that reference the parent graph (or open file handles) and
+# are never shipped to, or merged back from, a worker.
+_GRAPH_REFERENCES = ('source', 'destination', '_geodata', '_store')
+
+EXECUTORS = {'threads': ThreadPoolExecutor,
+             'processes': ProcessPoolExecutor}
+
+
+def edge_cost(edge):
+    """
+    Estimate the relative amount of work needed to process an edge.  If
+    the edge has been matched, the number of matches is used, otherwise the
+    product of the number of keypoints on the source and destination nodes.
+
+    Parameters
+    ----------
+    edge : object
+           An autocnet.graph.edge.Edge object
+
+    Returns
+    -------
+     : int
+       The estimated cost of the edge
+    """
+    if edge.matches is not None and not edge.matches.empty:
+        return len(edge.matches)
+    source = getattr(edge.source, 'nkeypoints', 0)
+    destination = getattr(edge.destination, 'nkeypoints', 0)
+    return source * destination
+
+
+def get_state(obj):
+    """
+    Capture the state of a node or edge that can be shipped between
+    processes or written to disk, i.e. everything except the references to
+    the source and destination nodes, open file handles and any
+    PayloadStore.
+
+    Parameters
+    ----------
+    obj : object
+          An autocnet.graph.edge.Edge or autocnet.graph.node.Node object
+
+    Returns
+    -------
+    items : dict
+            The dictionary (key/value) attributes of the object
+
+    state : dict
+            The instance attributes of the object, e.g. matches and masks
+    """
+    state = {k: v for k, v in obj.__dict__.items() if k not in _GRAPH_REFERENCES}
+    for name in obj._payloads:
+        state.pop('_{}'.format(name), None)
+        state[name] = getattr(obj, name)
+    return dict(obj), state
+
+
+def set_state(obj, obj_state):
+    """
+    Merge the state returned by get_state back into a node or edge.
+
+    Parameters
+    ----------
+    obj : object
+          An autocnet.graph.edge.Edge or autocnet.graph.node.Node object
+
+    obj_state : tuple
+                (items, state) as returned by get_state
+    """
+    items, state = obj_state
+    obj.update(items)
+    state = dict(state)
+    # Payloads are set through their attributes so that they reach the store
+    for name in obj._payloads:
+        if name in state:
+            setattr(obj, name, state.pop(name))
+    obj.__dict__.update(state)
+
+
+def restore(obj, unit, checkpoint):
+    """
+    Restore the most recently checkpointed state of a node or edge, unless
+    the in memory state is already current.
+
+    Parameters
+    ----------
+    obj : object
+          An autocnet.graph.edge.Edge or autocnet.graph.node.Node object
+
+    unit : str
+           The checkpoint unit identifier of the object
+
+    checkpoint : object
+                 An autocnet.io.checkpoint.Checkpoint object
+    """
+    if not checkpoint.is_current(unit):
+        state = checkpoint.load(unit)
+        if state is not None:
+            set_state(obj, state)
+
+
+def window_size(nworkers=None):
+    """
+    The number of tasks kept in flight by a pool of workers, i.e. two per
+    worker so that no worker idles while its results are consumed.
+    """
+    return 2 * (nworkers or os.cpu_count() or 1)
+
+
+def _imap_bounded(workers, items, submit, window):
+    """
+    Submit items to a pool of workers, keeping at most window of them in
+    flight or completed but not yet consumed, and yield (item, future)
+    as each completes.  The next item is only submitted once the caller
+    has consumed a result, so a slow caller holds back the workers rather
+    than letting every result accumulate in memory.
+    """
+    items = iter(items)
+    futures = {}
+
+    def _fill():
+        for item in items:
+            futures[submit(item)] = item
+            if len(futures) >= window:
+                return
+
+    _fill()
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = futures.pop(future)
+            yield item, future
+        _fill()
+
+
+def apply(edge, function, args=(), kwargs={}):
+    """
+    Apply a named Edge method.  If the graph is out-of-core, the payloads
+    of the edge and its nodes are pinned in memory while the method runs,
+    see autocnet.io.store.pinned.
+
+    Parameters
+    ----------
+    edge : object
+           An autocnet.graph.edge.Edge object
+
+    function : str
+               The name of the Edge method to apply
+
+    args : tuple
+           of arguments passed to the method
+
+    kwargs : dict
+             of keyword arguments passed to the method
+    """
+    with io_store.pinned(edge, edge.source, edge.destination):
+        getattr(edge, function)(*args, **kwargs)
+
+
+def _apply_to_edge(edge, function, args, kwargs):
+    """
+    Worker side wrapper that applies the named method to an edge and
+    returns the resulting state to the parent process.
+    """
+    apply(edge, function, args, kwargs)
+    return get_state(edge)
+
+
+def imap_edges(edges, function, args=(), kwargs={}, executor=None, nworkers=None):
+    """
+    Apply a named Edge method to each edge, yielding the edges as they
+    complete.
+
+    Parameters
+    ----------
+    edges : iterable
+            of (source, destination, edge) tuples
+
+    function : str
+               The name of the Edge method to apply
+
+    args : tuple
+           of arguments passed to the method
+
+    kwargs : dict
+             of keyword arguments passed to the method
+
+    executor : {None, 'threads', 'processes'} or object
+               If None, edges are processed serially and in order.  'threads'
+               is suited to the OpenCV heavy stages (e.g. match) that release
+               the GIL, while 'processes' is suited to the pandas heavy
+               stages (e.g. ratio_check, suppress).  Threads share the
+               GDAL handle of a node, so their image reads are serialized
+               by Node.geodata_lock.  An
+               autocnet.graph.distributed.Cluster distributes the edges
+               across its workers.  Parallel executors schedule the most
+               costly edges first and keep at most two edges per worker in
+               flight, so the next edge is only started once the caller
+               has consumed a completed one.
+
+    nworkers : int
+               The number of workers.  Default: the number of cpus
+
+    Yields
+    ------
+    s : hashable
+        The source node identifier
+
+    d : hashable
+        The destination node identifier
+
+    edge : object
+           The edge, with the results of the function applied
+    """
+    if executor is None:
+        for s, d, edge in edges:
+            apply(edge, function, args, kwargs)
+            yield s, d, edge
+        return
+
+    if hasattr(executor, 'imap_edges'):
+        yield from executor.imap_edges(edges, function, args, kwargs)
+        return
+
+    if executor not in EXECUTORS:
+        raise ValueError('Executor must be one of: {}'.format(', '.join(EXECUTORS.keys())))
+
+    # Schedule big edges first so that a single expensive edge does not
+    # trail the rest of the pool.
+    edges = sorted(edges, key=lambda x: edge_cost(x[2]), reverse=True)
+
+    def _submit(item):
+        s, d, edge = item
+        if executor == 'threads':
+            # Threads share memory, so the edge is updated in place.
+            return workers.submit(apply, edge, function, args, kwargs)
+        return workers.submit(_apply_to_edge, edge, function, args, kwargs)
+
+    with EXECUTORS[executor](max_workers=nworkers) as workers:
+        for (s, d, edge), future in _imap_bounded(workers, edges, _submit, window_size(nworkers)):
+            result = future.result()
+            if executor == 'processes':
+                set_state(edge, result)
+            yield s, d, edge
+
+
+def extract(node, function, args=(), kwargs={}, band=1):
+    """
+    Apply a named Node extraction method.  The 'extract_features' method
+    operates on an array, so the given band is read first.  If the graph
+    is out-of-core, the payloads of the node are pinned in memory while
+    the method runs, see autocnet.io.store.pinned.
+
+    Parameters
+    ----------
+    node : object
+           An autocnet.graph.node.Node object
+
+    function : str
+               The name of the Node method to apply
+
+    args : tuple
+           of arguments passed to the method
+
+    kwargs : dict
+             of keyword arguments passed to the method
+
+    band : int
+           The band to read when function is 'extract_features'
+    """
+    with io_store.pinned(node):
+        if function == 'extract_features':
+            array = node.get_array(band=band)
+            node.extract_features(array, *args, **kwargs)
+        else:
+            getattr(node, function)(*args, **kwargs)
+
+
+def _extract_node(image_path, function, band, args, kwargs, maxsize=None,
+                  pyramid_path=None, metadata=None):
+    """
+    Worker side feature extraction.  A fresh node is created so that the
+    worker opens its own GeoDataset handle, with the maximum array size,
+    pyramid and cached metadata of the parent's node.  The keypoints are
+    returned as an ndarray plus column names to minimize the pickling
+    overhead, followed by the descriptors and the number of keypoints
+    dropped from tile overlaps.
+    """
+    node = Node(image_path=image_path)
+    node.maxsize = maxsize
+    node.pyramid_path = pyramid_path
+    node.metadata = dict(metadata or {})
+    extract(node, function, args, kwargs, band=band)
+    return node.keypoints.values, list(node.keypoints.columns), node.descriptors, node.ndropped
+
+
+def imap_nodes(nodes, function, band=1, executor=None, nworkers=None, prefetch=None):
+    """
+    Apply a Node extraction method to each node, yielding the nodes as they
+    complete.
+
+    Parameters
+    ----------
+    nodes : iterable
+            of (node identifier, node, args, kwargs) tuples, where args and
+            kwargs are passed to the extraction method
+
+    function : {'extract_features', 'extract_features_with_downsampling',
+                'extract_features_with_tiling'}
+               The name of the Node extraction method to apply
+
+    band : int
+           The band to read when function is 'extract_features'
+
+    executor : {None, 'processes'} or object
+               If None, nodes are processed serially and in order.  If
+               'processes', nodes are distributed across a pool of
+               processes, largest file first.  An
+               autocnet.graph.distributed.Cluster distributes the nodes
+               across its workers.
+
+    nworkers : int
+               The number of processes.  Default: the number of cpus
+
+    prefetch : int
+               If given when executor is None and function is
+               'extract_features', the images of the following nodes are
+               read in a background thread while a node is processed,
+               with at most prefetch (estimated) bytes read ahead.
+
+    Yields
+    ------
+    i : hashable
+        The node identifier
+
+    node : object
+           The node with the extracted keypoints and descriptors merged in
+
+    See Also
+    --------
+    autocnet.io.prefetch.prefetch
+    """
+    if executor is None and prefetch and function == 'extract_features':
+        reads = io_prefetch.prefetch(nodes, lambda n: n[1].get_array(band=band),
+                                     lambda n: io_prefetch.raster_nbytes(n[1]),
+                                     max_bytes=prefetch)
+        for (i, node, args, kwargs), array in reads:
+            node.extract_features(array, *args, **kwargs)
+            yield i, node
+        return
+
+    if executor is None:
+        for i, node, args, kwargs in nodes:
+            extract(node, function, args, kwargs, band=band)
+            yield i, node
+        return
+
+    if hasattr(executor, 'imap_nodes'):
+        yield from executor.imap_nodes(nodes, function, band=band)
+        return
+
+    if executor != 'processes':
+        raise ValueError("Node executor must be one of: processes")
+
+    # Schedule the largest files first
+    nodes = sorted(nodes, key=lambda x: os.path.getsize(x[1]['image_path']), reverse=True)
+
+    def _submit(item):
+        i, node, args, kwargs = item
+        return workers.submit(_extract_node, node['image_path'], function, band, args, kwargs,
+                              maxsize=node.maxsize, pyramid_path=node.pyramid_path,
+                              metadata=node.metadata)
+
+    with ProcessPoolExecutor(max_workers=nworkers) as workers:
+        for (i, node, args, kwargs), future in _imap_bounded(workers, nodes, _submit,
+                                                             window_size(nworkers)):
+            keypoints, columns, descriptors, node.ndropped = future.result()
+            node._add_features(pd.DataFrame(keypoints, columns=columns), descriptors)
+            yield i, node
@@ -0,0 +1,314 @@
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+from autocnet.graph import pool
+from autocnet.io import checkpoint as io_checkpoint
+
+
+def parse_stage(stage):
+    """
+    Stages are given as either a method name or a (method name, kwargs) tuple.
+    """
+    if isinstance(stage, str):
+        return stage, {}
+    return stage[0], dict(stage[1])
+
+
+def locality_order(edges):
+    """
+    Order edges so that the edges of each node are processed close
+    together.  The nodes are ordered by the reverse Cuthill-McKee
+    permutation, which minimizes the bandwidth of the adjacency matrix, and
+    each edge is processed when the later of its two nodes is reached.  A
+    resident set slightly larger than the bandwidth therefore loads every
+    node once.
+
+    Parameters
+    ----------
+    edges : iterable
+            of (source, destination, ...) tuples
+
+    Returns
+    -------
+     : list
+       of the edges, reordered
+    """
+    edges = list(edges)
+    if not edges:
+        return edges
+
+    index = {}
+    rows = np.empty(len(edges), dtype=np.int64)
+    cols = np.empty(len(edges), dtype=np.int64)
+    for i, e in enumerate(edges):
+        rows[i] = index.setdefault(e[0], len(index))
+        cols[i] = index.setdefault(e[1], len(index))
+
+    n = len(index)
+    adjacency = sparse.csr_matrix((np.ones(len(edges)), (rows, cols)), shape=(n, n))
+    adjacency = adjacency + adjacency.T
+    permutation = reverse_cuthill_mckee(adjacency, symmetric_mode=True)
+    rank = np.empty(n, dtype=np.int64)
+    rank[permutation] = np.arange(n)
+
+    first = np.minimum(rank[rows], rank[cols])
+    last = np.maximum(rank[rows], rank[cols])
+    return [edges[i] for i in np.lexsort((first, last))]
+
+
+def count_reloads(edges, capacity):
+    """
+    Simulate processing edges with a least recently used resident set of
+    nodes, e.g. the node payloads held by a PayloadStore, and count the
+    number of times a node is loaded after its first load.
+
+    Parameters
+    ----------
+    edges : iterable
+            of (source, destination, ...) tuples, in processing order
+
+    capacity : int
+               The number of nodes that can be resident (at least 2)
+
+    Returns
+    -------
+    reloads : int
+              The number of node loads beyond the first load of each node
+    """
+    if capacity < 2:
+        raise ValueError('The resident set must hold at least the two nodes of an edge')
+    resident = OrderedDict()
+    seen = set()
+    reloads = 0
+    for e in edges:
+        for n in e[:2]:
+            if n in resident:
+                resident.move_to_end(n)
+                continue
+            if n in seen:
+                reloads += 1
+            seen.add(n)
+            resident[n] = None
+        while len(resident) > capacity:
+            resident.popitem(last=False)
+    return reloads
+
+
+def build_tasks(graph, node_stages, edge_stages):
+    """
+    Build the task graph for a pipeline.  Each node stage depends on the
+    previous stage of the same node.  The first edge stage depends on the
+    final stage of both of the edge's nodes, and every other edge stage
+    depends on the previous stage of the same edge.
+
+    Parameters
+    ----------
+    graph : object
+            A CandidateGraph object
+
+    node_stages : list
+                  of Node method names or (name, kwargs) tuples
+
+    edge_stages : list
+                  of Edge method names or (name, kwargs) tuples
+
+    Returns
+    -------
+    dependencies : dict
+                   with task identifiers as keys and the set of task
+                   identifiers each depends upon as values.  Task
+                   identifiers are ('node', node_id, stage_index) and
+                   ('edge', (source, destination), stage_index)
+    """
+    dependencies = {}
+    last_node_task = {}
+    for n in graph.nodes_iter():
+        previous = None
+        for i in range(len(node_stages)):
+            task = ('node', n, i)
+            dependencies[task] = {previous} if previous else set()
+            previous = task
+        last_node_task[n] = previous
+
+    for s, d in graph.edges_iter():
+        previous = None
+        for j in range(len(edge_stages)):
+            task = ('edge', (s, d), j)
+            if previous:
+                dependencies[task] = {previous}
+            else:
+                dependencies[task] = {t for t in (last_node_task[s], last_node_task[d]) if t}
+            previous = task
+    return dependencies
+
+
+def critical_path(dependencies, durations):
+    """
+    Find the longest (duration weighted) chain of dependent tasks.
+
+    Parameters
+    ----------
+    dependencies : dict
+                   as returned by build_tasks
+
+    durations : dict
+                with task identifiers as keys and durations as values
+
+    Returns
+    -------
+    path : list
+           of task identifiers, in execution order
+
+    length : float
+             The total duration of the tasks on the path
+    """
+    finish = {}
+    previous = {}
+
+    def _finish(task):
+        # Iterative depth first traversal to avoid recursion limits
+        stack = [task]
+        while stack:
+            t = stack[-1]
+            pending = [dep for dep in dependencies[t] if dep not in finish]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if t in finish:
+                continue
+            best = max(dependencies[t], key=lambda dep: finish[dep], default=None)
+            previous[t] = best
+            finish[t] = durations.get(t, 0) + (finish[best] if best else 0)
+        return finish[task]
+
+    if not dependencies:
+        return [], 0
+    end = max(dependencies, key=_finish)
+    path = []
+    task = end
+    while task:
+        path.append(task)
+        task = previous[task]
+    return path[::-1], finish[end]
+
+
+def run(graph, node_stages=['extract_features'], edge_stages=['match'], nworkers=None,
+        checkpoint=None):
+    """
+    Run a pipeline of node and edge stages using a pool of threads.  Rather
+    than waiting for every node (or edge) to finish a stage, each task
+    starts as soon as the tasks it depends upon have finished, e.g. an edge
+    is matched as soon as both of its nodes have features.  Tasks reading
+    the image of a node share its GDAL handle, and are serialized by
+    Node.geodata_lock while reading.
+
+    Parameters
+    ----------
+    graph : object
+            A CandidateGraph object
+
+    node_stages : list
+                  of Node method names or (name, kwargs) tuples.  The
+                  'extract_features' stage reads the image band given by
+                  the 'band' kwarg (Default: 1)
+
+    edge_stages : list
+                  of Edge method names or (name, kwargs) tuples, e.g.
+                  ['match', ('ratio_check', {'clean_keys': ['symmetry']})]
+
+    nworkers : int
+               The number of threads.  Default: set by ThreadPoolExecutor
+
+    checkpoint : object
+                 An autocnet.io.checkpoint.Checkpoint object.  If given, each
+                 task is recorded, under the stage name and a hash of its
+                 kwargs (see autocnet.io.checkpoint.stage_key), as it completes.
+                 Tasks that have already completed are not run and the
+                 state of their node or edge is restored instead.
+
+    Returns
+    -------
+    report : dict
+             with keys 'wall_time', 'durations' (per task), 'critical_path'
+             (a list of task identifiers) and 'critical_path_time'
+
+    See Also
+    --------
+    autocnet.graph.scheduler.build_tasks
+    """
+    node_stages = [parse_stage(s) for s in node_stages]
+    edge_stages = [parse_stage(s) for s in edge_stages]
+    dependencies = build_tasks(graph, node_stages, edge_stages)
+
+    dependents = defaultdict(list)
+    for task, deps in dependencies.items():
+        for dep in deps:
+            dependents[dep].append(task)
+    remaining = {task: set(deps) for task, deps in dependencies.items()}
+    durations = {}
+
+    def _unit(task):
+        kind, key, i = task
+        if kind == 'node':
+            name, kwargs = node_stages[i]
+            return io_checkpoint.stage_key(name, kwargs=kwargs), io_checkpoint.node_unit(key), graph.node[key]
+        name, kwargs = edge_stages[i]
+        s, d = key
+        return io_checkpoint.stage_key(name, kwargs=kwargs), io_checkpoint.edge_unit(s, d), graph.edge[s][d]
+
+    def _run_task(task):
+        start = time.time()
+        kind, key, i = task
+        if kind == 'node':
+            name, kwargs = node_stages[i]
+            kwargs = dict(kwargs)
+            band = kwargs.pop('band', 1)
+            pool.extract(graph.node[key], name, kwargs=kwargs, band=band)
+        else:
+            name, kwargs = edge_stages[i]
+            s, d = key
+            pool.apply(graph.edge[s][d], name, kwargs=kwargs)
+        durations[task] = time.time() - start
+        if checkpoint is not None:
+            stage, unit, obj = _unit(task)
+            checkpoint.record(stage, unit, pool.get_state(obj))
+
+    def _complete(task):
+        for dependent in dependents[task]:
+            if dependent in remaining:
+                remaining[dependent].discard(task)
+
+    if checkpoint is not None:
+        for task in dependencies:
+            stage, unit, obj = _unit(task)
+            if checkpoint.is_complete(stage, unit):
+                pool.restore(obj, unit, checkpoint)
+                remaining.pop(task)
+                _complete(task)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=nworkers) as workers:
+        running = {workers.submit(_run_task, t): t for t, deps in remaining.items() if not deps}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                # Raise any exception from the task
+                future.result()
+                _complete(task)
+                for dependent in dependents[task]:
+                    if dependent in remaining and not remaining[dependent]:
+                        running[workers.submit(_run_task, dependent)] = dependent
+    wall_time = time.time() - start
+
+    path, path_time = critical_path(dependencies, durations)
+    return {'wall_time': wall_time,
+            'durations': durations,
+            'critical_path': path,
+            'critical_path_time': path_time}
@@ -0,0 +1,183 @@
+from autocnet.graph import pool
+
+
+class UnionFind(object):
+    """
+    A disjoint set forest with path halving and union by size, used to
+    track the connected components of the edges kept by a sparsifier.
+    """
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, n):
+        self.parent.setdefault(n, n)
+        self.size.setdefault(n, 1)
+        while self.parent[n] != n:
+            self.parent[n] = self.parent[self.parent[n]]
+            n = self.parent[n]
+        return n
+
+    def union(self, a, b):
+        """
+        Merge the sets holding a and b, returning False if they were
+        already the same set.
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+def overlap_area(edge):
+    """
+    The overlap area of an edge, or None if it has not been computed.
+    """
+    return edge.get('weights', {}).get('overlap_area')
+
+
+def prune(g, min_area=0, min_percentage=0):
+    """
+    Select the edges whose footprint overlap is below an area or a
+    percentage threshold.  Edges that are needed to keep a connected
+    component of the graph connected are not selected; where a component
+    would otherwise be split, the weak edges with the largest overlap
+    areas are kept.  Edges without overlap weights are never selected.
+
+    Parameters
+    ----------
+    g : object
+        A CandidateGraph object with overlap weights computed
+
+    min_area : float
+               The minimum overlap area of a kept edge
+
+    min_percentage : float
+                     The minimum overlap percentage of a kept edge
+
+    Returns
+    -------
+    removed : list
+              of (source, destination) edges to remove
+
+    report : dict
+             with keys: edges (the number of edges), removed (the number of
+             edges removed), retained (the number of edges below the
+             thresholds kept for connectivity), work and work_removed (the
+             estimated cost, see autocnet.graph.pool.edge_cost, of all of
+             the edges and of the removed edges) and area_removed (the
+             total overlap area of the removed edges)
+    """
+    components = UnionFind()
+    weak = []
+    work = 0
+    for s, d, e in g.edges_iter(data=True):
+        work += pool.edge_cost(e)
+        weights = e.get('weights', {})
+        area = weights.get('overlap_area')
+        percentage = weights.get('overlap_percn')
+        if area is None or percentage is None or (area >= min_area and percentage >= min_percentage):
+            components.union(s, d)
+        else:
+            weak.append((area, s, d, e))
+
+    # Kruskal's algorithm over the weak edges, strongest first, keeps a
+    # maximum spanning forest of the components the strong edges leave split
+    removed = []
+    retained = 0
+    work_removed = 0
+    area_removed = 0
+    for area, s, d, e in sorted(weak, key=lambda x: x[0], reverse=True):
+        if components.union(s, d):
+            retained += 1
+            continue
+        removed.append((s, d))
+        work_removed += pool.edge_cost(e)
+        area_removed += area
+
+    report = {'edges': g.number_of_edges(),
+              'removed': len(removed),
+              'retained': retained,
+              'work': work,
+              'work_removed': work_removed,
+              'area_removed': area_removed}
+    return removed, report
+
+
+def spanning_forests(g, k=2, weight=overlap_area):
+    """
+    Select a sparse, k-edge-connected spanning subgraph.  k maximum
+    spanning forests are taken in turn, each from the edges not taken by
+    the previous forests, using Kruskal's algorithm.  The union of the
+    forests keeps every node pair connected by min(k, c) edge-disjoint
+    paths, where c is the number of such paths in the graph (Nagamochi
+    and Ibaraki, 1992), so the subgraph is k-edge-connected wherever the
+    graph is, with at most k (n - 1) edges.  Higher k trades matching cost
+    for control network redundancy.
+
+    Parameters
+    ----------
+    g : object
+        A CandidateGraph object
+
+    k : int
+        The number of spanning forests, i.e. the edge connectivity to
+        preserve
+
+    weight : callable
+             Returns the weight of an edge, larger weights are preferred.
+             Defaults to the overlap area, edges without overlap weights
+             have weight 0.
+
+    Returns
+    -------
+    kept : list
+           of (source, destination) edges to keep
+
+    report : dict
+             with keys: edges (the number of edges), kept (the number of
+             edges kept), forests (the number of edges in each forest),
+             work and work_kept (the estimated cost, see
+             autocnet.graph.pool.edge_cost, of all of the edges and of the
+             kept edges)
+    """
+    if k < 1:
+        raise ValueError('The number of spanning forests must be at least 1')
+
+    remaining = []
+    work = 0
+    for s, d, e in g.edges_iter(data=True):
+        work += pool.edge_cost(e)
+        remaining.append(((weight(e) or 0), s, d, e))
+    remaining.sort(key=lambda x: x[0], reverse=True)
+
+    kept = []
+    forests = []
+    work_kept = 0
+    for i in range(k):
+        components = UnionFind()
+        unused = []
+        size = 0
+        for w, s, d, e in remaining:
+            if components.union(s, d):
+                kept.append((s, d))
+                work_kept += pool.edge_cost(e)
+                size += 1
+            else:
+                unused.append((w, s, d, e))
+        forests.append(size)
+        remaining = unused
+        if not remaining:
+            break
+
+    report = {'edges': g.number_of_edges(),
+              'kept': len(kept),
+              'forests': forests,
+              'work': work,
+              'work_kept': work_kept}
+    return kept, report
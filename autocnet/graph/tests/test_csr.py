@@ -0,0 +1,124 @@
+import os
+import sys
+
+import networkx as nx
+import pytest
+
+from .. import csr
+from .. import markov_cluster
+from .. import network
+
+sys.path.insert(0, os.path.abspath('..'))
+
+
+@pytest.fixture()
+def adjacency():
+    return {'a.cub': ['b.cub', 'c.cub'],
+            'b.cub': ['a.cub', 'c.cub', 'd.cub'],
+            'c.cub': ['a.cub', 'b.cub'],
+            'd.cub': ['b.cub'],
+            'e.cub': []}
+
+
+def test_csr_matches_candidate_graph(adjacency):
+    g = network.CandidateGraph.from_adjacency(adjacency)
+    c = csr.CSRCandidateGraph.from_adjacency(adjacency)
+    assert c.nodes() == sorted(g.nodes())
+    assert c.edges() == sorted(tuple(sorted(e)) for e in g.edges())
+    assert c.number_of_edges() == g.number_of_edges() == 4
+    assert c.graph['node_name_map'] == g.graph['node_name_map']
+    assert c.degree() == g.degree()
+    assert c.island_nodes() == [4]
+    assert sorted(c.neighbors(1)) == [0, 2, 3]
+    assert c.has_edge(3, 1) and not c.has_edge(0, 3) and not c.has_edge(0, 'a')
+    for n, node in c.nodes_iter(data=True):
+        assert node['node_id'] == n
+        assert node['image_name'] == g.node[n]['image_name']
+
+
+def test_csr_lazy_edges(adjacency):
+    c = csr.CSRCandidateGraph.from_adjacency(adjacency)
+    c.edges()
+    assert len(c._edges) == 0 and c._nodes == {}
+
+    e = c.edge[1][3]
+    assert e is c.edge[3][1]
+    assert e.source is c.node[1] and e.destination is c.node[3]
+    assert len(c._edges) == 1
+    with pytest.raises(KeyError):
+        c.edge[0][3]
+    with pytest.raises(nx.NetworkXError):
+        c.add_edge(0, 3)
+
+
+def test_csr_released_edges(adjacency):
+    c = csr.CSRCandidateGraph.from_adjacency(adjacency)
+    # Unmodified edges are released once they are no longer used
+    for s, d, e in c.edges_iter(data=True):
+        pass
+    del e
+    c._sweep()
+    assert len(c._edges) == 0 and c._edge_state == {}
+
+    # Modified edges are held by the graph, including in place and chained
+    # modifications
+    c.edge[0][1]['weights']['overlap_area'] = 5
+    c.edge[0][2]['fundamental_matrix'] = 1
+    e = c.edge[1][3]
+    masks = e.masks
+    masks['symmetry'] = [True]
+    del e, masks
+    c._sweep()
+    assert len(c._edges) == 0
+    assert sorted(c._edge_state) == [0, 1, 3]
+    assert c.edge[1][0]['weights'] == {'overlap_area': 5}
+    assert c.edge[2][0]['fundamental_matrix'] == 1
+    assert c.edge[3][1].masks['symmetry'].tolist() == [True]
+    assert len(c._edge_state) == 3
+
+
+def test_csr_out_of_core(adjacency, tmpdir):
+    c = csr.CSRCandidateGraph.from_adjacency(adjacency)
+    c.edge[0][1]['weights']['overlap_area'] = 5
+    c.enable_out_of_core(tmpdir.strpath)
+    assert sorted(c._edge_state) == [0]
+
+    # Unmodified edges are still released, and write no payloads
+    for s, d, e in c.edges_iter(data=True):
+        e.masks
+    del e
+    c._sweep()
+    c.store.flush()
+    assert sorted(c._edge_state) == [0]
+    assert not [f for f in os.listdir(tmpdir.strpath) if f.startswith('edge_')]
+
+    # Assigned payloads are held in the store
+    c.edge[1][3].matches = c.edge[1][3].matches
+    assert sorted(c._edge_state) == [0, 3]
+    assert c.edge[1][0]['weights'] == {'overlap_area': 5}
+
+
+def test_csr_from_edges():
+    c = csr.CSRCandidateGraph.from_edges(['a', 'b', 'c'], [0, 1, 2, 1], [1, 0, 1, 1])
+    assert c.edges() == [(0, 1), (1, 2)]
+    assert c.adjacency_matrix().toarray().tolist() == [[0, 1, 0], [1, 0, 1], [0, 1, 0]]
+
+
+def test_csr_pipeline(adjacency):
+    c = csr.CSRCandidateGraph.from_adjacency(adjacency)
+    c.compute_clusters()
+    g = network.CandidateGraph.from_adjacency(adjacency)
+    _, clusters = markov_cluster.mcl(nx.adjacency_matrix(g, nodelist=sorted(g.nodes())))
+    assert c.clusters == clusters
+    assert len(c._edges) == 0
+
+    for s, d, e in c.edges_iter(data=True):
+        e['weight'] = s + d
+    view = c.create_node_subgraph([0, 1, 2])
+    assert view.size('weight') == 1 + 2 + 3
+
+    h = c.copy()
+    assert h.edge[0][1]['weight'] == 1
+    h.edge[0][1]['weight'] = 10
+    assert c.edge[0][1]['weight'] == 1
+    assert h.edge[0][1].source is h.node[0]
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from autocnet.examples import get_path
+
+from .. import distributed
+from .. import edge
+from .. import network
+from .. import node
+
+sys.path.insert(0, os.path.abspath('..'))
+
+
+def _flag(self, value=1):
+    self['flag'] = value
+    self['nkeypoints'] = self.source.nkeypoints
+    self.masks = pd.DataFrame({'flag': [True, False]})
+
+
+def _fail(self):
+    raise ValueError('Failed on the worker')
+
+
+def _fake_extract(self, npts=5):
+    self._add_features(pd.DataFrame({'x': np.arange(npts, dtype=np.float32),
+                                     'y': np.arange(npts, dtype=np.float32)}),
+                       np.ones((npts, 128), dtype=np.float32))
+
+
+@pytest.fixture()
+def graph(monkeypatch):
+    # Patched before the local workers are started so that they inherit it
+    monkeypatch.setattr(edge.Edge, 'flag', _flag, raising=False)
+    monkeypatch.setattr(edge.Edge, 'fail', _fail, raising=False)
+    monkeypatch.setattr(node.Node, 'fake_extract', _fake_extract, raising=False)
+    basepath = get_path('Apollo15')
+    return network.CandidateGraph.from_adjacency(get_path('three_image_adjacency.json'),
+                                                 basepath=basepath)
+
+
+@pytest.fixture()
+def cluster(graph):
+    with distributed.Cluster(nlocal=2) as c:
+        yield c
+
+
+def test_distributed_nodes_and_edges(graph, cluster):
+    assert len(cluster.workers) == 2
+    nodes = [(i, n, (), {'npts': 3}) for i, n in graph.nodes_iter(data=True)]
+    for i, n in graph._extract('fake_extract', nodes, parallel=cluster):
+        assert n is graph.node[i]
+        assert n.nkeypoints == 3
+
+    graph.apply_func_to_edges('flag', value=5, executor=cluster)
+    for s, d, e in graph.edges_iter(data=True):
+        assert e['flag'] == 5
+        assert e['nkeypoints'] == 3
+        assert e.masks['flag'].tolist() == [True, False]
+        assert e.source is graph.node[min(s, d)]
+
+
+def test_distributed_error(graph, cluster):
+    with pytest.raises(RuntimeError):
+        graph.apply_func_to_edges('fail', executor=cluster)
+    # The workers are still usable after a failed task
+    graph.apply_func_to_edges('flag', executor=cluster)
+
+
+def test_distributed_lost_worker(graph, cluster):
+    cluster._processes[0].terminate()
+    cluster._processes[0].join()
+    graph.apply_func_to_edges('flag', value=2, executor=cluster)
+    assert len(cluster.workers) == 1
+    for s, d, e in graph.edges_iter(data=True):
+        assert e['flag'] == 2
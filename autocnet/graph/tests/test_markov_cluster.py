@@ -2,6 +2,7 @@ import unittest
 
 import numpy as np
 import networkx as nx
+from scipy import sparse
 
 from .. import markov_cluster
 
@@ -23,4 +24,13 @@ class TestMarkovCluster(unittest.TestCase):
         arr = np.array(nx.adjacency_matrix(self.g).todense())
         flow, clusters = markov_cluster.mcl(arr)
         self.assertIsInstance(clusters, dict)
-        self.assertEqual(len(clusters), 3)
+        self.assertEqual(len(clusters), 5)
+
+    def test_mcl_sparse(self):
+        arr = nx.adjacency_matrix(self.g)
+        flow, clusters = markov_cluster.mcl(arr)
+        self.assertTrue(sparse.issparse(flow))
+        # Pruning converges to the clusters of the unpruned flow
+        _, unpruned = markov_cluster.mcl(arr, max_loop=50, prune_threshold=0, tol=0)
+        _, pruned = markov_cluster.mcl(arr, max_loop=50)
+        self.assertEqual(sorted(pruned.values()), sorted(unpruned.values()))
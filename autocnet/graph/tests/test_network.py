@@ -9,11 +9,17 @@ from unittest.mock import patch
 from unittest.mock import PropertyMock
 from osgeo import ogr
 
+import networkx as nx
 import numpy as np
+import pandas as pd
 
 from autocnet.examples import get_path
+from autocnet.io import network as io_network
 
+from .. import edge
 from .. import network
+from .. import node
+from .. import pool
 
 sys.path.insert(0, os.path.abspath('..'))
 
@@ -41,8 +47,39 @@ def test_size(graph):
     assert graph.size('edge_weight') == graph.number_of_edges()*10
 
 def test_add_image(graph):
-    with pytest.raises(NotImplementedError):
-        graph.add_image()
+    squares = {0: 'POLYGON ((0 0, 0 10, 10 10, 10 0, 0 0))',
+               1: 'POLYGON ((8 0, 8 10, 18 10, 18 0, 8 0))',
+               2: 'POLYGON ((16 0, 16 10, 26 10, 26 0, 16 0))'}
+    for i, wkt in squares.items():
+        graph.node[i].metadata = {'footprint': wkt}
+    edges_before = {(s, d): e for s, d, e in graph.edges_iter(data=True)}
+
+    metadata = {'footprint': 'POLYGON ((12 5, 12 15, 20 15, 20 5, 12 5))',
+                'raster_size': [10, 10]}
+    with patch.object(network.io_metadata, 'read_metadata', return_value=metadata):
+        new_id = graph.add_image('new_image.cub', node_stages=[], edge_stages=[])
+
+    assert new_id == 3
+    assert graph.graph['node_name_map']['new_image.cub'] == 3
+    assert sorted(graph.neighbors(3)) == [1, 2]
+    assert graph.edge[1][3].source is graph.node[1]
+    assert graph.edge[1][3].destination is graph.node[3]
+    # Existing edges are untouched
+    for (s, d), e in edges_before.items():
+        assert graph.edge[s][d] is e
+
+    # The index is maintained by add_image, and rebuilt once nodes are
+    # removed or their footprints change
+    assert sorted(graph.footprint_index[1]) == [0, 1, 2, 3]
+    graph.remove_node(1)
+    assert sorted(graph.footprint_index[1]) == [0, 2, 3]
+    graph.node[0].metadata = {'footprint': 'POLYGON ((100 0, 100 10, 110 10, 110 0, 100 0))'}
+    del graph.footprint_index
+    metadata = {'footprint': 'POLYGON ((102 2, 102 4, 104 4, 104 2, 102 2))',
+                'raster_size': [10, 10]}
+    with patch.object(network.io_metadata, 'read_metadata', return_value=metadata):
+        new_id = graph.add_image('other_image.cub', node_stages=[], edge_stages=[])
+    assert graph.neighbors(new_id) == [0]
 
 def test_island_nodes(disconnected_graph):
     assert len(disconnected_graph.island_nodes()) == 1
@@ -52,6 +89,14 @@ def test_triangular_cycles(graph):
     # Node order is variable, length is not
     assert len(cycles) == 1
 
+def test_triangular_cycles_iter():
+    g = network.CandidateGraph()
+    g.add_edges_from([(0, 1), (0, 2), (1, 2), (0, 3), (1, 3), (2, 3), (3, 4)])
+    cycles = g.triangular_cycles_iter()
+    assert next(cycles) == (0, 1, 2)
+    # Each triangle is found exactly once
+    assert list(cycles) == [(0, 1, 3), (0, 2, 3), (1, 2, 3)]
+
 def test_connected_subgraphs(graph, disconnected_graph):
     subgraph_list = disconnected_graph.connected_subgraphs()
     assert len(subgraph_list) == 2
@@ -83,6 +128,85 @@ def test_subset_graph(graph):
     node_sub = g.create_node_subgraph([0, 1])
     assert len(node_sub) == 2
 
+def test_subgraph_views(graph):
+    view = graph.create_node_subgraph([0, 1])
+    assert isinstance(view, network.CandidateGraphView)
+    assert sorted(view.nodes()) == [0, 1]
+    assert view.edges() == [(0, 1)]
+    assert 2 not in view and 2 not in view.adj[0]
+    assert view.degree(0) == 1
+
+    # Node and edge attributes are shared with the parent
+    assert view.node[0] is graph.node[0]
+    view.edge[0][1]['flag'] = True
+    assert graph.edge[0][1]['flag']
+
+    # The topology is read-only and graph attributes do not leak
+    with pytest.raises(nx.NetworkXError):
+        view.add_edge(0, 2)
+    with pytest.raises(nx.NetworkXError):
+        view.remove_node(0)
+    view.graph['creationdate'] = 'view'
+    assert graph.graph['creationdate'] != 'view'
+
+    # Views filter their parent lazily
+    graph.node[2]['keep'] = False
+    kept = graph.filter_nodes(lambda n: n.get('keep', True))
+    assert sorted(kept.nodes()) == [0, 1]
+    graph.node[2]['keep'] = True
+    assert sorted(kept.nodes()) == [0, 1, 2]
+
+    # Views of views
+    edge_view = kept.create_edge_subgraph([(1, 2), (0, 5)])
+    assert sorted(edge_view.nodes()) == [1, 2]
+    assert len(edge_view.edges()) == 1
+
+def test_filter_edges_eager(graph):
+    calls = []
+    def keep(edge):
+        calls.append(edge)
+        return edge.get('keep', True)
+    graph.edge[0][1]['keep'] = False
+    view = graph.filter_edges(keep)
+    # The predicate is evaluated once per edge, when the view is created
+    assert len(calls) == graph.number_of_edges()
+    assert len(view.edges()) == graph.number_of_edges() - 1
+    assert all(n in view for n in view.nodes())
+    assert len(calls) == graph.number_of_edges()
+
+    graph.edge[0][1]['keep'] = True
+    assert len(view.edges()) == graph.number_of_edges() - 1
+    del graph.edge[0][1]['keep']
+
+def test_subgraph_view_copy(graph):
+    view = graph.filter_edges(lambda e: (e.source['node_id'], e.destination['node_id']) != (0, 1))
+    assert sorted(view.nodes()) == [0, 1, 2]
+    assert len(view.edges()) == 2
+
+    h = view.copy()
+    assert not isinstance(h, network.CandidateGraphView)
+    assert sorted(h.nodes()) == [0, 1, 2]
+    assert len(h.edges()) == 2
+    h.add_edge(0, 1)
+    assert h.node[0] is not graph.node[0]
+    s, d = h.edges()[0]
+    if s > d:
+        s, d = d, s
+    assert h.edge[s][d].source is h.node[s]
+    assert len(view.edges()) == 2
+
+def test_subgraph_view_save(graph, tmpdir):
+    view = graph.create_node_subgraph([0, 1])
+    view.graph['sparsify'] = {'kept': 1}
+    path = str(tmpdir.join('view.project'))
+    view.save(path)
+
+    loaded = io_network.load(path)
+    assert sorted(loaded.nodes()) == [0, 1]
+    assert loaded.edges() == [(0, 1)]
+    assert loaded.graph['sparsify'] == {'kept': 1}
+    assert loaded.graph['creationdate'] == graph.graph['creationdate']
+
 def test_subgraph_from_matches(graph):
     test_sub_graph = graph.create_node_subgraph([0, 1])
     test_sub_graph.extract_features(extractor_parameters={'nfeatures': 25})
@@ -151,6 +275,105 @@ def test_apply_func_to_edges(graph):
     assert not graph[0][2].masks['symmetry'].all()
     assert not graph[0][1].masks['symmetry'].all()
 
+def test_imap_edge_results(graph, tmpdir, monkeypatch):
+    def fake_match(self, n):
+        self.matches = pd.DataFrame({'source_idx': np.arange(n)})
+        self.masks = pd.DataFrame({'symmetry': np.ones(n, dtype=bool)})
+    monkeypatch.setattr(edge.Edge, 'fake_match', fake_match, raising=False)
+
+    results = graph.imap_edge_results('fake_match', 3)
+    s, d, matches, masks = next(results)
+    # Edges are yielded as they complete, before the rest are processed
+    assert len(matches) == 3
+    assert masks['symmetry'].all()
+    assert sum(len(e.matches) for s, d, e in graph.edges_iter(data=True)) == 3
+    assert len(list(results)) == graph.number_of_edges() - 1
+
+    results = graph.imap_edge_results('fake_match', 4, executor='threads', release=True)
+    assert sorted(len(m) for s, d, m, k in results) == [4] * graph.number_of_edges()
+    for s, d, e in graph.edges_iter(data=True):
+        assert e.matches.empty
+        assert e.masks.empty
+
+def test_imap_edge_results_bounded(graph, monkeypatch):
+    def fake_match(self, n):
+        self.matches = pd.DataFrame({'source_idx': np.arange(n)})
+        self.masks = pd.DataFrame({'symmetry': np.ones(n, dtype=bool)})
+    monkeypatch.setattr(edge.Edge, 'fake_match', fake_match, raising=False)
+    window = pool.window_size(1)
+    assert graph.number_of_edges() > window
+
+    # A slow consumer holds back the workers
+    results = graph.imap_edge_results('fake_match', 2, executor='threads', nworkers=1,
+                                      release=True)
+    for s, d, matches, masks in results:
+        time.sleep(0.05)
+        materialized = sum(e.matches is not None and not e.matches.empty
+                           for s, d, e in graph.edges_iter(data=True))
+        assert 1 <= materialized <= window
+
+def test_subpixel_register_prefetch(graph, monkeypatch):
+    class FakeGeoData(object):
+        def __init__(self, value):
+            self.value = value
+
+        def read_array(self, band=1):
+            return np.full((4, 4), self.value)
+
+    registered = {}
+    def fake_subpixel_register(self, threshold=0.8, images=None):
+        registered[(self.source['node_id'], self.destination['node_id'])] = (threshold, images)
+    monkeypatch.setattr(edge.Edge, 'subpixel_register', fake_subpixel_register)
+    for i, n in graph.nodes_iter(data=True):
+        n._geodata = FakeGeoData(i)
+        n.metadata = {'raster_size': [4, 4]}
+
+    graph.subpixel_register(threshold=0.5, prefetch=64)
+    assert len(registered) == graph.number_of_edges()
+    for (s, d), (threshold, images) in registered.items():
+        assert threshold == 0.5
+        assert images[0][0, 0] == s
+        assert images[1][0, 0] == d
+
+    with pytest.raises(ValueError):
+        graph.subpixel_register(tiled=True, prefetch=64)
+
+def test_extract_features_from_overlaps(graph, monkeypatch):
+    regions = {}
+    def fake_extract(self, overlaps=[], downsampling=False, tiling=False, **kwargs):
+        regions[self['node_id']] = (sorted(overlaps), kwargs)
+    monkeypatch.setattr(node.Node, 'extract_features_from_overlaps', fake_extract)
+
+    for s, d, e in graph.edges_iter(data=True):
+        e['source_mbr'] = (s, s + 10, d, d + 10)
+        e['destin_mbr'] = (d, d + 10, s, s + 10)
+    graph.extract_features_from_overlaps(extractor_parameters={'nfeatures': 10})
+
+    for i in graph.nodes():
+        expected = []
+        for s, d, e in graph.edges_iter(i, data=True):
+            expected.append(e['source_mbr'] if e.source is graph.node[i] else e['destin_mbr'])
+        assert regions[i] == (sorted(expected), {'extractor_parameters': {'nfeatures': 10}})
+
+def test_extract_features_with_tiling_dropped(graph, monkeypatch):
+    def fake_tiling(self, tilesize=1000, overlap=500):
+        self.ndropped = self['node_id'] + overlap
+        return self.ndropped
+    monkeypatch.setattr(node.Node, 'extract_features_with_tiling', fake_tiling)
+    dropped = graph.extract_features_with_tiling(overlap=10)
+    assert dropped == {i: i + 10 for i in graph.nodes()}
+
+def test_enable_pyramids(graph, tmpdir, monkeypatch):
+    built = []
+    monkeypatch.setattr(node.Node, 'pyramid', lambda self, band=1: built.append((self['node_id'], band)))
+    graph.enable_pyramids(tmpdir.strpath)
+    assert graph.graph['pyramid_path'] == tmpdir.strpath
+    assert all(n.pyramid_path == tmpdir.strpath for i, n in graph.nodes_iter(data=True))
+    assert built == []
+
+    graph.enable_pyramids(tmpdir.strpath, build=True, band=2)
+    assert sorted(built) == [(i, 2) for i in sorted(graph.nodes())]
+
 def test_set_maxsize(graph):
     maxsizes = network.MAXSIZE
     assert(graph.maxsize == maxsizes[0])
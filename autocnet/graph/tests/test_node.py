@@ -1,5 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 import os
 import sys
+import time
 
 import unittest
 from unittest.mock import Mock, MagicMock
@@ -117,3 +119,236 @@ class TestNode(object):
                                    columns=['a', 'b'])
         matches, mask = node._clean(clean_keys=['a'])
         assert mask.equals(pd.Series([True, True, True, False, False]))
+
+
+class FakeGeoDataset(object):
+    """
+    An in-memory image with windowed reads
+    """
+    image = np.random.RandomState(0).random_sample((300, 250))
+
+    def __init__(self, path=None):
+        self.raster_size = (self.image.shape[1], self.image.shape[0])
+
+    def read_array(self, pixels=None):
+        xstart, ystart, xcount, ycount = pixels
+        return self.image[ystart:ystart + ycount, xstart:xstart + xcount]
+
+
+def _peaks(array, threshold=0.999):
+    # Every bright pixel is a keypoint, described by its value
+    y, x = np.nonzero(array > threshold)
+    keypoints = pd.DataFrame({'x': x.astype(np.float32), 'y': y.astype(np.float32)})
+    return keypoints, array[y, x].reshape(-1, 1)
+
+
+@pytest.mark.parametrize("nthreads", [1, 4])
+def test_extract_tiled_features_threads(monkeypatch, nthreads):
+    monkeypatch.setattr(node, 'GeoDataset', FakeGeoDataset)
+    monkeypatch.setattr(node.Node, '_extract_features', staticmethod(_peaks))
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    dropped = n.extract_features_with_tiling(tilesize=100, overlap=30, nthreads=nthreads)
+
+    # Keypoints seen by several tiles are kept once, aligned with their descriptors
+    keypoints, descriptors = _peaks(FakeGeoDataset.image)
+    assert n.nkeypoints == len(keypoints)
+    assert len(n.descriptors) == n.nkeypoints
+    x = n.keypoints['x'].values.astype(int)
+    y = n.keypoints['y'].values.astype(int)
+    assert (n.descriptors[:, 0] == FakeGeoDataset.image[y, x]).all()
+    assert set(zip(x, y)) == set(zip(keypoints['x'].astype(int), keypoints['y'].astype(int)))
+    assert dropped > 0
+
+
+def test_extract_tiled_features_near_duplicates(monkeypatch):
+    calls = []
+    def jittered_peaks(array):
+        # Each tile detects the same locations slightly differently
+        keypoints, descriptors = _peaks(array)
+        calls.append(len(keypoints))
+        keypoints['x'] += 0.01 * len(calls)
+        return keypoints, descriptors
+
+    monkeypatch.setattr(node, 'GeoDataset', FakeGeoDataset)
+    monkeypatch.setattr(node.Node, '_extract_features', staticmethod(jittered_peaks))
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    dropped = n.extract_features_with_tiling(tilesize=100, overlap=30)
+
+    assert n.nkeypoints == len(_peaks(FakeGeoDataset.image)[0])
+    assert dropped == sum(calls) - n.nkeypoints
+    assert len(n.descriptors) == n.nkeypoints
+
+
+def test_owning_tile():
+    tiles = [(0, 100), (70, 170), (140, 200)]
+    owners = node._owning_tile(np.array([0, 84.9, 85, 154.9, 155, 199]), tiles)
+    assert owners.tolist() == [0, 0, 1, 1, 2, 2]
+    assert node._owning_tile(np.array([5, 50]), [(0, 60)]).tolist() == [0, 0]
+
+
+class CountingGeoDataset(FakeGeoDataset):
+    reads = []
+
+    def read_array(self, pixels=None):
+        self.reads.append(pixels)
+        return super(CountingGeoDataset, self).read_array(pixels=pixels)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {'tiling': True, 'tilesize': 40, 'overlap': 10}])
+def test_extract_features_from_overlaps(monkeypatch, kwargs):
+    CountingGeoDataset.reads = []
+    monkeypatch.setattr(node, 'GeoDataset', CountingGeoDataset)
+    monkeypatch.setattr(node.Node, '_extract_features', staticmethod(_peaks))
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    # Two overlapping MBRs, the second clipped by the image
+    overlaps = [(10, 110, 20, 120), (60.5, 300, 70, 150)]
+    regions = n.extract_features_from_overlaps(overlaps, **kwargs)
+
+    # The union is read once
+    area = sum(xcount * ycount for xstart, ystart, xcount, ycount in CountingGeoDataset.reads)
+    union = 100 * 100 + 190 * 80 - 50 * 50
+    if kwargs:
+        assert area > union
+    else:
+        assert area == union
+    assert sum((maxx - minx) * (maxy - miny) for minx, maxx, miny, maxy in regions) == union
+
+    # Every bright pixel in the union, and only those, is a keypoint
+    mask = np.zeros(FakeGeoDataset.image.shape, dtype=bool)
+    mask[20:120, 10:110] = True
+    mask[70:150, 60:250] = True
+    expected = np.nonzero((FakeGeoDataset.image > 0.999) & mask)
+    assert n.nkeypoints == len(expected[0])
+    assert set(zip(n.keypoints['x'].astype(int), n.keypoints['y'].astype(int))) == \
+        set(zip(expected[1], expected[0]))
+
+
+def test_get_array_pyramid(monkeypatch, tmpdir):
+    CountingGeoDataset.reads = []
+    def read_band(self, band=1):
+        self.reads.append(band)
+        return self.image
+    monkeypatch.setattr(CountingGeoDataset, 'read_array', read_band)
+    monkeypatch.setattr(node, 'GeoDataset', CountingGeoDataset)
+    n = node.Node(image_name='fake', image_path='fake.cub')
+
+    # Without a pyramid the band is read and reduced on every call
+    assert n.get_array(level=1).shape == (150, 125)
+    assert len(CountingGeoDataset.reads) == 1
+
+    n.pyramid_path = tmpdir.strpath
+    level1 = n.get_array(level=1)
+    level0 = n.get_array()
+    assert level1.shape == (150, 125)
+    assert np.array_equal(level0, FakeGeoDataset.image)
+    # The pyramid is built from a single read and then reused
+    assert len(CountingGeoDataset.reads) == 2
+    assert n.get_array(level=2).shape == (75, 63)
+    assert len(CountingGeoDataset.reads) == 2
+
+
+class SerialGeoDataset(FakeGeoDataset):
+    """
+    A GDAL handle that fails when it is opened more than once or read by
+    more than one thread at a time
+    """
+    opened = 0
+
+    def __init__(self, path=None):
+        SerialGeoDataset.opened += 1
+        time.sleep(0.01)
+        self.reading = False
+        super(SerialGeoDataset, self).__init__(path)
+
+    def read_array(self, band=1):
+        assert not self.reading
+        self.reading = True
+        time.sleep(0.001)
+        self.reading = False
+        return self.image
+
+
+def test_get_array_threads(monkeypatch):
+    SerialGeoDataset.opened = 0
+    monkeypatch.setattr(node, 'GeoDataset', SerialGeoDataset)
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    with ThreadPoolExecutor(8) as executor:
+        arrays = list(executor.map(lambda i: n.get_array(), range(32)))
+    assert all(a is FakeGeoDataset.image for a in arrays)
+    assert SerialGeoDataset.opened == 1
+
+
+class FakeBand(object):
+    """
+    A GDAL band that decimates by sampling and records the windows read
+    """
+    def __init__(self, image, overviews=0):
+        self.image = image
+        self.YSize, self.XSize = image.shape
+        self.overviews = overviews
+        self.windows = []
+
+    def GetOverviewCount(self):
+        return self.overviews
+
+    def ReadAsArray(self, xoff, yoff, xsize, ysize, buf_xsize=None, buf_ysize=None, resample_alg=None):
+        self.windows.append((xoff, yoff, xsize, ysize))
+        window = self.image[yoff:yoff + ysize, xoff:xoff + xsize]
+        rows = (np.arange(buf_ysize) * ysize / buf_ysize).astype(int)
+        cols = (np.arange(buf_xsize) * xsize / buf_xsize).astype(int)
+        return window[rows][:, cols]
+
+
+@pytest.mark.parametrize("overviews", [0, 2])
+def test_read_decimated(overviews):
+    image = np.arange(800 * 600, dtype=np.float32).reshape(800, 600)
+    band = FakeBand(image, overviews=overviews)
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    n._geodata = Mock(raster_size=(600, 800))
+    n._geodata.dataset.GetRasterBand.return_value = band
+
+    array = n.read_decimated((100, 75))
+    assert array.shape == (100, 75)
+    assert array[0, 0] == image[0, 0]
+    # Decimating by 8 samples every 8th line and column
+    assert np.array_equal(array, image[::8, ::8])
+    if overviews:
+        assert band.windows == [(0, 0, 600, 800)]
+    else:
+        # The full resolution lines are read in strips no larger than the output
+        assert len(band.windows) > 1
+        assert sum(w[3] for w in band.windows) == 800
+        assert max(w[2] * w[3] for w in band.windows) <= 100 * 75
+
+
+def test_read_decimated_gdal1(monkeypatch):
+    # GDAL < 2.0 has no resampling algorithms, the band is decimated by
+    # nearest neighbour
+    class Band(FakeBand):
+        def ReadAsArray(self, xoff, yoff, xsize, ysize, buf_xsize=None, buf_ysize=None):
+            return super(Band, self).ReadAsArray(xoff, yoff, xsize, ysize, buf_xsize, buf_ysize)
+    monkeypatch.delattr(node.gdal, 'GRIORA_Average', raising=False)
+    image = np.arange(800 * 600, dtype=np.float32).reshape(800, 600)
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    n._geodata = Mock(raster_size=(600, 800))
+    n._geodata.dataset.GetRasterBand.return_value = Band(image)
+    assert np.array_equal(n.read_decimated((100, 75)), image[::8, ::8])
+
+
+def test_extract_downsampled_features_decimated(monkeypatch):
+    def corner(array):
+        # A keypoint at the last pixel of the array
+        rows, cols = array.shape
+        return pd.DataFrame({'x': [cols - 1.0], 'y': [rows - 1.0]}), np.ones((1, 128))
+    monkeypatch.setattr(node.Node, '_extract_features', staticmethod(corner))
+
+    image = np.zeros((800, 600), dtype=np.float32)
+    band = FakeBand(image)
+    n = node.Node(image_name='fake', image_path='fake.cub')
+    n._geodata = Mock(raster_size=(600, 800))
+    n._geodata.dataset.GetRasterBand.return_value = band
+    n.extract_features_with_downsampling(4)
+
+    assert n._geodata.read_array.call_count == 0
+    assert n.keypoints['x'][0] == pytest.approx(596)
+    assert n.keypoints['y'][0] == pytest.approx(796)
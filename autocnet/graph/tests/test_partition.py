@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import network
+from .. import partition
+
+
+def _cliques(n, size):
+    # n cliques of the given size joined in a ring by single edges
+    adjacency = {}
+    names = [['c{}_{}'.format(c, i) for i in range(size)] for c in range(n)]
+    for clique in names:
+        for a, b in itertools.permutations(clique, 2):
+            adjacency.setdefault(a, []).append(b)
+    for c in range(n):
+        a, b = names[c][0], names[(c + 1) % n][-1]
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+    return network.CandidateGraph.from_adjacency(adjacency)
+
+
+def _membership(parts):
+    return {n: p for p, nodes in parts.items() for n in nodes}
+
+
+def test_partition_cliques():
+    g = _cliques(4, 5)
+    report = g.compute_partitions(4)
+    assert sorted(len(p) for p in g.partitions.values()) == [5, 5, 5, 5]
+    # Only the ring edges are cut
+    assert sum(r['cut_edges'] for r in report.values()) == 2 * 4
+    assert sum(r['edges'] for r in report.values()) == g.number_of_edges()
+    membership = _membership(g.partitions)
+    for s, d in g.edges_iter():
+        if membership[s] != membership[d]:
+            assert g.node[s]['image_name'][:2] != g.node[d]['image_name'][:2]
+
+
+def test_partition_keypoint_weights():
+    g = _cliques(2, 4)
+    # A heavy node unbalances its clique, so a node must move
+    heavy = g.nodes()[0]
+    g.node[heavy].keypoints = pd.DataFrame({'x': np.zeros(3)})
+    parts, report = partition.partition(g, 2)
+    assert [r['weight'] for r in report.values()] == [5, 5]
+    membership = _membership(parts)
+    assert len(parts[membership[heavy]]) == 3
+    assert sum(r['movement'] for r in report.values()) >= 1
+
+
+def test_partition_weighted_bounds():
+    # A 12 x 12 grid with uneven keypoint counts
+    adjacency = {}
+    for i, j in itertools.product(range(12), range(12)):
+        adjacency['{}_{}'.format(i, j)] = ['{}_{}'.format(i + di, j + dj)
+                                           for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                                           if 0 <= i + di < 12 and 0 <= j + dj < 12]
+    g = network.CandidateGraph.from_adjacency(adjacency)
+    counts = np.random.RandomState(5).randint(1, 11, g.number_of_nodes())
+    for n, c in zip(g.nodes(), counts):
+        g.node[n].keypoints = pd.DataFrame({'x': np.zeros(c)})
+
+    parts, report = partition.partition(g, 3, imbalance=0.05)
+    target = counts.sum() / 3
+    for r in report.values():
+        assert 0.95 * target <= r['weight'] <= 1.05 * target
+    assert sum(len(p) for p in parts.values()) == 144
+
+
+def test_partition_single():
+    g = _cliques(2, 3)
+    parts, report = partition.partition(g, 1)
+    assert len(parts[0]) == 6
+    assert report[0]['cut_edges'] == 0
+    assert report[0]['movement'] == 0
+    with pytest.raises(ValueError):
+        partition.partition(g, 0)
+
+
+def test_edge_weight_overlap():
+    g = _cliques(1, 2)
+    s, d, e = g.edges(data=True)[0]
+    assert partition.edge_weight(e, 100, 40) == 40
+    e['weights']['overlap_percn'] = 50
+    assert partition.edge_weight(e, 100, 40) == 20
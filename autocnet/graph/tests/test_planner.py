@@ -0,0 +1,65 @@
+import pytest
+
+from .. import network
+from .. import planner
+from .. import pool
+
+
+def test_count_tiles():
+    assert planner.count_tiles(100, 200, 10) == 1
+    # Matches the tiles read by Node.extract_features_with_tiling
+    assert planner.count_tiles(2500, 1000, 500) == len(range(1000, 2500, 500)) + 1
+
+
+@pytest.mark.parametrize("raster_size, maxsize, expected", [
+    ((5000, 5000), None, 'extract_features'),
+    ((5000, 5000), 6250, 'extract_features'),
+    ((6250, 6251), 6250, 'extract_features_with_tiling'),
+    ((100000, 100000), 6250, 'extract_features_with_downsampling')])
+def test_plan(raster_size, maxsize, expected):
+    name, kwargs = planner.plan(raster_size, maxsize)
+    assert name == expected
+
+
+def test_plan_fits():
+    name, kwargs = planner.plan((20000, 8000), 6250, overlap=0.1)
+    assert kwargs == {'tilesize': 6250, 'overlap': 625}
+
+    name, kwargs = planner.plan((100000, 100000), 6250)
+    size = [int(s / kwargs['downsample_amount']) for s in (100000, 100000)]
+    assert size[0] * size[1] <= 6250 ** 2
+    # Not downsampled further than needed
+    assert kwargs['downsample_amount'] == pytest.approx(16)
+
+    name, kwargs = planner.plan((100000, 100000), 6250, max_tiles=None)
+    assert name == 'extract_features_with_tiling'
+
+
+def test_maxsize_for_budget():
+    assert network.maxsize_for_budget(0) is None
+    assert network.maxsize_for_budget(8) == network.MAXSIZE[8]
+    assert network.MAXSIZE[4] < network.maxsize_for_budget(6) < network.MAXSIZE[8]
+
+
+def test_extract_features_with_budget(monkeypatch):
+    calls = {}
+    def extract(node, function, args=(), kwargs={}, band=1):
+        calls[node['node_id']] = (function, kwargs)
+    monkeypatch.setattr(pool, 'extract', extract)
+
+    g = network.CandidateGraph.from_adjacency({'a.cub': ['b.cub'], 'b.cub': ['a.cub', 'c.cub'],
+                                               'c.cub': ['b.cub']})
+    sizes = {'a.cub': [1000, 1000], 'b.cub': [9000, 5000], 'c.cub': [200000, 200000]}
+    for i, node in g.nodes_iter(data=True):
+        node.metadata = {'raster_size': sizes[node['image_name']]}
+
+    plans = g.extract_features_with_budget(2, nfeatures=10)
+    assert sorted(plans) == sorted(calls) == [0, 1, 2]
+    names = {g.node[i]['image_name']: p[0] for i, p in plans.items()}
+    assert names == {'a.cub': 'extract_features',
+                     'b.cub': 'extract_features_with_tiling',
+                     'c.cub': 'extract_features_with_downsampling'}
+    for i, (name, kwargs) in calls.items():
+        assert name == plans[i][0]
+        assert kwargs == dict(plans[i][1], nfeatures=10)
+        assert g.node[i].maxsize == (6250, 6250)
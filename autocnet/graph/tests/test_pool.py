@@ -0,0 +1,131 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from autocnet.examples import get_path
+
+from .. import edge
+from .. import network
+from .. import node
+from .. import pool
+
+sys.path.insert(0, os.path.abspath('..'))
+
+
+def _flag(self, value=1):
+    self['flag'] = value
+    self.masks = pd.DataFrame({'flag': [True, False]})
+
+
+def _fake_extract(self, npts=5):
+    self._add_features(pd.DataFrame({'x': np.arange(npts, dtype=np.float32),
+                                     'y': np.arange(npts, dtype=np.float32)}),
+                       np.ones((npts, 128), dtype=np.float32))
+
+
+@pytest.fixture()
+def graph(monkeypatch):
+    monkeypatch.setattr(edge.Edge, 'flag', _flag, raising=False)
+    basepath = get_path('Apollo15')
+    return network.CandidateGraph.from_adjacency(get_path('three_image_adjacency.json'),
+                                                 basepath=basepath)
+
+
+@pytest.mark.parametrize("executor", [None, 'threads', 'processes'])
+def test_apply_func_to_edges_executor(graph, executor):
+    graph.apply_func_to_edges('flag', value=5, executor=executor, nworkers=2)
+    for s, d, e in graph.edges_iter(data=True):
+        assert e['flag'] == 5
+        assert e.masks['flag'].tolist() == [True, False]
+        # Merged edges still reference the nodes in the parent graph
+        assert e.source is graph.node[min(s, d)]
+        assert e.destination is graph.node[max(s, d)]
+
+
+def test_bad_executor(graph):
+    with pytest.raises(ValueError):
+        graph.apply_func_to_edges('flag', executor='gpus')
+
+
+def test_edge_cost():
+    e = edge.Edge()
+    assert pool.edge_cost(e) == 0
+
+    e.matches = pd.DataFrame({'source_idx': [0, 1, 2]})
+    assert pool.edge_cost(e) == 3
+
+
+def test_imap_nodes(graph, monkeypatch):
+    monkeypatch.setattr(node.Node, 'fake_extract', _fake_extract, raising=False)
+    nodes = [(i, n, (), {'npts': 3}) for i, n in graph.nodes_iter(data=True)]
+    for i, n in pool.imap_nodes(nodes, 'fake_extract', executor='processes', nworkers=2):
+        assert n is graph.node[i]
+
+    for i, n in graph.nodes_iter(data=True):
+        assert n.nkeypoints == 3
+        assert n.descriptors.shape == (3, 128)
+
+
+def test_imap_nodes_dropped(graph, monkeypatch):
+    def fake_tiling(self, npts=3):
+        _fake_extract(self, npts=npts)
+        self.ndropped = npts + 1
+        return self.ndropped
+    monkeypatch.setattr(node.Node, 'extract_features_with_tiling', fake_tiling)
+    nodes = [(i, n, (), {'npts': i}) for i, n in graph.nodes_iter(data=True)]
+    # The number of dropped keypoints is returned from the workers
+    for i, n in pool.imap_nodes(nodes, 'extract_features_with_tiling', executor='processes',
+                                nworkers=2):
+        assert n.ndropped == i + 1
+
+
+def test_imap_nodes_node_attributes(graph, monkeypatch, tmpdir):
+    def fake_extract(self):
+        # The worker's node carries the attributes of the parent's node
+        assert self.pyramid_path == str(tmpdir)
+        assert self.metadata['raster_size'] == [10, 10]
+        _fake_extract(self, npts=self.maxsize[0])
+    monkeypatch.setattr(node.Node, 'fake_extract', fake_extract, raising=False)
+    for i, n in graph.nodes_iter(data=True):
+        n.maxsize = (i + 1, 100)
+        n.pyramid_path = str(tmpdir)
+        n.metadata = {'raster_size': [10, 10]}
+
+    nodes = [(i, n, (), {}) for i, n in graph.nodes_iter(data=True)]
+    for i, n in pool.imap_nodes(nodes, 'fake_extract', executor='processes', nworkers=2):
+        assert n.nkeypoints == i + 1
+
+
+def test_imap_nodes_prefetch(graph, monkeypatch):
+    class FakeGeoData(object):
+        def __init__(self, value):
+            self.value = value
+
+        def read_array(self, band=1):
+            return np.full((10, 10), self.value + band)
+
+    def fake_extract_features(self, array, npts=5):
+        assert array.shape == (10, 10)
+        _fake_extract(self, npts=int(array[0, 0]))
+
+    monkeypatch.setattr(node.Node, 'extract_features', fake_extract_features)
+    for i, n in graph.nodes_iter(data=True):
+        n._geodata = FakeGeoData(i)
+        n.metadata = {'raster_size': [10, 10]}
+
+    nodes = [(i, n, (), {}) for i, n in graph.nodes_iter(data=True)]
+    results = pool.imap_nodes(nodes, 'extract_features', band=2, prefetch=400)
+    assert [i for i, n in results] == [i for i, n, a, k in nodes]
+    for i, n in graph.nodes_iter(data=True):
+        assert n.nkeypoints == i + 2
+
+def test_processes_out_of_core(graph, tmpdir):
+    graph.enable_out_of_core(tmpdir.join('store').strpath, max_bytes=0)
+    graph.apply_func_to_edges('flag', executor='processes', nworkers=2)
+    graph.store.flush()
+    for s, d, e in graph.edges_iter(data=True):
+        assert '_masks' not in e.__dict__
+        assert e.masks['flag'].tolist() == [True, False]
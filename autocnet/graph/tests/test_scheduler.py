@@ -0,0 +1,189 @@
+import itertools
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from autocnet.examples import get_path
+
+from .. import edge
+from .. import network
+from .. import node
+from .. import scheduler
+from autocnet.io import checkpoint
+
+sys.path.insert(0, os.path.abspath('..'))
+
+
+def _fake_extract(self, npts=5):
+    self.keypoints = pd.DataFrame({'x': np.arange(npts), 'y': np.arange(npts)})
+
+
+def _count(self):
+    # Both nodes must have been extracted before the edge runs
+    self['counted'] = self.source.nkeypoints + self.destination.nkeypoints
+
+
+def _double(self):
+    self['counted'] *= 2
+
+
+@pytest.fixture()
+def graph(monkeypatch):
+    monkeypatch.setattr(node.Node, 'fake_extract', _fake_extract, raising=False)
+    monkeypatch.setattr(edge.Edge, 'count', _count, raising=False)
+    monkeypatch.setattr(edge.Edge, 'double', _double, raising=False)
+    basepath = get_path('Apollo15')
+    return network.CandidateGraph.from_adjacency(get_path('three_image_adjacency.json'),
+                                                 basepath=basepath)
+
+
+def test_build_tasks(graph):
+    deps = scheduler.build_tasks(graph, ['fake_extract'], ['count', 'double'])
+    assert len(deps) == 3 + 3 * 2
+    assert deps[('node', 0, 0)] == set()
+    s, d = graph.edges()[0]
+    assert deps[('edge', (s, d), 0)] == {('node', s, 0), ('node', d, 0)}
+    assert deps[('edge', (s, d), 1)] == {('edge', (s, d), 0)}
+
+
+def test_run_pipeline(graph):
+    report = graph.run_pipeline(node_stages=[('fake_extract', {'npts': 3})],
+                                edge_stages=['count', 'double'], nworkers=2)
+    for s, d, e in graph.edges_iter(data=True):
+        assert e['counted'] == 12
+    assert len(report['durations']) == 9
+    # The critical path runs from a node through both edge stages
+    path = report['critical_path']
+    assert [t[0] for t in path] == ['node', 'edge', 'edge']
+    assert report['critical_path_time'] <= report['wall_time']
+
+
+def test_critical_path():
+    deps = {'a': set(), 'b': set(), 'c': {'a', 'b'}, 'd': {'c'}}
+    durations = {'a': 1, 'b': 5, 'c': 1, 'd': 2}
+    path, length = scheduler.critical_path(deps, durations)
+    assert path == ['b', 'c', 'd']
+    assert length == 8
+
+
+def test_run_pipeline_checkpoint(graph, tmpdir, monkeypatch):
+    with checkpoint.Checkpoint(tmpdir.strpath) as c:
+        graph.run_pipeline(node_stages=[('fake_extract', {'npts': 3})],
+                           edge_stages=['count'], checkpoint=c)
+
+    # A restarted run restores every unit and runs only the new stage
+    ran = []
+    monkeypatch.setattr(edge.Edge, 'count', lambda self: ran.append(self), raising=False)
+    restarted = network.CandidateGraph.from_adjacency(get_path('three_image_adjacency.json'),
+                                                      basepath=get_path('Apollo15'))
+    with checkpoint.Checkpoint(tmpdir.strpath) as c:
+        report = restarted.run_pipeline(node_stages=[('fake_extract', {'npts': 3})],
+                                        edge_stages=['count', 'double'], checkpoint=c)
+    assert ran == []
+    assert len(report['durations']) == 3
+    for s, d, e in restarted.edges_iter(data=True):
+        assert restarted.node[s].nkeypoints == 3
+        assert e['counted'] == 12
+
+    # A stage run again with different arguments is not restored
+    with checkpoint.Checkpoint(tmpdir.strpath) as c:
+        report = restarted.run_pipeline(node_stages=[('fake_extract', {'npts': 4})],
+                                        edge_stages=[], checkpoint=c)
+    assert len(report['durations']) == restarted.number_of_nodes()
+    assert all(n.nkeypoints == 4 for i, n in restarted.nodes_iter(data=True))
+
+
+class SerialGeoDataset(object):
+    """
+    A GDAL handle that counts the times it is opened and fails when it is
+    read by more than one thread at a time
+    """
+    opened = 0
+
+    def __init__(self, path=None):
+        SerialGeoDataset.opened += 1
+        time.sleep(0.01)
+        self.reading = False
+
+    def read_array(self, band=1):
+        assert not self.reading
+        self.reading = True
+        time.sleep(0.01)
+        self.reading = False
+        return np.zeros((2, 2))
+
+
+def _read_images(self):
+    self['shapes'] = [self.source.get_array().shape, self.destination.get_array().shape]
+
+
+def test_run_pipeline_reads(graph, monkeypatch):
+    # Edges sharing a node read its image concurrently
+    SerialGeoDataset.opened = 0
+    monkeypatch.setattr(node, 'GeoDataset', SerialGeoDataset)
+    monkeypatch.setattr(edge.Edge, 'read_images', _read_images, raising=False)
+    graph.run_pipeline(node_stages=[], edge_stages=['read_images'], nworkers=4)
+    for s, d, e in graph.edges_iter(data=True):
+        assert e['shapes'] == [(2, 2), (2, 2)]
+    assert SerialGeoDataset.opened == graph.number_of_nodes()
+
+
+def _grid_edges(n):
+    edges = []
+    for i, j in itertools.product(range(n), range(n)):
+        if i + 1 < n:
+            edges.append(((i, j), (i + 1, j)))
+        if j + 1 < n:
+            edges.append(((i, j), (i, j + 1)))
+    random.Random(0).shuffle(edges)
+    return edges
+
+
+def test_locality_order():
+    edges = _grid_edges(20)
+    ordered = scheduler.locality_order(edges)
+    assert sorted(ordered) == sorted(edges)
+    assert scheduler.count_reloads(ordered, 32) < scheduler.count_reloads(edges, 32) / 5
+    # A resident set wider than the bandwidth loads every node once
+    assert scheduler.count_reloads(ordered, 48) == 0
+    assert scheduler.locality_order([]) == []
+
+
+def test_count_reloads():
+    edges = [(0, 1), (1, 2), (2, 3), (0, 3)]
+    assert scheduler.count_reloads(edges, 4) == 0
+    assert scheduler.count_reloads(edges, 2) == 1
+    with pytest.raises(ValueError):
+        scheduler.count_reloads(edges, 1)
+
+
+def _touch(self):
+    self['total'] = self.source.nkeypoints + self.destination.nkeypoints
+
+
+def test_apply_func_to_edges_locality(tmpdir, monkeypatch):
+    monkeypatch.setattr(edge.Edge, 'touch', _touch, raising=False)
+    adjacency = {}
+    for s, d in _grid_edges(8):
+        s, d = '{}_{}'.format(*s), '{}_{}'.format(*d)
+        adjacency.setdefault(s, []).append(d)
+        adjacency.setdefault(d, []).append(s)
+
+    loads = {}
+    for order in [None, 'locality']:
+        g = network.CandidateGraph.from_adjacency(adjacency)
+        for i, n in g.nodes_iter(data=True):
+            n.keypoints = pd.DataFrame({'x': np.arange(100.0)})
+        size = g.node[0].keypoints.memory_usage(index=True).sum()
+        g.enable_out_of_core(tmpdir.join(str(order)).strpath, max_bytes=12 * size)
+        g.store.loads = 0
+        g.apply_func_to_edges('touch', order=order)
+        loads[order] = g.store.loads
+        for s, d, e in g.edges_iter(data=True):
+            assert e['total'] == 200
+    assert loads['locality'] < loads[None]
@@ -0,0 +1,124 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import network
+from .. import sparsify
+
+
+def _strip():
+    # 10 x 10 footprints along x.  0-1 and 1-2 overlap well, 0-2 is a
+    # sliver of area 5 and 2-3, a sliver of area 1, is the only edge to 3.
+    offsets = {'a': 0, 'b': 5, 'c': 9.5, 'd': 19.4}
+    adjacency = {'a': ['b', 'c'], 'b': ['a', 'c'], 'c': ['a', 'b', 'd'], 'd': ['c']}
+    g = network.CandidateGraph.from_adjacency(adjacency)
+    for i, node in g.nodes_iter(data=True):
+        x = offsets[node['image_name']]
+        node.metadata = {'footprint': 'POLYGON (({0} 0, {0} 10, {1} 10, {1} 0, {0} 0))'.format(x, x + 10)}
+        node.keypoints = pd.DataFrame({'x': np.zeros(10)})
+    names = {node['image_name']: i for i, node in g.nodes_iter(data=True)}
+    return g, names
+
+
+def test_overlap():
+    g, names = _strip()
+    g.overlap()
+    weights = g.edge[names['a']][names['b']]['weights']
+    assert weights['overlap_area'] == pytest.approx(50)
+    assert weights['overlap_percn'] == pytest.approx(100 / 3)
+    assert g.edge[names['c']][names['d']]['weights']['overlap_area'] == pytest.approx(1)
+
+
+def test_prune_edges():
+    g, names = _strip()
+    report = g.prune_edges(min_area=10)
+    assert g.number_of_edges() == 3
+    # The a-c sliver is removed, the c-d sliver is kept to reach d
+    assert not g.has_edge(names['a'], names['c'])
+    assert g.has_edge(names['c'], names['d'])
+    assert report['edges'] == 4
+    assert report['removed'] == 1
+    assert report['retained'] == 1
+    assert report['work'] == 400
+    assert report['work_removed'] == 100
+    assert report['area_removed'] == pytest.approx(5)
+
+
+def test_prune_percentage():
+    g, names = _strip()
+    g.overlap()
+    removed, report = sparsify.prune(g, min_percentage=5)
+    assert removed in ([(names['a'], names['c'])], [(names['c'], names['a'])])
+    assert report['retained'] == 1
+    # Nothing is removed without thresholds
+    removed, report = sparsify.prune(g)
+    assert removed == []
+
+
+def test_prune_preserves_components():
+    g, names = _strip()
+    g.overlap()
+    removed, report = sparsify.prune(g, min_area=1000)
+    # Every edge is weak, a maximum spanning tree is kept
+    assert report['retained'] == 3
+    assert removed in ([(names['a'], names['c'])], [(names['c'], names['a'])])
+
+
+def test_union_find():
+    components = sparsify.UnionFind()
+    assert components.union(0, 1)
+    assert components.union(2, 3)
+    assert not components.union(1, 0)
+    assert components.find(0) != components.find(3)
+    assert components.union(1, 3)
+    assert components.find(0) == components.find(2)
+
+
+def _bridges(g):
+    bridges = []
+    for s, d in g.edges():
+        h = g.copy()
+        h.remove_edge(s, d)
+        if nx.number_connected_components(h) > nx.number_connected_components(g):
+            bridges.append((s, d))
+    return bridges
+
+
+def test_spanning_forests():
+    g = network.CandidateGraph()
+    g.add_edges_from((s, d) for s in range(8) for d in range(s + 1, 8))
+    for s, d, e in g.edges_iter(data=True):
+        # Neighbors in a strip overlap most
+        e['weights']['overlap_area'] = 100 - 10 * abs(s - d)
+
+    kept, report = sparsify.spanning_forests(g, k=1)
+    assert sorted(tuple(sorted(e)) for e in kept) == [(i, i + 1) for i in range(7)]
+    assert report['forests'] == [7]
+
+    kept, report = sparsify.spanning_forests(g, k=2)
+    assert report['edges'] == 28
+    assert report['kept'] == len(kept) <= 2 * 7
+    assert report['forests'] == [7, 7]
+    h = nx.Graph(kept)
+    assert nx.is_connected(h)
+    assert _bridges(h) == []
+
+    with pytest.raises(ValueError):
+        sparsify.spanning_forests(g, k=0)
+
+
+def test_sparse_subgraph():
+    g, names = _strip()
+    h = g.sparse_subgraph(k=2)
+    assert h.number_of_nodes() == 4
+    assert g.number_of_edges() == 4
+    # a-b-c is a triangle, d hangs from c by a single edge
+    assert h.number_of_edges() == 4
+    assert h.graph['sparsify']['forests'] == [3, 1]
+
+    h = g.sparse_subgraph(k=1)
+    assert h.number_of_edges() == 3
+    assert not h.has_edge(names['a'], names['c'])
+    assert h.edge[names['a']][names['b']] is g.edge[names['a']][names['b']]
+    assert h.graph['sparsify']['work_kept'] == 300
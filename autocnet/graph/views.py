@@ -0,0 +1,166 @@
+from collections.abc import Mapping
+
+import networkx as nx
+
+
+# The networkx.Graph methods that modify the topology of a graph
+MUTATORS = ('add_node', 'add_nodes_from', 'remove_node', 'remove_nodes_from',
+            'add_edge', 'add_edges_from', 'add_weighted_edges_from',
+            'remove_edge', 'remove_edges_from', 'add_star', 'add_path',
+            'add_cycle', 'clear')
+
+
+def no_filter(*args):
+    """
+    A filter that keeps every node or edge
+    """
+    return True
+
+
+class ShowNodes(object):
+    """
+    A node filter that keeps the given nodes
+
+    Parameters
+    ----------
+    nodes : iterable
+            of node identifiers to keep
+    """
+    def __init__(self, nodes):
+        self.nodes = set(nodes)
+
+    def __call__(self, n):
+        return n in self.nodes
+
+
+class ShowEdges(object):
+    """
+    An edge filter that keeps the given (undirected) edges
+
+    Parameters
+    ----------
+    edges : iterable
+            of (u, v) edges to keep
+    """
+    def __init__(self, edges):
+        self.edges = set()
+        for u, v in edges:
+            self.edges.add((u, v))
+            self.edges.add((v, u))
+
+    def __call__(self, u, v):
+        return (u, v) in self.edges
+
+
+class FilteredNodes(Mapping):
+    """
+    A read-only, lazily filtered view of a node (or adjacency) mapping.
+
+    Parameters
+    ----------
+    nodes : Mapping
+            The parent mapping
+
+    filter_node : callable
+                  Returns True for the node identifiers to keep
+    """
+    def __init__(self, nodes, filter_node):
+        self._nodes = nodes
+        self._filter_node = filter_node
+
+    def __contains__(self, n):
+        try:
+            return n in self._nodes and self._filter_node(n)
+        except TypeError:
+            # Unhashable, e.g. a list passed as an nbunch
+            return False
+
+    def __getitem__(self, n):
+        if n in self:
+            return self._nodes[n]
+        raise KeyError(n)
+
+    def __iter__(self):
+        if isinstance(self._filter_node, ShowNodes):
+            # Iterate over the (usually smaller) set of kept nodes
+            return (n for n in self._filter_node.nodes if n in self._nodes)
+        return (n for n in self._nodes if self._filter_node(n))
+
+    def __len__(self):
+        return sum(1 for n in self)
+
+
+class FilteredNeighbors(FilteredNodes):
+    """
+    A read-only, lazily filtered view of the neighbors of a node.
+
+    Parameters
+    ----------
+    u : hashable
+        The node identifier
+
+    neighbors : Mapping
+                The parent mapping of neighbors to edges
+
+    filter_node : callable
+                  Returns True for the node identifiers to keep
+
+    filter_edge : callable
+                  Returns True for the (u, v) edges to keep
+    """
+    def __init__(self, u, neighbors, filter_node, filter_edge):
+        self._u = u
+        self._filter_edge = filter_edge
+        super(FilteredNeighbors, self).__init__(neighbors, filter_node)
+
+    def __contains__(self, v):
+        return (v in self._nodes and self._filter_edge(self._u, v)
+                and self._filter_node(v))
+
+    def __iter__(self):
+        return (v for v in self._nodes
+                if self._filter_edge(self._u, v) and self._filter_node(v))
+
+
+class FilteredAdjacency(FilteredNodes):
+    """
+    A read-only, lazily filtered view of an adjacency (dict of dicts)
+    mapping.
+
+    Parameters
+    ----------
+    adj : Mapping
+          The parent adjacency
+
+    filter_node : callable
+                  Returns True for the node identifiers to keep
+
+    filter_edge : callable
+                  Returns True for the (u, v) edges to keep
+    """
+    def __init__(self, adj, filter_node, filter_edge):
+        self._filter_edge = filter_edge
+        super(FilteredAdjacency, self).__init__(adj, filter_node)
+
+    def __getitem__(self, u):
+        if u in self:
+            return FilteredNeighbors(u, self._nodes[u], self._filter_node, self._filter_edge)
+        raise KeyError(u)
+
+
+def read_only(cls):
+    """
+    A class decorator that replaces the topology modifying methods of a
+    graph class, and those listed in the class' _mutators attribute, with
+    methods that raise a NetworkXError.
+    """
+    def _read_only(name):
+        def method(self, *args, **kwargs):
+            raise nx.NetworkXError('{} is not supported by a read-only graph view, '
+                                   'use copy() to create a mutable graph'.format(name))
+        method.__name__ = name
+        return method
+
+    for name in MUTATORS + tuple(getattr(cls, '_mutators', ())):
+        setattr(cls, name, _read_only(name))
+    return cls
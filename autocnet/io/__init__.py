@@ -1,2 +1,4 @@
 from . import keypoints
 from . import network
+from . import metadata
+from . import checkpoint
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import pickle
+import queue
+import threading
+
+import numpy as np
+
+
+def node_unit(node_id):
+    """
+    The checkpoint unit identifier of a node
+    """
+    return 'node_{}'.format(node_id)
+
+
+def edge_unit(source, destination):
+    """
+    The checkpoint unit identifier of an edge.  The identifier does not
+    depend upon the orientation of the edge.
+    """
+    source, destination = sorted((source, destination))
+    return 'edge_{}_{}'.format(source, destination)
+
+
+def _encode(obj):
+    """
+    Encode an argument that json can not serialize, such that the encoding
+    is the same in every run.  Arrays are hashed, numpy scalars converted,
+    sets sorted and callables named by their module and qualified name.
+    Objects whose repr holds a memory address can not be encoded.
+    """
+    if isinstance(obj, np.ndarray):
+        return hashlib.sha1(np.ascontiguousarray(obj).tobytes()).hexdigest()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    if callable(obj) and hasattr(obj, '__qualname__'):
+        return '{}.{}'.format(getattr(obj, '__module__', None), obj.__qualname__)
+    encoded = repr(obj)
+    if ' at 0x' in encoded:
+        raise TypeError('{} can not be encoded in a stage key, since its repr '
+                        'differs between runs'.format(encoded))
+    return encoded
+
+
+def stage_key(stage, args=(), kwargs={}):
+    """
+    The identifier a stage is recorded under.  A hash of the arguments of
+    the stage is appended to its name, so that running a stage again with
+    different arguments (e.g. match with a different k) is not mistaken
+    for the completed run.  A stage without arguments is recorded under
+    its name.  Arguments are encoded so that the identifier is the same in
+    every run (see _encode), a TypeError is raised for arguments that can
+    not be.
+
+    Parameters
+    ----------
+    stage : str
+            The name of the stage, e.g. 'match'
+
+    args : tuple
+           of arguments passed to the stage
+
+    kwargs : dict
+             of keyword arguments passed to the stage
+
+    Returns
+    -------
+     : str
+       The stage identifier
+    """
+    if not args and not kwargs:
+        return stage
+    params = json.dumps([list(args), kwargs], sort_keys=True, default=_encode)
+    return '{}:{}'.format(stage, hashlib.sha1(params.encode()).hexdigest()[:16])
+
+
+class Checkpoint(object):
+    """
+    Per-unit (node or edge) completion records for the stages of a
+    pipeline, e.g. extract_features or match, identified by the stage name
+    and a hash of its arguments (see stage_key).  The state of a unit is
+    written to disk by a background thread, behind the computation, and a
+    record of the completed stage is appended to a log only once the state
+    is on disk.  A restarted run reads the log and skips the completed
+    units, restoring their state instead.
+
+    Parameters
+    ----------
+    path : str
+           The directory the log and the unit states are written to.  If
+           the directory contains a log, the completed stages are loaded.
+
+    Attributes
+    ----------
+    completed : set
+                of (stage, unit) tuples
+
+    writes : int
+             The number of unit states written to disk
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.path = path
+        self.log = os.path.join(path, 'checkpoint.log')
+        self.completed = set()
+        self.writes = 0
+
+        if os.path.exists(self.log):
+            with open(self.log, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A partially written final record
+                        continue
+                    self.completed.add((record['stage'], record['unit']))
+
+        # Units whose in memory state matches the state on disk
+        self._current = set()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._error = None
+        self._writer = threading.Thread(target=self._write_behind, daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _filename(self, unit):
+        return os.path.join(self.path, '{}.pkl'.format(unit))
+
+    def _write_behind(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                stage, unit, data = item
+                filename = self._filename(unit)
+                tmp = '{}.tmp'.format(filename)
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, filename)
+                with open(self.log, 'a') as f:
+                    f.write(json.dumps({'stage': stage, 'unit': unit}) + '\n')
+                self.writes += 1
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def is_complete(self, stage, unit):
+        """
+        Parameters
+        ----------
+        stage : str
+                The stage identifier, see stage_key
+
+        unit : str
+               The unit identifier, see node_unit and edge_unit
+
+        Returns
+        -------
+         : bool
+           True if the stage has been completed for the unit
+        """
+        with self._lock:
+            return (stage, unit) in self.completed
+
+    def is_current(self, unit):
+        """
+        True if the unit's state has been recorded or loaded by this
+        checkpoint, i.e. the in memory state does not need to be restored.
+        """
+        with self._lock:
+            return unit in self._current
+
+    def record(self, stage, unit, state):
+        """
+        Record the completion of a stage.  The state is serialized
+        immediately, so that later stages may modify the unit, and written
+        to disk in the background.
+
+        Parameters
+        ----------
+        stage : str
+                The stage identifier, see stage_key
+
+        unit : str
+               The unit identifier
+
+        state : object
+                The picklable state of the unit after the stage
+        """
+        if self._error is not None:
+            raise self._error
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.completed.add((stage, unit))
+            self._current.add(unit)
+        self._queue.put((stage, unit, data))
+
+    def load(self, unit):
+        """
+        Load the most recently recorded state of a unit.
+
+        Parameters
+        ----------
+        unit : str
+               The unit identifier
+
+        Returns
+        -------
+         : object
+           The state, or None if no state has been recorded
+        """
+        filename = self._filename(unit)
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'rb') as f:
+            state = pickle.load(f)
+        with self._lock:
+            self._current.add(unit)
+        return state
+
+    def flush(self):
+        """
+        Block until all of the recorded states have been written to disk.
+        """
+        self._queue.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """
+        Flush and stop the background writer.
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,147 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+
+from plio.io.io_gdal import GeoDataset
+from plio.io.isis_serial_number import generate_serial_number
+
+
+def read_metadata(path):
+    """
+    Read the metadata needed to build a candidate graph from an image.
+
+    Parameters
+    ----------
+    path : str
+           PATH to the image
+
+    Returns
+    -------
+    metadata : dict
+               with keys: footprint (WKT or None), raster_size,
+               isis_serial (or None), latlon_corners (or None), and mtime
+    """
+    geodata = GeoDataset(path)
+    metadata = {'mtime': os.path.getmtime(path),
+                'raster_size': list(geodata.raster_size)}
+
+    try:
+        footprint = geodata.footprint
+        metadata['footprint'] = footprint.ExportToWkt() if footprint else None
+    except:
+        metadata['footprint'] = None
+
+    try:
+        metadata['latlon_corners'] = [list(c) for c in geodata.latlon_corners]
+    except:
+        metadata['latlon_corners'] = None
+
+    try:
+        metadata['isis_serial'] = generate_serial_number(path)
+    except:
+        metadata['isis_serial'] = None
+
+    return metadata
+
+
+def read_cache(cache):
+    """
+    Read a sidecar metadata cache.
+
+    Parameters
+    ----------
+    cache : str
+            PATH to the JSON cache file
+
+    Returns
+    -------
+     : dict
+       with absolute image PATHs as keys and metadata dicts as values.  If
+       the cache does not exist, an empty dict.
+    """
+    if not os.path.exists(cache):
+        return {}
+    with open(cache, 'r') as f:
+        return json.load(f)
+
+
+def write_cache(entries, cache):
+    """
+    Write a sidecar metadata cache.  The cache is written to a temporary
+    file and then moved into place so that an interrupted write does not
+    corrupt an existing cache.
+
+    Parameters
+    ----------
+    entries : dict
+              with absolute image PATHs as keys and metadata dicts as values
+
+    cache : str
+            PATH to the JSON cache file
+    """
+    tmp = '{}.tmp'.format(cache)
+    with open(tmp, 'w') as f:
+        json.dump(entries, f)
+    os.replace(tmp, cache)
+
+
+def scan(paths, cache=None, parallel=False, nworkers=None):
+    """
+    Read the metadata (footprint, raster size, ISIS serial and lat/lon
+    corners) for a list of images.  If a cache is given, images whose
+    modification time is unchanged since the cache was written are not
+    opened.
+
+    Parameters
+    ----------
+    paths : list
+            of PATHs to images
+
+    cache : str
+            PATH to a JSON sidecar cache, keyed by the absolute image PATH.
+            The cache is created or updated with any newly read metadata.
+
+    parallel : bool
+               If True, read the uncached images using a pool of processes.
+               Default: False
+
+    nworkers : int
+               The number of processes to use when parallel is True.
+               Default: the number of cpus
+
+    Returns
+    -------
+    metadata : list
+               of metadata dicts in the same order as paths
+
+    See Also
+    --------
+    autocnet.io.metadata.read_metadata
+    """
+    entries = read_cache(cache) if cache else {}
+    keys = [os.path.abspath(p) for p in paths]
+
+    metadata = [None] * len(paths)
+    stale = []
+    for i, (path, key) in enumerate(zip(paths, keys)):
+        entry = entries.get(key)
+        if entry is not None and entry['mtime'] == os.path.getmtime(path):
+            metadata[i] = entry
+        else:
+            stale.append(i)
+
+    stale_paths = [paths[i] for i in stale]
+    if parallel and stale_paths:
+        with ProcessPoolExecutor(max_workers=nworkers) as workers:
+            results = list(workers.map(read_metadata, stale_paths, chunksize=16))
+    else:
+        results = [read_metadata(p) for p in stale_paths]
+
+    for i, result in zip(stale, results):
+        metadata[i] = result
+        entries[keys[i]] = result
+
+    if cache and stale:
+        write_cache(entries, cache)
+
+    return metadata
@@ -42,8 +42,10 @@ def save(network, projectname):
     projectname : str
                   The PATH to the output file.
     """
-    # Convert the graph into json format
+    # Convert the graph into json format.  The graph attributes of a
+    # CandidateGraphView are a ChainMap over those of its parent.
     js = json_graph.node_link_data(network)
+    js['graph'] = dict(js['graph'])
 
     with ZipFile(projectname, 'w') as pzip:
         js_str = json.dumps(js, cls=NumpyEncoder, sort_keys=True, indent=4)
@@ -0,0 +1,82 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def raster_nbytes(node, itemsize=4):
+    """
+    Estimate the size of a full band read of a node's image.  The cached
+    metadata is used when available, so the image is not opened.
+
+    Parameters
+    ----------
+    node : object
+           An autocnet.graph.node.Node object
+
+    itemsize : int
+               The number of bytes per pixel
+
+    Returns
+    -------
+     : int
+       The estimated number of bytes
+    """
+    samples, lines = node.raster_size
+    return samples * lines * itemsize
+
+
+def prefetch(items, read, nbytes, max_bytes=2**30, nworkers=1):
+    """
+    Read the data for a sequence of items ahead of their use.  While the
+    caller processes one item, the following items are read in background
+    threads (GDAL releases the GIL while reading), so that computation and
+    disk access overlap.  Reads are started in order while the estimated
+    size of the reads that are in flight or waiting to be consumed is
+    within max_bytes.  The next item is always read, however large.
+
+    Parameters
+    ----------
+    items : iterable
+            of items, e.g. (node identifier, node) tuples
+
+    read : callable
+           Returns the data for an item, e.g. the image array
+
+    nbytes : callable
+             Returns the estimated size of the data of an item in bytes
+
+    max_bytes : int
+                The in-flight byte budget
+
+    nworkers : int
+               The number of reader threads
+
+    Yields
+    ------
+    item : object
+           The item
+
+    data : object
+           The data returned by read, in the order of the items
+    """
+    items = iter(items)
+    inflight = deque()
+    budget = 0
+
+    def _fill(workers):
+        nonlocal budget
+        for item in items:
+            size = nbytes(item)
+            inflight.append((item, size, workers.submit(read, item)))
+            budget += size
+            if budget >= max_bytes:
+                return
+
+    with ThreadPoolExecutor(max_workers=nworkers) as workers:
+        _fill(workers)
+        while inflight:
+            item, size, future = inflight.popleft()
+            data = future.result()
+            budget -= size
+            if budget < max_bytes:
+                _fill(workers)
+            yield item, data
@@ -0,0 +1,144 @@
+import os
+import threading
+
+import numpy as np
+
+
+def reduce(array):
+    """
+    Halve the size of an array by averaging 2 x 2 blocks of pixels.  An odd
+    trailing row or column is averaged with itself.
+
+    Parameters
+    ----------
+    array : ndarray
+            A two dimensional array
+
+    Returns
+    -------
+    reduced : ndarray
+              of the same dtype, with shape ceil(rows / 2), ceil(cols / 2)
+    """
+    rows, cols = array.shape
+    padded = np.pad(array, ((0, rows % 2), (0, cols % 2)), mode='edge')
+    reduced = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).mean(axis=(1, 3))
+    if np.issubdtype(array.dtype, np.integer):
+        reduced = np.rint(reduced)
+    return reduced.astype(array.dtype)
+
+
+def nlevels(shape, min_size=32):
+    """
+    The number of power-of-two levels, including the full resolution level
+    0, whose smallest side is at least min_size pixels.
+
+    Parameters
+    ----------
+    shape : tuple
+            (rows, cols) of the full resolution array
+
+    min_size : int
+               The minimum side length of the coarsest level
+
+    Returns
+    -------
+     : int
+       The number of levels, at least 1
+    """
+    smallest = min(shape)
+    levels = 1
+    while smallest // 2 >= min_size:
+        smallest = (smallest + 1) // 2
+        levels += 1
+    return levels
+
+
+class Pyramid(object):
+    """
+    A power-of-two image pyramid of one band of an image, persisted as one
+    .npy file per level.  Level 0 is the full resolution band and level k
+    is reduced by a factor of 2**k.  Levels are memory mapped when read,
+    so consumers do not decode the image again and only the pages they
+    touch are loaded.
+
+    Parameters
+    ----------
+    path : str
+           The directory holding the pyramid, e.g. next to the project
+
+    image_path : str
+                 PATH to the image
+
+    band : int
+           The band of the image
+    """
+
+    def __init__(self, path, image_path, band=1):
+        self.path = path
+        self.image_path = image_path
+        self.band = band
+
+    def level_path(self, level):
+        """
+        The PATH to the .npy file of a level
+        """
+        name = '{}.b{}.l{}.npy'.format(os.path.basename(self.image_path), self.band, level)
+        return os.path.join(self.path, name)
+
+    def is_current(self):
+        """
+        True if the pyramid has been built since the image was last
+        modified
+        """
+        base = self.level_path(0)
+        if not os.path.exists(base):
+            return False
+        if os.path.exists(self.image_path):
+            return os.path.getmtime(base) >= os.path.getmtime(self.image_path)
+        return True
+
+    def build(self, array, min_size=32):
+        """
+        Build and write the levels of the pyramid.  Each level is reduced
+        from the previous one and written atomically, so that concurrent
+        builders and readers never see a partial file.  The coarsest level
+        is written first and level 0 last, which marks the pyramid as
+        complete.
+
+        Parameters
+        ----------
+        array : ndarray
+                The full resolution band
+
+        min_size : int
+                   The minimum side length of the coarsest level
+        """
+        os.makedirs(self.path, exist_ok=True)
+        levels = [array]
+        for i in range(1, nlevels(array.shape, min_size=min_size)):
+            levels.append(reduce(levels[-1]))
+
+        for i, level in reversed(list(enumerate(levels))):
+            path = self.level_path(i)
+            tmp = '{}.{}.{}.tmp.npy'.format(path, os.getpid(), threading.get_ident())
+            np.save(tmp, level)
+            os.replace(tmp, path)
+
+    def read(self, level=0):
+        """
+        Read a level of the pyramid
+
+        Parameters
+        ----------
+        level : int
+                The level, reduced by a factor of 2**level
+
+        Returns
+        -------
+         : ndarray
+           A read-only, memory mapped array
+        """
+        path = self.level_path(level)
+        if not os.path.exists(path):
+            raise ValueError('Level {} is not in the pyramid of {}'.format(level, self.image_path))
+        return np.load(path, mmap_mode='r')
@@ -0,0 +1,381 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def nbytes(value):
+    """
+    Estimate the in-memory size of a payload.
+
+    Parameters
+    ----------
+    value : object
+            A DataFrame, ndarray, or None
+
+    Returns
+    -------
+     : int
+       The size in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    elif isinstance(value, np.ndarray):
+        return value.nbytes
+    return 0
+
+
+class PayloadStore(object):
+    """
+    An on-disk store for the large node and edge attributes (payloads),
+    e.g. keypoints, descriptors, matches and masks.  Payloads are loaded on
+    access and held in a least recently used (LRU) cache that is bounded by
+    a byte budget.  Payloads that have been assigned (put) or marked as
+    modified (touch) are written back to disk when they are evicted or the
+    store is flushed.  In place modifications that are not marked are lost
+    when the payload is evicted.
+
+    Pinned payloads (see pin and pinned) are never evicted, so that the
+    references a node or edge method holds stay valid while it runs.  The
+    byte budget should hold at least the payloads of a single edge and its
+    two nodes, since that is the working set of an edge method; pinned
+    payloads are kept even if they exceed it.
+
+    Attributes
+    ----------
+    path : str
+           The directory the payloads are written to
+
+    max_bytes : int
+                The maximum number of bytes held in memory
+
+    nbytes : int
+             The number of bytes currently held in memory
+
+    loads : int
+            The number of payloads read from disk
+
+    writes : int
+             The number of payloads written to disk
+    """
+
+    def __init__(self, path, max_bytes=2**30):
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.loads = 0
+        self.writes = 0
+
+        self._cache = OrderedDict()
+        self._sizes = {}
+        self._dirty = set()
+        self._pins = {}
+        # Edges may be processed by a pool of threads
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        return key in self._cache or os.path.exists(self._filename(key))
+
+    def _filename(self, key):
+        return os.path.join(self.path, '{}.pkl'.format(key))
+
+    def _insert(self, key, value):
+        self._cache[key] = value
+        size = nbytes(value)
+        self.nbytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _write(self, key):
+        with open(self._filename(key), 'wb') as f:
+            pickle.dump(self._cache[key], f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.writes += 1
+        self._dirty.discard(key)
+
+    def _evict(self):
+        if self.nbytes <= self.max_bytes:
+            return
+        # Always keep the most recently used payload, and any pinned
+        # payloads, in memory.  Walk from the least recently used end and
+        # pop once done, since the cache can not change while iterated.
+        evicted = []
+        excess = self.nbytes - self.max_bytes
+        last = len(self._cache) - 1
+        for i, key in enumerate(self._cache):
+            if excess <= 0 or i == last:
+                break
+            if self._pins.get(key):
+                continue
+            if key in self._dirty:
+                self._write(key)
+            evicted.append(key)
+            excess -= self._sizes[key]
+        for key in evicted:
+            self._cache.pop(key)
+            self.nbytes -= self._sizes.pop(key)
+
+    def get(self, key, default=None):
+        """
+        Get a payload, loading it from disk if it is not in memory.
+
+        Parameters
+        ----------
+        key : str
+              The payload key
+
+        default : object
+                  Returned, and stored, if the key does not exist.  If
+                  callable, it is called to create the default value.
+
+        Returns
+        -------
+         : object
+           The payload
+        """
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+            filename = self._filename(key)
+            if os.path.exists(filename):
+                with open(filename, 'rb') as f:
+                    value = pickle.load(f)
+                self.loads += 1
+            else:
+                value = default() if callable(default) else default
+
+            self._insert(key, value)
+            self._evict()
+            return value
+
+    def put(self, key, value):
+        """
+        Set a payload.  The payload is written to disk when it is evicted
+        or the store is flushed.
+
+        Parameters
+        ----------
+        key : str
+              The payload key
+
+        value : object
+                The payload
+        """
+        with self._lock:
+            self._insert(key, value)
+            self._cache.move_to_end(key)
+            self._dirty.add(key)
+            self._evict()
+
+    def touch(self, key):
+        """
+        Mark a payload held in memory as modified in place, so that it is
+        written to disk when it is evicted or the store is flushed.
+
+        Parameters
+        ----------
+        key : str
+              The payload key
+        """
+        with self._lock:
+            if key in self._cache:
+                self._dirty.add(key)
+
+    def is_modified(self, key):
+        """
+        True if a payload has been assigned or marked as modified, whether
+        or not it has since been written to disk
+
+        Parameters
+        ----------
+        key : str
+              The payload key
+        """
+        with self._lock:
+            return key in self._dirty or os.path.exists(self._filename(key))
+
+    def pin(self, keys):
+        """
+        Keep payloads in memory, once loaded, until they are unpinned.
+        Pins are counted, so a payload may be pinned by several threads.
+
+        Parameters
+        ----------
+        keys : iterable
+               of payload keys
+        """
+        with self._lock:
+            for key in keys:
+                self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, keys, touched=()):
+        """
+        Release pinned payloads.
+
+        Parameters
+        ----------
+        keys : iterable
+               of payload keys, as passed to pin
+
+        touched : iterable
+                  of payload keys to mark as modified, see touch
+        """
+        with self._lock:
+            for key in touched:
+                self.touch(key)
+            for key in keys:
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+            self._evict()
+
+    def flush(self):
+        """
+        Write all of the modified payloads held in memory to disk.
+        """
+        with self._lock:
+            for key in self._cache:
+                if key in self._dirty:
+                    self._write(key)
+
+
+class StoredAttribute(object):
+    """
+    A descriptor for a node or edge payload.  If the owning object has no
+    store, the payload is a normal instance attribute, otherwise it is read
+    from and written to the store using the key returned by the owner's
+    payload_key method.
+
+    Parameters
+    ----------
+    name : str
+           The name of the attribute
+
+    default : object
+              The default value (or a callable returning the default) used
+              when the store does not contain the payload, or when the
+              attribute is read before it has been set
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self.attr = '_{}'.format(name)
+        self.default = default
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        store = obj.__dict__.get('_store')
+        if store is None:
+            if self.attr not in obj.__dict__ and self.default is not None:
+                # The default is created on first use
+                obj.__dict__[self.attr] = self.default() if callable(self.default) else self.default
+            return obj.__dict__.get(self.attr)
+        return store.get(obj.payload_key(self.name), default=self.default)
+
+    def __set__(self, obj, value):
+        store = obj.__dict__.get('_store')
+        if store is None:
+            obj.__dict__[self.attr] = value
+        else:
+            store.put(obj.payload_key(self.name), value)
+
+
+def touch(obj, name):
+    """
+    Mark a payload of a node or edge as modified in place, e.g. after
+    adding a column to its masks outside of a node or edge method.  Does
+    nothing if the object has no store.
+
+    Parameters
+    ----------
+    obj : object
+          A Node or Edge object
+
+    name : str
+           The name of the payload, e.g. 'masks'
+    """
+    store = obj.__dict__.get('_store')
+    if store is not None:
+        store.touch(obj.payload_key(name))
+
+
+@contextmanager
+def pinned(obj, *others):
+    """
+    Pin the payloads of a node or edge, and of any others (e.g. the nodes
+    of an edge), while a method of the node or edge runs.  The payloads of
+    obj are marked as modified when the method returns, since it may have
+    modified them in place.  Does nothing for objects without a store.
+
+    Parameters
+    ----------
+    obj : object
+          A Node or Edge object
+
+    others : objects
+             Node or Edge objects whose payloads are read by the method
+    """
+    store = obj.__dict__.get('_store')
+    if store is None:
+        yield
+        return
+
+    touched = [obj.payload_key(name) for name in obj._payloads]
+    keys = list(touched)
+    for other in others:
+        if getattr(other, '__dict__', {}).get('_store') is store:
+            keys.extend(other.payload_key(name) for name in other._payloads)
+    store.pin(keys)
+    try:
+        yield
+    finally:
+        store.unpin(keys, touched=touched)
+
+
+def attach(obj, store):
+    """
+    Move the payloads of a node or edge into a store.
+
+    Parameters
+    ----------
+    obj : object
+          A Node or Edge object, with a _payloads attribute listing the
+          names of its StoredAttributes
+
+    store : object
+            A PayloadStore
+    """
+    # Payloads that have not been created (see StoredAttribute) are left to
+    # the store default
+    values = {name: obj.__dict__['_{}'.format(name)] for name in obj._payloads
+              if '_{}'.format(name) in obj.__dict__}
+    obj._store = store
+    for name, value in values.items():
+        obj.__dict__.pop('_{}'.format(name), None)
+        setattr(obj, name, value)
+
+
+def materialize(obj, state):
+    """
+    Replace a reference to a store in the (pickle) state of a node or edge
+    with the payloads themselves, so that the object can be shipped to
+    another process.
+
+    Parameters
+    ----------
+    obj : object
+          A Node or Edge object
+
+    state : dict
+            A copy of the object's __dict__, modified in place
+    """
+    if state.pop('_store', None) is not None:
+        for name in obj._payloads:
+            state['_{}'.format(name)] = getattr(obj, name)
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import checkpoint
+
+
+def test_edge_unit_orientation():
+    assert checkpoint.edge_unit(0, 1) == checkpoint.edge_unit(1, 0) == 'edge_0_1'
+    assert checkpoint.node_unit(3) == 'node_3'
+
+
+def test_stage_key():
+    assert checkpoint.stage_key('match') == 'match'
+    k2 = checkpoint.stage_key('match', kwargs={'k': 2})
+    assert k2.startswith('match:')
+    assert k2 == checkpoint.stage_key('match', (), {'k': 2})
+    assert k2 != checkpoint.stage_key('match', kwargs={'k': 3})
+    assert checkpoint.stage_key('f', (np.zeros(3),)) != checkpoint.stage_key('f', (np.ones(3),))
+
+
+_KEY = """
+import importlib.util, os, sys
+from collections import OrderedDict
+import numpy as np
+spec = importlib.util.spec_from_file_location('checkpoint', sys.argv[1])
+checkpoint = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(checkpoint)
+print(checkpoint.stage_key('f', (np.arange(3), {1, 2}), {'func': np.mean, 'join': os.path.join,
+                                                      'cls': OrderedDict, 'n': np.int64(2)}))
+"""
+
+
+def test_stage_key_stable():
+    key = checkpoint.stage_key('f', (np.arange(3), {1, 2}), {'func': np.mean, 'join': os.path.join,
+                                                             'cls': OrderedDict, 'n': np.int64(2)})
+    # The key built in a fresh interpreter is the same
+    out = subprocess.check_output([sys.executable, '-c', _KEY, checkpoint.__file__])
+    assert out.decode().strip() == key
+    assert checkpoint.stage_key('f', kwargs={'func': np.mean}) != \
+        checkpoint.stage_key('f', kwargs={'func': np.median})
+
+    # Objects identified by their memory address can not be encoded
+    with pytest.raises(TypeError):
+        checkpoint.stage_key('f', kwargs={'obj': object()})
+
+
+def test_record_and_resume(tmpdir):
+    path = tmpdir.join('checkpoint').strpath
+    df = pd.DataFrame({'x': [1, 2, 3]})
+    with checkpoint.Checkpoint(path) as c:
+        c.record('extract_features', 'node_0', df)
+        # The state is captured when it is recorded, not when it is written
+        df['x'] = 0
+        assert c.is_complete('extract_features', 'node_0')
+        assert c.is_current('node_0')
+        c.flush()
+        assert c.writes == 1
+    assert os.path.exists(os.path.join(path, 'node_0.pkl'))
+
+    c = checkpoint.Checkpoint(path)
+    assert c.is_complete('extract_features', 'node_0')
+    assert not c.is_complete('extract_features', 'node_1')
+    assert not c.is_current('node_0')
+    assert c.load('node_0')['x'].tolist() == [1, 2, 3]
+    assert c.is_current('node_0')
+    assert c.load('node_1') is None
+    c.close()
+
+
+def test_truncated_log(tmpdir):
+    path = tmpdir.strpath
+    with checkpoint.Checkpoint(path) as c:
+        c.record('match', 'edge_0_1', None)
+    with open(os.path.join(path, 'checkpoint.log'), 'a') as f:
+        f.write('{"stage": "match", "un')
+    c = checkpoint.Checkpoint(path)
+    assert c.completed == {('match', 'edge_0_1')}
+    c.close()
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from .. import metadata
+
+
+@pytest.fixture
+def images(tmpdir):
+    paths = []
+    for i in range(3):
+        p = tmpdir.join('image_{}.cub'.format(i))
+        p.write('')
+        paths.append(p.strpath)
+    return paths
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    reads = []
+    def read_metadata(path):
+        reads.append(path)
+        return {'mtime': os.path.getmtime(path),
+                'raster_size': [10, 10],
+                'footprint': None,
+                'latlon_corners': None,
+                'isis_serial': os.path.basename(path)}
+    monkeypatch.setattr(metadata, 'read_metadata', read_metadata)
+    return reads
+
+
+def test_scan_no_cache(images, reads):
+    m = metadata.scan(images)
+    assert [i['isis_serial'] for i in m] == [os.path.basename(p) for p in images]
+    assert reads == images
+
+
+def test_scan_cache(tmpdir, images, reads):
+    cache = tmpdir.join('metadata.json').strpath
+    first = metadata.scan(images, cache=cache)
+    assert os.path.exists(cache)
+    assert len(reads) == 3
+
+    # Nothing has changed so the images are not opened again
+    second = metadata.scan(images, cache=cache)
+    assert len(reads) == 3
+    assert first == second
+
+    # A modified image is re-read
+    mtime = os.path.getmtime(images[1]) + 10
+    os.utime(images[1], (mtime, mtime))
+    metadata.scan(images, cache=cache)
+    assert reads[3:] == [images[1]]
@@ -0,0 +1,67 @@
+import threading
+
+import numpy as np
+import pytest
+
+from .. import prefetch
+
+
+def test_prefetch_order():
+    items = list(range(10))
+    results = list(prefetch.prefetch(items, lambda i: i * 2, lambda i: 1, max_bytes=3, nworkers=2))
+    assert results == [(i, i * 2) for i in items]
+
+
+def test_prefetch_budget():
+    lock = threading.Lock()
+    started = []
+
+    def read(i):
+        with lock:
+            started.append(i)
+        return np.zeros(i + 1)
+
+    consumed = 0
+    for i, data in prefetch.prefetch(range(10), read, lambda i: 10, max_bytes=30):
+        consumed += 1
+        assert len(data) == i + 1
+        # At most 3 reads of 10 bytes are started ahead of the consumer
+        with lock:
+            assert len(started) - consumed <= 3
+    assert consumed == 10
+
+
+def test_prefetch_reads_ahead():
+    # The next item is read while the current item is processed
+    second_read = threading.Event()
+
+    def read(i):
+        if i == 1:
+            second_read.set()
+        return i
+
+    reads = prefetch.prefetch([0, 1], read, lambda i: 1)
+    next(reads)
+    assert second_read.wait(5)
+    assert list(reads) == [(1, 1)]
+
+
+def test_prefetch_oversized():
+    # An item larger than the budget is still read
+    results = list(prefetch.prefetch([0, 1], lambda i: i, lambda i: 100, max_bytes=10))
+    assert results == [(0, 0), (1, 1)]
+
+
+def test_prefetch_error():
+    def read(i):
+        raise IOError('unreadable')
+
+    with pytest.raises(IOError):
+        list(prefetch.prefetch([0], read, lambda i: 1))
+
+
+def test_raster_nbytes():
+    class FakeNode(object):
+        raster_size = (100, 50)
+    assert prefetch.raster_nbytes(FakeNode()) == 20000
+    assert prefetch.raster_nbytes(FakeNode(), itemsize=1) == 5000
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from .. import pyramid
+
+
+def test_reduce():
+    array = np.arange(16, dtype=np.float32).reshape(4, 4)
+    reduced = pyramid.reduce(array)
+    assert reduced.tolist() == [[2.5, 4.5], [10.5, 12.5]]
+    assert reduced.dtype == np.float32
+
+
+def test_reduce_odd():
+    array = np.arange(15, dtype=np.uint8).reshape(3, 5)
+    reduced = pyramid.reduce(array)
+    assert reduced.shape == (2, 3)
+    assert reduced.dtype == np.uint8
+    # The trailing row and column are averaged with themselves
+    assert reduced[1].tolist() == [10, 12, 14]
+    assert reduced[0, 2] == 6
+
+
+def test_nlevels():
+    assert pyramid.nlevels((1000, 1000)) == 5
+    assert pyramid.nlevels((1000, 40)) == 1
+    assert pyramid.nlevels((20, 20)) == 1
+    assert pyramid.nlevels((256, 512), min_size=1) == 9
+
+
+def test_build_and_read(tmpdir):
+    image = tmpdir.join('image.cub')
+    image.write('')
+    array = np.random.RandomState(0).random_sample((130, 100)).astype(np.float32)
+    p = pyramid.Pyramid(tmpdir.join('pyramids').strpath, image.strpath, band=2)
+    assert not p.is_current()
+
+    p.build(array, min_size=16)
+    assert p.is_current()
+    assert p.level_path(1).endswith('image.cub.b2.l1.npy')
+    level0 = p.read(0)
+    assert isinstance(level0, np.memmap)
+    assert np.array_equal(level0, array)
+    assert p.read(1).shape == (65, 50)
+    assert p.read(2).shape == (33, 25)
+    with pytest.raises(ValueError):
+        p.read(3)
+
+    # A modified image invalidates the pyramid
+    mtime = os.path.getmtime(p.level_path(0))
+    os.utime(image.strpath, (mtime + 10, mtime + 10))
+    assert not p.is_current()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from autocnet.graph.edge import Edge
+from autocnet.graph.node import Node
+
+from .. import store
+
+
+@pytest.fixture
+def payload_store(tmpdir):
+    # Small enough that only one of the test payloads fits in memory
+    return store.PayloadStore(tmpdir.join('store').strpath, max_bytes=1000)
+
+
+def test_put_get(payload_store):
+    arr = np.arange(100, dtype=np.float64)
+    payload_store.put('a', arr)
+    np.testing.assert_array_equal(payload_store.get('a'), arr)
+    assert payload_store.loads == 0
+
+
+def test_evict_and_reload(payload_store):
+    a = np.arange(100, dtype=np.float64)
+    b = np.ones(100)
+    payload_store.put('a', a)
+    payload_store.put('b', b)
+    assert payload_store.writes == 1
+    assert payload_store.nbytes == b.nbytes
+
+    np.testing.assert_array_equal(payload_store.get('a'), a)
+    assert payload_store.loads == 1
+
+
+def test_clean_payloads_not_rewritten(payload_store):
+    payload_store.put('a', np.zeros(100))
+    payload_store.put('b', np.ones(100))
+    payload_store.get('a')
+    payload_store.get('b')
+    # a was evicted twice, but only modified once
+    assert payload_store.writes == 2
+
+
+def test_in_place_modification(payload_store):
+    df = pd.DataFrame({'x': np.zeros(50)})
+    payload_store.put('a', df)
+    payload_store.flush()
+    writes = payload_store.writes
+
+    # Unmarked in place modifications are not written back
+    payload_store.get('a')['y'] = True
+    payload_store.put('b', np.ones(100))
+    assert payload_store.writes == writes
+    assert 'y' not in payload_store.get('a').columns
+
+    payload_store.get('a')['y'] = True
+    payload_store.touch('a')
+    payload_store.put('b', np.ones(100))
+    assert payload_store.writes == writes + 2
+    assert 'y' in payload_store.get('a').columns
+
+
+def test_pin(payload_store):
+    payload_store.put('a', pd.DataFrame({'x': np.zeros(50)}))
+    payload_store.pin(['a'])
+    masks = payload_store.get('a')
+    payload_store.put('b', np.ones(100))
+    # The pinned payload is kept, even over budget
+    assert payload_store.get('a') is masks
+    masks['y'] = True
+    payload_store.unpin(['a'], touched=['a'])
+
+    payload_store.get('b')
+    assert payload_store.nbytes == np.ones(100).nbytes
+    assert 'y' in payload_store.get('a').columns
+
+
+def test_default(payload_store):
+    assert 'a' not in payload_store
+    assert payload_store.get('a', default=pd.DataFrame).empty
+
+
+def test_stored_attributes(tmpdir):
+    s = Node(node_id=0)
+    d = Node(node_id=1)
+    e = Edge(s, d)
+    e.masks['symmetry'] = pd.Series([True, False])
+    s.keypoints = pd.DataFrame({'x': [1, 2], 'y': [3, 4]})
+
+    payload_store = store.PayloadStore(tmpdir.join('store').strpath, max_bytes=0)
+    for obj in (s, d, e):
+        store.attach(obj, payload_store)
+    assert '_masks' not in e.__dict__
+
+    e.masks['ratio'] = pd.Series([False, True])
+    store.touch(e, 'masks')
+    payload_store.flush()
+    assert e.masks.columns.tolist() == ['symmetry', 'ratio']
+    assert s.nkeypoints == 2
+    assert d.descriptors is None
+
+
+def test_pinned(tmpdir):
+    s = Node(node_id=0)
+    d = Node(node_id=1)
+    e = Edge(s, d)
+    s.keypoints = pd.DataFrame({'x': np.arange(50.)})
+    payload_store = store.PayloadStore(tmpdir.join('store').strpath, max_bytes=0)
+    for obj in (s, d, e):
+        store.attach(obj, payload_store)
+
+    with store.pinned(e, s, d):
+        masks = e.masks
+        keypoints = s.keypoints
+        masks['symmetry'] = pd.Series([True, False])
+        # Reads of other payloads do not evict the pinned ones
+        assert s.keypoints is keypoints
+        assert e.masks is masks
+    assert d.descriptors is None
+    assert e.masks.columns.tolist() == ['symmetry']
@@ -1,3 +1,4 @@
+import threading
 import warnings
 
 import autocnet
@@ -13,6 +14,42 @@ except Exception:  # pragma: no cover
     vlfeat = False
     pass
 
+# The detectors created by each thread, see get_detector
+_detectors = threading.local()
+
+
+def get_detector(extractor_method='sift', extractor_parameters={}):
+    """
+    Return an OpenCV detector.  Detectors are created once per thread and
+    set of parameters and then reused, so that the many calls made by tiled
+    extraction do not each create a detector, while no detector is shared
+    between threads.
+
+    Parameters
+    ----------
+    extractor_method : {'orb', 'sift', 'fast', 'surf'}
+                       The detector method
+
+    extractor_parameters : dict
+                           A dictionary containing OpenCV parameters names and values
+
+    Returns
+    -------
+     : object
+       An OpenCV Feature2D detector
+    """
+    detectors = {'fast': cv2.FastFeatureDetector_create,
+                 'sift': cv2.xfeatures2d.SIFT_create,
+                 'surf': cv2.xfeatures2d.SURF_create,
+                 'orb': cv2.ORB_create}
+
+    if not hasattr(_detectors, 'cache'):
+        _detectors.cache = {}
+    key = (extractor_method, tuple(sorted(extractor_parameters.items())))
+    if key not in _detectors.cache:
+        _detectors.cache[key] = detectors[extractor_method](**extractor_parameters)
+    return _detectors.cache[key]
+
 
 def extract_features(array, extractor_method='sift', extractor_parameters={}):
     """
@@ -40,11 +77,6 @@ def extract_features(array, extractor_method='sift', extractor_parameters={}):
     descriptors : ndarray
                   Of descriptors
     """
-    detectors = {'fast': cv2.FastFeatureDetector_create,
-                 'sift': cv2.xfeatures2d.SIFT_create,
-                 'surf': cv2.xfeatures2d.SURF_create,
-                 'orb': cv2.ORB_create}
-
     if extractor_method == 'vlfeat' and vlfeat != True:
         raise ImportError('VLFeat is not available.  Please install vlfeat or use a different extractor.')
 
@@ -59,7 +91,7 @@ def extract_features(array, extractor_method='sift', extractor_parameters={}):
         # OpenCV requires the input images to be 8-bit
         if not array.dtype == 'int8':
             array = bytescale(array)
-        detector = detectors[extractor_method](**extractor_parameters)
+        detector = get_detector(extractor_method, extractor_parameters)
         keypoint_objs, descriptors = detector.detectAndCompute(array, None)
 
         keypoints = np.empty((len(keypoint_objs), 7), dtype=np.float32)